@@ -1,10 +1,26 @@
 # flask-backend/app.py
 from flask import Flask
 from flask_login import LoginManager
-from models import User
-from extensions import mysql
+from models import User, configure_claims, configure_user_cache, claims_vigentes, user_cache
+import db
+import schema
+import migrations
+import resumen_pedidos
+import resumen_ventas
+import costos
+import hashing
+import versiones
+import metricas
+import trazas_sql
+import perfilador
+import registro
+import json_rapido
+import campos
+import busqueda
+from cache_catalogo import catalogo_cache, configure_catalogo_cache
+from decorators import admin_required
 from flask_cors import CORS
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, session
 
 
 # Importar blueprints
@@ -15,17 +31,102 @@ from pedidos import pedidos_bp
 from detalle_pedidos import detalle_pedidos_bp
 from ingredientes import ingredientes_bp
 from recetas import recetas_bp
+from produccion import produccion_bp
+from busqueda import busqueda_bp
+from reportes import reportes_bp
 
 app = Flask(__name__)
 app.secret_key = "clave_secreta"
 
-# Configuración MySQL
+# Configuración MySQL (mysql-connector, compartida por todos los blueprints)
 app.config['MYSQL_HOST'] = 'localhost'
 app.config['MYSQL_USER'] = 'root'
 app.config['MYSQL_PASSWORD'] = 'Root'
 app.config['MYSQL_DB'] = 'sweetland_by_anny'
 
-mysql.init_app(app)
+# Pool de conexiones
+app.config['DB_POOL_SIZE'] = 5           # conexiones que se mantienen abiertas
+app.config['DB_POOL_MAX_OVERFLOW'] = 10  # conexiones extra en picos, se cierran al devolverse
+app.config['DB_POOL_RECYCLE'] = 3600     # segundos antes de reciclar una conexión
+app.config['DB_POOL_TIMEOUT'] = 10       # segundos de espera por una conexión libre
+app.config['DB_POOL_PRE_PING'] = True    # verificar la conexión al sacarla del pool
+
+# Cache del user_loader
+app.config['USER_CACHE_SIZE'] = 1000
+app.config['USER_CACHE_TTL'] = 60           # segundos
+# Modo sesión firmada: reconstruir el usuario desde los claims de la cookie
+# y revalidarlo contra la BD solo cada USER_REVALIDATE_SECONDS
+app.config['USER_SESSION_CLAIMS'] = False
+app.config['USER_REVALIDATE_SECONDS'] = 300
+
+# Hashing de contraseñas: método/costo de Werkzeug, p. ej. "scrypt:32768:8:1" o "pbkdf2:sha256:600000".
+# Los hashes con parámetros distintos se actualizan en el siguiente login exitoso.
+app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:600000'
+app.config['PASSWORD_HASH_WORKERS'] = 2       # hilos dedicados al hashing
+app.config['PASSWORD_HASH_MAX_PENDING'] = 16  # operaciones en curso + en cola antes de responder 503
+app.config['PASSWORD_HASH_TIMEOUT'] = 5       # segundos esperando cupo
+
+# Descontar ingredientes al pasar pedidos a en_preparacion y reponerlos al cancelarlos
+# (requiere las migraciones 004 y 007)
+app.config['INVENTARIO_DESCONTAR_STOCK'] = False
+
+# ETag y GET condicional en productos, ingredientes y recetas (ver versiones.py).
+# Las versiones viven en memoria: desactivar si se corren varios procesos de la app
+app.config['CATALOGO_ETAG'] = True
+
+# Cache de lectura de productos y recetas por producto (ver cache_catalogo.py). Vive en
+# memoria y las escrituras solo invalidan el del proceso que las hizo: con varios procesos
+# de la app los demás pueden servir datos viejos hasta CATALOGO_CACHE_TTL segundos (la
+# expiración no se renueva con los aciertos). En ese caso bajar el TTL, o 0 para desactivarlo
+app.config['CATALOGO_CACHE_SIZE'] = 2000
+app.config['CATALOGO_CACHE_TTL'] = 300      # segundos, máximo de datos viejos entre procesos
+
+# Serialización JSON (ver json_rapido.py): "orjson" si está instalado, o "json"
+app.config['JSON_MOTOR'] = 'orjson'
+
+# Logging: nivel y formato (json o texto); las variables de entorno LOG_LEVEL/LOG_FORMAT tienen prioridad
+app.config['LOG_LEVEL'] = 'INFO'
+app.config['LOG_FORMAT'] = 'json'
+
+# Métricas de peticiones y SQL en /metrics (formato Prometheus, ver metricas.py)
+app.config['METRICAS_HABILITADAS'] = True
+
+# Traza de SQL por request para desarrollo/staging (ver trazas_sql.py y /debug/sql)
+app.config['SQL_TRACE'] = False
+app.config['SQL_TRACE_N1_UMBRAL'] = 5      # repeticiones de la misma forma para marcar N+1
+app.config['SQL_TRACE_LENTA_MS'] = 100     # umbral de consulta lenta (se registra su EXPLAIN)
+app.config['SQL_TRACE_HISTORIAL'] = 200    # trazas guardadas para /debug/sql/<request_id>
+
+# Búsqueda por prefijo de clientes y productos (/buscar, ver busqueda.py). El índice vive
+# en memoria y se construye al iniciar; con varios procesos de la app cada uno mantiene el
+# suyo y solo ve los cambios hechos por él: en ese caso usar BUSQUEDA_INDICE = False (FULLTEXT)
+app.config['BUSQUEDA_INDICE'] = True
+app.config['BUSQUEDA_PRECARGAR'] = True
+
+# Perfilado de requests: cabecera X-Profile: 1 (solo admin) o muestreo al azar (ver perfilador.py)
+app.config['PERFIL_MUESTREO'] = 0.0         # fracción de requests perfilados, 0 = solo bajo demanda
+app.config['PERFIL_INTERVALO_MS'] = 5       # intervalo del muestreo de pilas
+app.config['PERFIL_DIRECTORIO'] = 'perfiles'
+app.config['PERFIL_MAX_ARCHIVOS'] = 200
+
+registro.configurar_logging(app)
+json_rapido.init_app(app)
+campos.init_app(app)
+db.init_app(app)
+hashing.init_app(app)
+configure_user_cache(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+configure_claims(app.config['USER_REVALIDATE_SECONDS'])
+configure_catalogo_cache(app.config['CATALOGO_CACHE_SIZE'], app.config['CATALOGO_CACHE_TTL'])
+schema.init_app(app)
+migrations.init_app(app)
+resumen_pedidos.init_app(app)
+resumen_ventas.init_app(app)
+costos.init_app(app)
+versiones.init_app(app)
+metricas.init_app(app)
+trazas_sql.init_app(app)
+perfilador.init_app(app)
+busqueda.init_app(app)
 
 # CORS para React - CONFIGURACIÓN COMPLETA
 CORS(app, 
@@ -42,9 +143,27 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = "auth_bp.login"
 
+# Contadores del modo sesión firmada
+claims_stats = {"hits": 0, "revalidations": 0}
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.get_by_id(user_id)
+    if app.config['USER_SESSION_CLAIMS']:
+        claims = session.get("usuario")
+        if (claims and str(claims.get("id")) == str(user_id)
+                and claims_vigentes(claims, app.config['USER_REVALIDATE_SECONDS'])):
+            claims_stats["hits"] += 1
+            return User.from_claims(claims)
+
+        claims_stats["revalidations"] += 1
+        user = User.get_by_id(user_id)
+        if user is not None:
+            session["usuario"] = user.to_claims()
+        else:
+            session.pop("usuario", None)
+        return user
+
+    return User.get_cached(user_id)
 
 # 🔧 SOLUCIÓN: Manejar OPTIONS globalmente antes de la autenticación
 @app.before_request
@@ -65,10 +184,45 @@ app.register_blueprint(pedidos_bp)
 app.register_blueprint(detalle_pedidos_bp)
 app.register_blueprint(ingredientes_bp)
 app.register_blueprint(recetas_bp)
+app.register_blueprint(produccion_bp)
+app.register_blueprint(busqueda_bp)
+app.register_blueprint(reportes_bp)
 
 @app.route("/")
 def index():
     return {"mensaje": "Backend Sweetland funcionando"}
 
+@app.route("/debug/pool")
+@admin_required
+def debug_pool():
+    return jsonify(db.get_pool().stats())
+
+@app.route("/debug/user-cache")
+@admin_required
+def debug_user_cache():
+    return jsonify({"cache": user_cache.stats(), "session_claims": claims_stats})
+
+@app.route("/debug/cache")
+@admin_required
+def debug_cache():
+    return jsonify(catalogo_cache.stats())
+
+@app.route("/debug/busqueda")
+@admin_required
+def debug_busqueda():
+    return jsonify(busqueda.estadisticas())
+
+@app.route("/debug/schema", methods=["GET"])
+@admin_required
+def debug_schema():
+    return jsonify(schema.capacidades())
+
+# Volver a inspeccionar el esquema tras aplicar una migración
+@app.route("/debug/schema/refresh", methods=["POST"])
+@admin_required
+def debug_schema_refresh():
+    schema.refresh()
+    return jsonify(schema.capacidades())
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""Búsqueda de clientes: índice de prefijos en memoria vs. recorrer la lista completa.
+
+Uso:
+    python benchmarks/bench_busqueda.py [--clientes 20000] [--consultas 2000] [--limite 10]
+
+Con clientes sintéticos mide:
+  construccion  armar el índice completo (lo que hace el arranque de la app)
+  indice        /buscar/clientes por prefijo de nombre, email y teléfono (top-k)
+  lineal        filtrar todos los clientes en Python, como hacía el formulario de pedidos
+  alta          poner/quitar un cliente en el índice ya construido
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from busqueda import IndicePrefijos, clientes, normalizar, terminos_consulta  # noqa: E402
+
+NOMBRES = ["Ana", "María", "José", "Luis", "Camila", "Andrés", "Sofía", "Julián", "Valentina", "Óscar",
+           "Daniela", "Santiago", "Laura", "Felipe", "Paula", "Mateo", "Natalia", "Sebastián"]
+APELLIDOS = ["Gómez", "Rodríguez", "Peña", "Martínez", "López", "Muñoz", "Castaño", "Ríos",
+             "Vargas", "Herrera", "Ramírez", "Zuluaga", "Ortiz", "Cárdenas", "Salazar"]
+
+
+def generar_clientes(n, rnd):
+    filas = []
+    for i in range(1, n + 1):
+        nombre = f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"
+        email = f"{normalizar(nombre).replace(' ', '.')}{i}@correo.com"
+        filas.append((i, nombre, f"3{rnd.randrange(10**9):09d}", email, f"Calle {i} # 1-2"))
+    return filas
+
+
+def generar_consultas(filas, n, rnd):
+    consultas = []
+    for _ in range(n):
+        _, nombre, telefono, email, _ = rnd.choice(filas)
+        tipo = rnd.random()
+        if tipo < 0.5:
+            palabras = nombre.split()
+            consultas.append(" ".join(p[:rnd.randint(2, len(p))] for p in palabras[:rnd.randint(1, 2)]))
+        elif tipo < 0.75:
+            consultas.append(email[:rnd.randint(3, len(email))])
+        else:
+            consultas.append(telefono[:rnd.randint(4, 10)])
+    return consultas
+
+
+def lineal(docs, q, limite):
+    q = normalizar(q)
+    digitos = "".join(c for c in q if c.isdigit())
+    encontrados = [d for d in docs
+                   if q in normalizar(d["nombre"]) or q in d["email"].lower()
+                   or (digitos and digitos in d["telefono"])]
+    return sorted(encontrados, key=lambda d: normalizar(d["nombre"]))[:limite]
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    return (statistics.median(tiempos) * 1000,
+            tiempos[int(len(tiempos) * 0.99) - 1] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clientes", type=int, default=20000)
+    parser.add_argument("--consultas", type=int, default=2000)
+    parser.add_argument("--limite", type=int, default=10)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    filas = generar_clientes(args.clientes, rnd)
+    consultas = generar_consultas(filas, args.consultas, rnd)
+
+    inicio = time.perf_counter()
+    documentos = [clientes.documento(f) for f in filas]
+    indice = IndicePrefijos()
+    indice.construir(documentos)
+    construccion = (time.perf_counter() - inicio) * 1000
+    print(f"Clientes: {args.clientes}, consultas: {args.consultas}, top-{args.limite}")
+    print(f"  construccion  {construccion:8.1f} ms")
+
+    tiempos, vacias = [], 0
+    for q in consultas:
+        inicio = time.perf_counter()
+        resultados = indice.buscar(terminos_consulta(q), args.limite)
+        tiempos.append(time.perf_counter() - inicio)
+        vacias += not resultados
+    p50, p99 = percentiles(tiempos)
+    print(f"  indice        p50 {p50:7.3f} ms   p99 {p99:7.3f} ms   sin resultados: {vacias}")
+
+    docs = [d[1] for d in documentos]
+    tiempos = []
+    for q in consultas[:200]:
+        inicio = time.perf_counter()
+        lineal(docs, q, args.limite)
+        tiempos.append(time.perf_counter() - inicio)
+    p50, p99 = percentiles(tiempos)
+    print(f"  lineal        p50 {p50:7.3f} ms   p99 {p99:7.3f} ms   (200 consultas)")
+
+    tiempos = []
+    for i in range(500):
+        fila = filas[rnd.randrange(len(filas))]
+        nueva = (args.clientes + i + 1,) + fila[1:]
+        inicio = time.perf_counter()
+        indice.poner(*clientes.documento(nueva))
+        indice.quitar(nueva[0])
+        tiempos.append(time.perf_counter() - inicio)
+    p50, p99 = percentiles(tiempos)
+    print(f"  alta+baja     p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Transiciones de estado concurrentes con descuento/reposición de stock.
+
+Uso (con el backend corriendo e INVENTARIO_DESCONTAR_STOCK activado):
+    python benchmarks/bench_estados.py --email admin@correo.com --password secreto \
+        --usuario-id 1 --productos 1,2,3 [--hilos 8] [--pedidos 64] [--lote 1] [--rondas 5] \
+        [--base http://localhost:5000]
+
+Cada hilo toma una parte de los pedidos y los alterna entre en_preparacion (descuenta)
+y cancelado (repone), de a --lote pedidos por petición; al final el stock queda como
+estaba. Los pedidos que comparten productos compiten por las mismas filas de
+ingredientes, así que los errores 500 indican deadlocks o esperas de bloqueo agotadas.
+Los pedidos creados se eliminan al terminar.
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class Cliente:
+    def __init__(self, base):
+        url = urlparse(base)
+        self.conn = http.client.HTTPConnection(url.hostname, url.port or 80)
+        self.cookie = None
+
+    def request(self, metodo, ruta, body=None):
+        headers = {"Content-Type": "application/json"}
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        self.conn.request(metodo, ruta, body=json.dumps(body) if body is not None else None, headers=headers)
+        respuesta = self.conn.getresponse()
+        datos = respuesta.read()
+        if respuesta.getheader("Set-Cookie"):
+            self.cookie = respuesta.getheader("Set-Cookie").split(";", 1)[0]
+        return respuesta.status, json.loads(datos) if datos else None
+
+
+def trabajador(args, pedidos, resultados):
+    cliente = Cliente(args.base)
+    cliente.request("POST", "/auth/login", {"email": args.email, "password": args.password})
+    lotes = [pedidos[i:i + args.lote] for i in range(0, len(pedidos), args.lote)]
+    for _ in range(args.rondas):
+        for estado in ("en_preparacion", "cancelado"):
+            for lote in lotes:
+                inicio = time.perf_counter()
+                status, _ = cliente.request("PUT", "/pedidos/estado", {"ids": lote, "estado": estado})
+                resultados.append((status, (time.perf_counter() - inicio) * 1000, len(lote)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base", default="http://localhost:5000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--usuario-id", type=int, required=True)
+    parser.add_argument("--productos", required=True, help="ids separados por coma")
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--pedidos", type=int, default=64)
+    parser.add_argument("--lote", type=int, default=1, help="pedidos por petición")
+    parser.add_argument("--rondas", type=int, default=5)
+    args = parser.parse_args()
+
+    productos = [int(p) for p in args.productos.split(",")]
+    cliente = Cliente(args.base)
+    cliente.request("POST", "/auth/login", {"email": args.email, "password": args.password})
+
+    creados = []
+    for i in range(args.pedidos):
+        # Cada pedido usa todos los productos en distinto orden para cruzar los bloqueos
+        detalles = [{"producto_id": productos[(i + j) % len(productos)], "cantidad": 1}
+                    for j in range(len(productos))]
+        status, pedido = cliente.request("POST", "/pedidos/completo", {
+            "usuario_id": args.usuario_id, "telefono": "3000000000",
+            "direccion": "Benchmark", "detalles": detalles,
+        })
+        if status != 201:
+            raise SystemExit(f"No se pudo crear el pedido: {status} {pedido}")
+        creados.append(pedido["id_pedido"])
+
+    resultados = []
+    hilos = [threading.Thread(target=trabajador, args=(args, creados[i::args.hilos], resultados))
+             for i in range(args.hilos)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    ok = [r for r in resultados if r[0] == 200]
+    tiempos = sorted(r[1] for r in ok)
+    transiciones = sum(r[2] for r in ok)
+    print(f"{args.hilos} hilos, {args.pedidos} pedidos, lote {args.lote}, {args.rondas} rondas")
+    print(f"peticiones: {len(resultados)}  ok: {len(ok)}  "
+          f"409 stock: {sum(1 for r in resultados if r[0] == 409)}  "
+          f"errores: {sum(1 for r in resultados if r[0] not in (200, 409))}")
+    if tiempos:
+        print(f"transiciones/s: {transiciones / duracion:.1f}  "
+              f"media: {statistics.mean(tiempos):.1f} ms  p95: {tiempos[int(len(tiempos) * 0.95) - 1]:.1f} ms")
+
+    # Dejar los pedidos cancelados (stock repuesto) antes de eliminarlos
+    cliente.request("PUT", "/pedidos/estado", {"ids": creados, "estado": "cancelado"})
+    for pedido_id in creados:
+        cliente.request("DELETE", f"/pedidos/{pedido_id}")
+
+
+if __name__ == "__main__":
+    main()
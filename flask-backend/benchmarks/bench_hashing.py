@@ -0,0 +1,58 @@
+"""Logins por segundo según el costo del hash de contraseñas.
+
+Uso (desde flask-backend/):
+    python benchmarks/bench_hashing.py [--logins 64] [--concurrencia 16] [--workers 2]
+
+Simula una ráfaga de logins concurrentes verificando contraseñas a través de
+hashing.PasswordHasher, con cada método/costo candidato.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from hashing import PasswordHasher  # noqa: E402
+
+METODOS = [
+    "pbkdf2:sha256:100000",
+    "pbkdf2:sha256:260000",
+    "pbkdf2:sha256:600000",
+    "scrypt:16384:8:1",
+    "scrypt:32768:8:1",
+]
+
+
+def medir(metodo, logins, concurrencia, workers):
+    hasher = PasswordHasher(method=metodo, workers=workers, max_pending=logins, timeout=60)
+    pwhash = generate_password_hash("secreto123", method=metodo)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as clientes:
+        resultados = list(clientes.map(lambda _: hasher.verify(pwhash, "secreto123"), range(logins)))
+    duracion = time.perf_counter() - inicio
+
+    assert all(resultados)
+    return logins / duracion, duracion / logins * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{args.logins} logins, {args.concurrencia} clientes, {args.workers} workers de hashing")
+    print(f"{'método':<24}{'logins/s':>10}{'ms/login':>10}")
+    for metodo in METODOS:
+        por_segundo, ms = medir(metodo, args.logins, args.concurrencia, args.workers)
+        print(f"{metodo:<24}{por_segundo:>10.1f}{ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Serialización de listados: conversión por fila + jsonify por defecto vs. json_rapido.
+
+Uso:
+    python benchmarks/bench_json.py [--filas 10000] [--repeticiones 20]
+
+Compara, para 10k pedidos y 10k detalles sintéticos:
+  actual      dict por fila con float()/strftime()/`or defecto` + DefaultJSONProvider de Flask
+  rapido      filas ya normalizadas por la consulta (COALESCE) + EspecFilas + RapidoJSONProvider
+              (orjson si está instalado y también con la biblioteca estándar)
+y, con el proveedor rápido, el tamaño y tiempo de ?format=rows / ?format=columns.
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify  # noqa: E402
+
+import json_rapido  # noqa: E402
+from json_rapido import RapidoJSONProvider  # noqa: E402
+from pedidos import ESPEC_DETALLES, ESPEC_PEDIDOS  # noqa: E402
+
+
+def generar_pedidos(n):
+    inicio = datetime.datetime(2024, 1, 1)
+    return [
+        (i, f"Cliente {i}", f"300{i:07d}", inicio + datetime.timedelta(minutes=i),
+         "pendiente", Decimal("45200.00") + i, f"Calle {i} # 1-2", 3)
+        for i in range(n)
+    ]
+
+
+def generar_detalles(n):
+    return [(i, i % 150, f"Producto {i % 150}", "Tortas", 2, Decimal("15000.00"), Decimal("30000.00"))
+            for i in range(n)]
+
+
+def pedidos_actual(filas):
+    pedidos = []
+    for f in filas:
+        pedidos.append({
+            "id": f[0],
+            "cliente_nombre": f[1] or "Cliente no registrado",
+            "cliente_telefono": f[2] or "Sin teléfono",
+            "fecha_pedido": f[3].strftime('%Y-%m-%d %H:%M:%S') if f[3] else None,
+            "estado": f[4] or "pendiente",
+            "total": float(f[5]) if f[5] else 0,
+            "direccion": f[6] or "Sin dirección",
+            "total_productos": f[7]
+        })
+    return jsonify(pedidos).get_data()
+
+
+def detalles_actual(filas):
+    detalles = []
+    for d in filas:
+        detalles.append({
+            "id": d[0],
+            "producto_id": d[1],
+            "producto_nombre": d[2],
+            "categoria": d[3],
+            "cantidad": d[4],
+            "precio_unitario": float(d[5]) if d[5] else 0,
+            "subtotal": float(d[6]) if d[6] else 0
+        })
+    return jsonify(detalles).get_data()
+
+
+def cronometrar(app, fn, filas, repeticiones):
+    tiempos = []
+    with app.app_context():
+        fn(filas)  # calentamiento
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            fn(filas)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    actual = Flask("actual")
+    rapidos = []
+    for motor in ("orjson", "json"):
+        if motor == "orjson" and json_rapido.orjson is None:
+            continue
+        app = Flask(f"rapido-{motor}")
+        app.json = RapidoJSONProvider(app)
+        app.json.motor = motor
+        rapidos.append((motor, app))
+
+    casos = [
+        ("pedidos", generar_pedidos(args.filas), pedidos_actual, ESPEC_PEDIDOS),
+        ("detalles", generar_detalles(args.filas), detalles_actual, ESPEC_DETALLES),
+    ]
+    print(f"{args.filas} filas, mediana de {args.repeticiones} repeticiones")
+    print(f"{'listado':<10}{'camino':<16}{'ms':>10}{'x':>8}")
+    for nombre, filas, fn_actual, espec in casos:
+        base = cronometrar(actual, fn_actual, filas, args.repeticiones)
+        print(f"{nombre:<10}{'actual':<16}{base:>10.1f}{1:>8.1f}")
+        for motor, app in rapidos:
+            ms = cronometrar(app, lambda f: jsonify(espec.objetos(f)).get_data(), filas, args.repeticiones)
+            print(f"{nombre:<10}{'rapido/' + motor:<16}{ms:>10.1f}{base / ms:>8.1f}")
+
+    motor, app = rapidos[0]
+    print(f"\nformatos ({motor})")
+    print(f"{'listado':<10}{'formato':<16}{'ms':>10}{'KB':>10}")
+    for nombre, filas, _, espec in casos:
+        for formato in (None, "rows", "columns"):
+            serializar = lambda f: jsonify(espec.tabla(f, formato)).get_data()  # noqa: E731
+            ms = cronometrar(app, serializar, filas, args.repeticiones)
+            with app.app_context():
+                kb = len(serializar(filas)) / 1024
+            print(f"{nombre:<10}{formato or 'objetos':<16}{ms:>10.1f}{kb:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Crear pedidos: flujo actual (1 + N peticiones) vs. POST /pedidos/completo.
+
+Uso (con el backend corriendo):
+    python benchmarks/bench_pedido_completo.py --email admin@correo.com --password secreto \
+        --usuario-id 1 --productos 1,2,3 [--lineas 10] [--pedidos 20] [--base http://localhost:5000]
+
+Los pedidos creados se eliminan al terminar.
+"""
+import argparse
+import http.client
+import json
+import statistics
+import time
+from urllib.parse import urlparse
+
+
+class Cliente:
+    def __init__(self, base):
+        url = urlparse(base)
+        self.conn = http.client.HTTPConnection(url.hostname, url.port or 80)
+        self.cookie = None
+
+    def request(self, metodo, ruta, body=None):
+        headers = {"Content-Type": "application/json"}
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        self.conn.request(metodo, ruta, body=json.dumps(body) if body is not None else None, headers=headers)
+        respuesta = self.conn.getresponse()
+        datos = respuesta.read()
+        if respuesta.getheader("Set-Cookie"):
+            self.cookie = respuesta.getheader("Set-Cookie").split(";", 1)[0]
+        if respuesta.status >= 400:
+            raise RuntimeError(f"{metodo} {ruta}: {respuesta.status} {datos[:200]}")
+        return json.loads(datos) if datos else None
+
+
+def flujo_actual(cliente, usuario_id, lineas):
+    pedido = cliente.request("POST", "/pedidos/", {"usuario_id": usuario_id, "telefono": "3000000000",
+                                                   "direccion": "Benchmark", "total": 0})
+    pedido_id = pedido["id_pedido"]
+    for producto_id in lineas:
+        cliente.request("POST", f"/pedidos/{pedido_id}/agregar_detalle",
+                        {"producto_id": producto_id, "cantidad": 1, "subtotal": 1})
+    return pedido_id
+
+
+def flujo_completo(cliente, usuario_id, lineas):
+    pedido = cliente.request("POST", "/pedidos/completo", {
+        "usuario_id": usuario_id, "telefono": "3000000000", "direccion": "Benchmark",
+        "detalles": [{"producto_id": producto_id, "cantidad": 1} for producto_id in lineas],
+    })
+    return pedido["id_pedido"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base", default="http://localhost:5000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--usuario-id", type=int, required=True)
+    parser.add_argument("--productos", required=True, help="ids separados por coma")
+    parser.add_argument("--lineas", type=int, default=10)
+    parser.add_argument("--pedidos", type=int, default=20)
+    args = parser.parse_args()
+
+    productos = [int(p) for p in args.productos.split(",")]
+    lineas = [productos[i % len(productos)] for i in range(args.lineas)]
+
+    cliente = Cliente(args.base)
+    cliente.request("POST", "/auth/login", {"email": args.email, "password": args.password})
+
+    creados = []
+    print(f"{args.pedidos} pedidos de {args.lineas} líneas")
+    print(f"{'flujo':<12}{'peticiones':>12}{'ms/pedido':>12}{'p95 ms':>10}")
+    for nombre, flujo, peticiones in [("actual", flujo_actual, 1 + args.lineas),
+                                      ("completo", flujo_completo, 1)]:
+        tiempos = []
+        for _ in range(args.pedidos):
+            inicio = time.perf_counter()
+            creados.append(flujo(cliente, args.usuario_id, lineas))
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        p95 = sorted(tiempos)[int(len(tiempos) * 0.95) - 1]
+        print(f"{nombre:<12}{peticiones:>12}{statistics.mean(tiempos):>12.1f}{p95:>10.1f}")
+
+    for pedido_id in creados:
+        cliente.request("DELETE", f"/pedidos/{pedido_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Requerimientos de ingredientes: cálculo por pedido (ingenuo) vs. matricial.
+
+Uso:
+    # Datos sintéticos, sin base de datos
+    python benchmarks/bench_requerimientos.py --sintetico [--pedidos 20000] [--lineas 3] \
+        [--productos 150] [--ingredientes 80]
+
+    # Contra la base de datos configurada en app.py: consultas por pedido vs. endpoint
+    python benchmarks/bench_requerimientos.py
+
+El enfoque ingenuo recorre cada pedido abierto, obtiene sus líneas y, por cada
+línea, la receta del producto (en modo BD: una consulta por pedido y otra por línea).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from produccion import ESTADOS_ABIERTOS, calcular_requerimientos, cargar_datos  # noqa: E402
+
+
+def generar(pedidos, lineas_por_pedido, productos, ingredientes):
+    rnd = random.Random(42)
+    lineas = [
+        (p, rnd.randint(1, productos), rnd.randint(1, 5))
+        for p in range(1, pedidos + 1)
+        for _ in range(lineas_por_pedido)
+    ]
+    recetas = [
+        (prod, ing, round(rnd.uniform(0.05, 2), 3))
+        for prod in range(1, productos + 1)
+        for ing in rnd.sample(range(1, ingredientes + 1), 6)
+    ]
+    return lineas, recetas, list(range(1, ingredientes + 1))
+
+
+def ingenuo_en_memoria(lineas, recetas, ingrediente_ids):
+    por_pedido = defaultdict(list)
+    for pedido_id, producto_id, cantidad in lineas:
+        por_pedido[pedido_id].append((producto_id, cantidad))
+    receta_de = defaultdict(list)
+    for producto_id, ingrediente_id, cantidad in recetas:
+        receta_de[producto_id].append((ingrediente_id, cantidad))
+
+    total = defaultdict(float)
+    for pedido_lineas in por_pedido.values():
+        for producto_id, cantidad in pedido_lineas:
+            for ingrediente_id, necesaria in receta_de[producto_id]:
+                total[ingrediente_id] += cantidad * necesaria
+    return [total[i] for i in ingrediente_ids]
+
+
+def ingenuo_sql(cursor):
+    placeholders = ", ".join(["%s"] * len(ESTADOS_ABIERTOS))
+    cursor.execute(f"SELECT id_pedido FROM pedidos WHERE estado IN ({placeholders})", ESTADOS_ABIERTOS)
+    total = defaultdict(float)
+    consultas = 1
+    for (pedido_id,) in cursor.fetchall():
+        cursor.execute("SELECT producto_id, cantidad FROM detalle_pedidos WHERE pedido_id = %s", (pedido_id,))
+        consultas += 1
+        for producto_id, cantidad in cursor.fetchall():
+            cursor.execute(
+                "SELECT id_ingrediente, cantidad_necesaria FROM recetas WHERE id_producto = %s",
+                (producto_id,)
+            )
+            consultas += 1
+            for ingrediente_id, necesaria in cursor.fetchall():
+                total[ingrediente_id] += float(cantidad) * float(necesaria)
+    return total, consultas
+
+
+def cronometrar(fn, *args):
+    inicio = time.perf_counter()
+    resultado = fn(*args)
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sintetico", action="store_true")
+    parser.add_argument("--pedidos", type=int, default=20000)
+    parser.add_argument("--lineas", type=int, default=3)
+    parser.add_argument("--productos", type=int, default=150)
+    parser.add_argument("--ingredientes", type=int, default=80)
+    args = parser.parse_args()
+
+    if args.sintetico:
+        lineas, recetas, ingrediente_ids = generar(args.pedidos, args.lineas, args.productos, args.ingredientes)
+        print(f"{len(lineas)} líneas, {args.productos} productos, {args.ingredientes} ingredientes")
+        esperado, t_ingenuo = cronometrar(ingenuo_en_memoria, lineas, recetas, ingrediente_ids)
+        (total, _), t_matricial = cronometrar(calcular_requerimientos, lineas, recetas, ingrediente_ids)
+        assert all(abs(a - b) < 1e-6 * max(1, abs(a)) for a, b in zip(esperado, total))
+        print(f"ingenuo (bucles por pedido): {t_ingenuo:8.1f} ms")
+        print(f"matricial (NumPy):           {t_matricial:8.1f} ms")
+        return
+
+    from app import app
+    from db import get_db
+
+    with app.app_context():
+        cursor = get_db().cursor()
+        (_, consultas), t_ingenuo = cronometrar(ingenuo_sql, cursor)
+        cursor.close()
+        (datos, t_carga) = cronometrar(cargar_datos, ESTADOS_ABIERTOS)
+        lineas, recetas, ingredientes = datos
+        _, t_calculo = cronometrar(calcular_requerimientos, lineas, recetas, [f[0] for f in ingredientes])
+        print(f"{len(lineas)} líneas abiertas")
+        print(f"ingenuo (SQL por pedido): {t_ingenuo:8.1f} ms en {consultas} consultas")
+        print(f"matricial:                {t_carga + t_calculo:8.1f} ms en 3 consultas "
+              f"(carga {t_carga:.1f} ms, cálculo {t_calculo:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Tiempo al primer byte y tiempo total: listados normales vs. streaming.
+
+Uso (con el backend corriendo):
+    python benchmarks/bench_streaming.py --email admin@correo.com --password secreto \
+        [--base http://localhost:5000] [--repeticiones 5]
+
+Para cada endpoint compara la respuesta normal (fetchall + jsonify) con
+?stream=1 (array JSON incremental) y ?format=ndjson.
+"""
+import argparse
+import http.client
+import json
+import statistics
+import time
+from urllib.parse import urlparse
+
+ENDPOINTS = ["/detalle_pedidos/", "/recetas/", "/usuarios/", "/productos/"]
+MODOS = [("normal", ""), ("stream", "?stream=1"), ("ndjson", "?format=ndjson")]
+
+
+def login(base, email, password):
+    url = urlparse(base)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80)
+    conn.request("POST", "/auth/login", body=json.dumps({"email": email, "password": password}),
+                 headers={"Content-Type": "application/json"})
+    respuesta = conn.getresponse()
+    respuesta.read()
+    if respuesta.status != 200:
+        raise SystemExit(f"Login fallido: {respuesta.status}")
+    return respuesta.getheader("Set-Cookie").split(";", 1)[0]
+
+
+def medir(base, cookie, ruta):
+    url = urlparse(base)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80)
+    inicio = time.perf_counter()
+    conn.request("GET", ruta, headers={"Cookie": cookie})
+    respuesta = conn.getresponse()
+    respuesta.read(1)
+    ttfb = time.perf_counter() - inicio
+    tamano = 1 + len(respuesta.read())
+    total = time.perf_counter() - inicio
+    conn.close()
+    return ttfb, total, tamano
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base", default="http://localhost:5000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    cookie = login(args.base, args.email, args.password)
+    print(f"{'endpoint':<22}{'modo':<8}{'ttfb ms':>10}{'total ms':>10}{'bytes':>12}")
+    for endpoint in ENDPOINTS:
+        for modo, sufijo in MODOS:
+            muestras = [medir(args.base, cookie, endpoint + sufijo) for _ in range(args.repeticiones)]
+            ttfb = statistics.median(m[0] for m in muestras) * 1000
+            total = statistics.median(m[1] for m in muestras) * 1000
+            print(f"{endpoint:<22}{modo:<8}{ttfb:>10.1f}{total:>10.1f}{muestras[0][2]:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import bisect
+import heapq
+import logging
+import re
+import threading
+import unicodedata
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import login_required
+
+from db import LIKE_ESCAPE, escapar_like, get_db
+from json_rapido import EspecFilas
+import schema
+
+logger = logging.getLogger(__name__)
+
+busqueda_bp = Blueprint("busqueda", __name__, url_prefix="/buscar")
+
+BUSQUEDA_LIMITE_MAXIMO = 50
+
+# ================================
+# Normalización de texto
+# ================================
+_PALABRA = re.compile(r"[a-z0-9]+")
+_TELEFONO = re.compile(r"[\d\s()+.-]+")
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: "Peña" -> "pena" """
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto).lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def solo_digitos(texto):
+    return re.sub(r"\D", "", texto or "")
+
+
+def terminos_consulta(q):
+    """Términos de búsqueda: un email o un teléfono completos se buscan como un solo
+    término (el teléfono solo con dígitos); el resto se parte en palabras."""
+    q = normalizar(q).strip()
+    if "@" in q and " " not in q:
+        return [q]
+    if _TELEFONO.fullmatch(q) and solo_digitos(q):
+        return [solo_digitos(q)]
+    return _PALABRA.findall(q)
+
+
+# ================================
+# Índice de prefijos en memoria (arreglo ordenado de (término, id))
+# ================================
+class IndicePrefijos:
+    """Cada documento aporta sus términos a una lista ordenada de (término, id) y su
+    nombre a otra de (nombre, id); los prefijos se resuelven con bisect sobre esas
+    listas. Las altas, cambios y bajas de un documento mueven solo sus entradas."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entradas = []   # [(termino, id)] ordenada
+        self._nombres = []    # [(nombre normalizado, id)] ordenada
+        self._docs = {}       # id -> (doc, terminos, nombre normalizado, texto para subcadenas)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def construir(self, documentos):
+        """documentos: [(id, doc, terminos, nombre_normalizado, texto)]"""
+        docs = {id_: (doc, frozenset(terminos), nombre, texto)
+                for id_, doc, terminos, nombre, texto in documentos}
+        entradas = sorted((t, id_) for id_, (_, terminos, _, _) in docs.items() for t in terminos)
+        nombres = sorted((nombre, id_) for id_, (_, _, nombre, _) in docs.items())
+        with self._lock:
+            self._docs, self._entradas, self._nombres = docs, entradas, nombres
+
+    def poner(self, id_, doc, terminos, nombre, texto):
+        with self._lock:
+            self._quitar(id_)
+            terminos = frozenset(terminos)
+            self._docs[id_] = (doc, terminos, nombre, texto)
+            for t in terminos:
+                bisect.insort(self._entradas, (t, id_))
+            bisect.insort(self._nombres, (nombre, id_))
+
+    def quitar(self, id_):
+        with self._lock:
+            self._quitar(id_)
+
+    def _quitar(self, id_):
+        anterior = self._docs.pop(id_, None)
+        if anterior is None:
+            return
+        for t in anterior[1]:
+            _borrar(self._entradas, (t, id_))
+        _borrar(self._nombres, (anterior[2], id_))
+
+    def buscar(self, terminos, k):
+        """Los k mejores documentos para la consulta, en este orden:
+        1. nombre que empieza por la consulta completa (alfabético)
+        2. todos los términos son prefijo de alguna palabra (alfabético)
+        3. un solo término de 3 o más letras contenido en el texto"""
+        if not terminos:
+            return []
+        frase = " ".join(terminos)
+
+        with self._lock:
+            docs = self._docs
+            i, j = _rango(self._nombres, frase)
+            ids = [id_ for _, id_ in self._nombres[i:min(j, i + k)]]
+            if len(ids) < k:
+                vistos = set(ids)
+                # Intersección de los rangos de cada término, empezando por el más selectivo
+                candidatos = None
+                for t in sorted(set(terminos), key=len, reverse=True):
+                    i, j = _rango(self._entradas, t)
+                    encontrados = {id_ for _, id_ in self._entradas[i:j]}
+                    candidatos = encontrados if candidatos is None else candidatos & encontrados
+                    if not candidatos:
+                        break
+                candidatos -= vistos
+                ids += heapq.nsmallest(k - len(ids), candidatos, key=lambda id_: (docs[id_][2], id_))
+
+            if len(ids) < k and len(terminos) == 1 and len(frase) >= 3:
+                vistos = set(ids)
+                subcadenas = [(d[2], id_) for id_, d in docs.items() if frase in d[3] and id_ not in vistos]
+                ids += [id_ for _, id_ in heapq.nsmallest(k - len(ids), subcadenas)]
+
+            return [docs[id_][0] for id_ in ids]
+
+
+def _rango(lista, prefijo):
+    """Posiciones [i, j) de las tuplas cuyo primer elemento empieza por prefijo"""
+    return (bisect.bisect_left(lista, (prefijo,)),
+            bisect.bisect_left(lista, (prefijo + "\uffff",)))
+
+
+def _borrar(lista, entrada):
+    i = bisect.bisect_left(lista, entrada)
+    if i < len(lista) and lista[i] == entrada:
+        del lista[i]
+
+
+# ================================
+# Buscadores de clientes y productos
+# ================================
+class Buscador:
+    """Índice en memoria de un recurso con respaldo en FULLTEXT / LIKE de MySQL.
+
+    El índice se construye en segundo plano al iniciar la app; mientras no está
+    listo (o con BUSQUEDA_INDICE = False) se responde desde la base de datos."""
+
+    def __init__(self, nombre, tabla, id_columna, columnas, where, fulltext, columnas_fulltext,
+                 textos, defectos=None):
+        self.nombre = nombre
+        self.tabla = tabla
+        self.id_columna = id_columna
+        self.espec = EspecFilas(*columnas)
+        self.sql = f"SELECT {', '.join(columnas)} FROM {tabla}" + (f" WHERE {where}" if where else "")
+        self.where = where
+        self.fulltext = fulltext
+        self.columnas_fulltext = columnas_fulltext
+        self.textos = textos          # doc -> (nombre, [textos con palabras], [emails/teléfonos completos])
+        self.defectos = defectos or {}
+        self.indice = IndicePrefijos()
+        self.listo = False
+        self._construyendo = False
+        self._sucio = False
+        self._lock = threading.Lock()
+
+    # --- Documentos ---
+    def documento(self, fila):
+        doc = self.espec.objeto(fila)
+        for campo, defecto in self.defectos.items():
+            if doc[campo] is None:
+                doc[campo] = defecto
+        nombre, textos, enteros = self.textos(doc)
+        nombre = normalizar(nombre)
+        terminos = set(_PALABRA.findall(" ".join(normalizar(t) for t in textos)))
+        terminos.update(t for t in enteros if t)
+        texto = " ".join([normalizar(t) for t in textos] + list(enteros))
+        return doc[self.espec.nombres[0]], doc, terminos, nombre, texto
+
+    def _leer(self, where="", params=()):
+        sql = self.sql
+        if where:
+            sql += (" AND " if self.where else " WHERE ") + where
+        cursor = get_db().cursor()
+        cursor.execute(sql, params)
+        filas = cursor.fetchall()
+        cursor.close()
+        return [self.documento(f) for f in filas]
+
+    # --- Construcción y mantenimiento ---
+    def construir(self):
+        """Lee el recurso completo y publica el índice. Si hubo escrituras mientras
+        se leía, vuelve a leer para no perderlas."""
+        while True:
+            with self._lock:
+                self._sucio = False
+            documentos = self._leer()
+            with self._lock:
+                if not self._sucio:
+                    self.indice.construir(documentos)
+                    self.listo = True
+                    self._construyendo = False
+                    logger.info("Índice de búsqueda de %s listo: %d documentos", self.nombre, len(documentos))
+                    return
+
+    def construir_en_segundo_plano(self, app):
+        with self._lock:
+            if self.listo or self._construyendo:
+                return
+            self._construyendo = True
+
+        def construir():
+            try:
+                with app.app_context():
+                    self.construir()
+            except Exception:
+                logger.exception("No se pudo construir el índice de búsqueda de %s", self.nombre)
+                with self._lock:
+                    self._construyendo = False
+
+        threading.Thread(target=construir, name=f"indice-{self.nombre}", daemon=True).start()
+
+    def actualizar(self, ids):
+        """Vuelve a leer los ids (después del commit) y los pone o quita del índice"""
+        ids = [i for i in ids if i is not None]
+        with self._lock:
+            if not self.listo:
+                self._sucio = True
+                return
+        if not ids:
+            return
+        placeholders = ", ".join(["%s"] * len(ids))
+        vigentes = {d[0]: d for d in self._leer(f"{self.id_columna} IN ({placeholders})", ids)}
+        for id_ in ids:
+            if id_ in vigentes:
+                self.indice.poner(*vigentes[id_])
+            else:
+                self.indice.quitar(id_)
+
+    # --- Consultas ---
+    def buscar(self, q, k):
+        """Devuelve (resultados, fuente)"""
+        terminos = terminos_consulta(q)
+        if not terminos:
+            return [], "vacia"
+        if current_app.config.get("BUSQUEDA_INDICE", True):
+            if self.listo:
+                return self.indice.buscar(terminos, k), "indice"
+            self.construir_en_segundo_plano(current_app._get_current_object())
+        return self._buscar_sql(terminos, k)
+
+    def _buscar_sql(self, terminos, k):
+        # FULLTEXT ignora términos más cortos que innodb_ft_min_token_size (3)
+        if schema.tiene_indice(self.tabla, self.fulltext) and min(len(t) for t in terminos) >= 3:
+            consulta = " ".join("+" + t + "*" for t in _PALABRA.findall(" ".join(terminos)))
+            match = f"MATCH({', '.join(self.columnas_fulltext)}) AGAINST (%s IN BOOLEAN MODE)"
+            condicion, params, fuente = match, [consulta], "fulltext"
+        else:
+            frase = escapar_like(" ".join(terminos)) + "%"
+            condicion = "(" + " OR ".join(
+                f"{c} LIKE %s {LIKE_ESCAPE}" for c in self.columnas_fulltext
+            ) + ")"
+            params, fuente = [frase] * len(self.columnas_fulltext), "like"
+
+        sql = self.sql + (" AND " if self.where else " WHERE ") + condicion + " ORDER BY nombre LIMIT %s"
+        cursor = get_db().cursor()
+        cursor.execute(sql, params + [k])
+        filas = cursor.fetchall()
+        cursor.close()
+        return [self.documento(f)[1] for f in filas], fuente
+
+    def estadisticas(self):
+        return {
+            "listo": self.listo,
+            "construyendo": self._construyendo,
+            "documentos": len(self.indice),
+            "terminos": len(self.indice._entradas),
+        }
+
+
+# Clientes: mismos campos que /pedidos/usuarios; se buscan por nombre, email y teléfono
+clientes = Buscador(
+    "clientes", "usuarios", "id_usuario",
+    ("id_usuario", "nombre", "telefono", "email", "direccion"),
+    where="rol = 'cliente'",
+    fulltext="ft_usuarios_busqueda",
+    columnas_fulltext=("nombre", "email", "telefono"),
+    textos=lambda d: (d["nombre"], [d["nombre"], d["email"]],
+                      [normalizar(d["email"]), solo_digitos(d["telefono"])]),
+    defectos={"telefono": "", "email": "", "direccion": ""},
+)
+
+# Productos: lo necesario para un selector (sin descripción ni imagen)
+productos = Buscador(
+    "productos", "productos", "id_producto",
+    ("id_producto", "nombre", "categoria", "precio"),
+    where="",
+    fulltext="ft_productos_busqueda",
+    columnas_fulltext=("nombre", "categoria"),
+    textos=lambda d: (d["nombre"], [d["nombre"], d["categoria"]], []),
+)
+
+BUSCADORES = {"clientes": clientes, "productos": productos}
+
+
+# ================================
+# Endpoints: /buscar/clientes?q=ana&limit=10, /buscar/productos?q=torta
+# ================================
+@busqueda_bp.route("/<recurso>", methods=["GET"])
+@login_required
+def buscar(recurso):
+    buscador = BUSCADORES.get(recurso)
+    if buscador is None:
+        return jsonify({"error": f"No se puede buscar en {recurso}"}), 404
+    try:
+        limite = min(max(int(request.args.get("limit", 10)), 1), BUSQUEDA_LIMITE_MAXIMO)
+    except ValueError:
+        return jsonify({"error": "Parámetros de consulta no válidos"}), 400
+
+    resultados, fuente = buscador.buscar(request.args.get("q", ""), limite)
+    respuesta = jsonify(resultados)
+    respuesta.headers["X-Busqueda-Fuente"] = fuente
+    return respuesta
+
+
+def estadisticas():
+    return {nombre: b.estadisticas() for nombre, b in BUSCADORES.items()}
+
+
+def init_app(app):
+    if app.config.get("BUSQUEDA_INDICE", True) and app.config.get("BUSQUEDA_PRECARGAR", True):
+        for buscador in BUSCADORES.values():
+            buscador.construir_en_segundo_plano(app)
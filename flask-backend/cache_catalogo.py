@@ -0,0 +1,81 @@
+import threading
+
+from flask import Response, current_app
+
+from cache import TTLCache
+
+# ================================
+# Cache de lectura del catálogo (productos y recetas por producto)
+# ================================
+# Se guardan los cuerpos JSON ya serializados: un acierto responde los bytes tal cual.
+# Claves:
+#   ("productos",)              listado de productos
+#   ("producto", id)            un producto
+#   ("receta_producto", id)     receta de un producto con costos por ingrediente
+#   ("costo_produccion", id)    costo de producción de un producto
+# Las invalidaciones se hacen después del commit de cada mutación.
+
+# Se ajusta en configure_catalogo_cache
+catalogo_cache = TTLCache(maxsize=2000, ttl=300)
+
+# Cada invalidación incrementa la generación; una carga que empezó antes de una
+# invalidación no se guarda, para no reinsertar datos leídos antes del commit
+_generacion = 0
+_lock = threading.Lock()
+
+
+def configure_catalogo_cache(maxsize, ttl):
+    catalogo_cache.maxsize = maxsize
+    catalogo_cache.ttl = ttl
+
+
+def leer(clave, cargar):
+    """Cuerpo JSON (bytes) de la clave; en un fallo llama a cargar() y lo guarda.
+    Si cargar() devuelve None (no existe) no se guarda nada y devuelve None."""
+    cuerpo = catalogo_cache.get(clave)
+    if cuerpo is not None:
+        return cuerpo
+
+    generacion = _generacion
+    datos = cargar()
+    if datos is None:
+        return None
+    cuerpo = current_app.json.dumps(datos).encode()
+    with _lock:
+        # CATALOGO_CACHE_TTL = 0 desactiva el cache
+        if generacion == _generacion and catalogo_cache.ttl > 0:
+            catalogo_cache.set(clave, cuerpo)
+    return cuerpo
+
+
+def respuesta_json(cuerpo):
+    return Response(cuerpo, mimetype="application/json")
+
+
+def _invalidar(*claves):
+    global _generacion
+    with _lock:
+        _generacion += 1
+        for clave in claves:
+            catalogo_cache.invalidate(clave)
+
+
+def invalidar_listado():
+    _invalidar(("productos",))
+
+
+def invalidar_productos(producto_ids):
+    """Producto modificado o eliminado: su ficha, el listado y su receta"""
+    claves = [("productos",)]
+    for producto_id in producto_ids:
+        claves += [("producto", producto_id), ("receta_producto", producto_id),
+                   ("costo_produccion", producto_id)]
+    _invalidar(*claves)
+
+
+def invalidar_recetas(producto_ids):
+    """Cambió la receta (o un ingrediente de la receta) de los productos"""
+    claves = []
+    for producto_id in producto_ids:
+        claves += [("receta_producto", producto_id), ("costo_produccion", producto_id)]
+    _invalidar(*claves)
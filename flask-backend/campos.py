@@ -0,0 +1,77 @@
+from flask import jsonify, request
+
+from db import get_db
+from json_rapido import EspecFilas
+
+# ================================
+# Campos parciales (?fields=a,b,c) resueltos en el SELECT
+# ================================
+# Cada listado declara sus campos públicos con la expresión SQL que los produce y,
+# si hace falta, el alias del JOIN que los trae. Solo se agregan los JOIN de los
+# campos pedidos (o de los filtros activos).
+
+
+class CamposInvalidos(ValueError):
+    pass
+
+
+class Campos:
+    """Campos seleccionables de un recurso.
+
+    desde:    "productos" o "pedidos p"
+    columnas: {nombre: expresion} o {nombre: (expresion, alias_del_join)}
+    joins:    {alias: "LEFT JOIN usuarios u ON ..."} en el orden en que deben ir
+    """
+
+    def __init__(self, desde, columnas, joins=None):
+        self.desde = desde
+        self.columnas = {}
+        for nombre, definicion in columnas.items():
+            expresion, join = definicion if isinstance(definicion, tuple) else (definicion, None)
+            self.columnas[nombre] = (expresion, join)
+        self.joins = joins or {}
+
+    def solicitados(self):
+        """Nombres pedidos en ?fields= (en orden, sin repetir) o None si no se pidió.
+        Lanza CamposInvalidos si alguno no está en la lista blanca."""
+        valor = request.args.get("fields")
+        if valor is None:
+            return None
+        nombres = list(dict.fromkeys(n.strip() for n in valor.split(",") if n.strip()))
+        desconocidos = [n for n in nombres if n not in self.columnas]
+        if not nombres or desconocidos:
+            raise CamposInvalidos(
+                f"Campos no válidos: {desconocidos or valor!r}. Disponibles: {', '.join(self.columnas)}"
+            )
+        return nombres
+
+    def sql(self, nombres, where="", orden="", extra=(), joins_extra=()):
+        """SELECT con las columnas pedidas (más `extra`, expresiones internas al final)
+        y solo los JOIN necesarios."""
+        necesarios = {self.columnas[n][1] for n in nombres} | set(joins_extra)
+        select = [f"{self.columnas[n][0]} AS {n}" for n in nombres] + list(extra)
+        joins = [sql for alias, sql in self.joins.items() if alias in necesarios]
+        return " ".join(filter(None, [
+            "SELECT", ", ".join(select), "FROM", self.desde, *joins, where, orden
+        ]))
+
+    def espec(self, nombres):
+        return EspecFilas(*nombres)
+
+    def filas(self, nombres, where="", params=(), orden="", **kwargs):
+        cursor = get_db().cursor()
+        cursor.execute(self.sql(nombres, where, orden, **kwargs), params)
+        filas = cursor.fetchall()
+        cursor.close()
+        return filas
+
+    def fila(self, nombres, where, params, **kwargs):
+        """Primer registro como dict con los campos pedidos, o None"""
+        filas = self.filas(nombres, where, params, **kwargs)
+        return self.espec(nombres).objeto(filas[0]) if filas else None
+
+
+def init_app(app):
+    @app.errorhandler(CamposInvalidos)
+    def campos_invalidos(e):
+        return jsonify({"error": str(e)}), 400
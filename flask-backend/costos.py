@@ -0,0 +1,109 @@
+import time
+
+import click
+
+from db import transaction
+from json_rapido import EspecFilas
+
+# ================================
+# Costo de producción de productos a partir de sus recetas
+# ================================
+# Todas las funciones reciben el cursor de la transacción en curso y no hacen commit.
+
+
+def _placeholders(valores):
+    return ", ".join(["%s"] * len(valores))
+
+
+def productos_que_usan(cursor, ingrediente_ids):
+    """Índice inverso ingrediente -> productos (usa idx_recetas_ingrediente_producto)"""
+    if not ingrediente_ids:
+        return []
+    ingrediente_ids = list(ingrediente_ids)
+    cursor.execute(f"""
+        SELECT DISTINCT id_producto
+        FROM recetas
+        WHERE id_ingrediente IN ({_placeholders(ingrediente_ids)})
+    """, ingrediente_ids)
+    return [fila[0] for fila in cursor.fetchall()]
+
+
+def recostear_productos(cursor, producto_ids):
+    """Recalcula costo_produccion de los productos indicados con un solo UPDATE ... JOIN.
+    Devuelve las filas modificadas."""
+    if not producto_ids:
+        return 0
+    producto_ids = list(producto_ids)
+    placeholders = _placeholders(producto_ids)
+    cursor.execute(f"""
+        UPDATE productos p
+        LEFT JOIN (
+            SELECT r.id_producto, SUM(r.cantidad_necesaria * i.costo_unitario) AS costo
+            FROM recetas r
+            LEFT JOIN ingredientes i ON r.id_ingrediente = i.id_ingrediente
+            WHERE r.id_producto IN ({placeholders})
+            GROUP BY r.id_producto
+        ) c ON c.id_producto = p.id_producto
+        SET p.costo_produccion = COALESCE(c.costo, 0)
+        WHERE p.id_producto IN ({placeholders})
+    """, producto_ids + producto_ids)
+    return cursor.rowcount
+
+
+def propagar_costo_ingredientes(cursor, ingrediente_ids):
+    """Recostea solo los productos que usan alguno de los ingredientes.
+    Devuelve los ids de los productos afectados."""
+    producto_ids = productos_que_usan(cursor, ingrediente_ids)
+    recostear_productos(cursor, producto_ids)
+    return producto_ids
+
+
+SQL_COSTOS_CATALOGO = """
+    SELECT r.id_producto, SUM(r.cantidad_necesaria * i.costo_unitario) AS costo
+    FROM recetas r
+    LEFT JOIN ingredientes i ON r.id_ingrediente = i.id_ingrediente
+    GROUP BY r.id_producto
+"""
+
+
+def recostear_catalogo(cursor):
+    """Recalcula costo_produccion de todo el catálogo con una consulta agregada
+    y un único UPDATE. Devuelve las filas modificadas."""
+    cursor.execute(f"""
+        UPDATE productos p
+        LEFT JOIN ({SQL_COSTOS_CATALOGO}) c ON c.id_producto = p.id_producto
+        SET p.costo_produccion = COALESCE(c.costo, 0)
+    """)
+    return cursor.rowcount
+
+
+ESPEC_HOJA_COSTOS = EspecFilas(
+    "id_producto", "nombre", "categoria", "precio", "costo_produccion", "margen", "margen_porcentaje"
+)
+
+
+def hoja_de_costos(cursor):
+    """Costo, precio y margen de todos los productos en una sola consulta"""
+    cursor.execute(f"""
+        SELECT h.id_producto, h.nombre, h.categoria, h.precio, h.costo,
+               h.precio - h.costo AS margen,
+               ROUND((h.precio - h.costo) / NULLIF(h.precio, 0) * 100, 2) AS margen_porcentaje
+        FROM (
+            SELECT p.id_producto, p.nombre, p.categoria,
+                   COALESCE(p.precio, 0) AS precio, COALESCE(c.costo, 0) AS costo
+            FROM productos p
+            LEFT JOIN ({SQL_COSTOS_CATALOGO}) c ON c.id_producto = p.id_producto
+        ) h
+        ORDER BY h.nombre
+    """)
+    return ESPEC_HOJA_COSTOS.objetos(cursor.fetchall())
+
+
+def init_app(app):
+    @app.cli.command("recostear")
+    def recostear_command():
+        """Recalcula el costo de producción de todos los productos."""
+        inicio = time.perf_counter()
+        with transaction() as cursor:
+            filas = recostear_catalogo(cursor)
+        click.echo(f"Productos actualizados: {filas} en {(time.perf_counter() - inicio) * 1000:.1f} ms")
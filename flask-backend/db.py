@@ -1,9 +1,331 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import mysql.connector
+from flask import current_app, g
+
+
+class PoolTimeout(Exception):
+    """No hay conexiones disponibles dentro del tiempo de espera configurado"""
+
+
+# ================================
+# Pool de conexiones MySQL
+# ================================
+class ConnectionPool:
+    """Pool de conexiones con tamaño base, overflow, health check,
+    reciclado por antigüedad y tiempo máximo de espera."""
+
+    def __init__(self, connect_args, size=5, max_overflow=10, recycle=3600,
+                 timeout=10, pre_ping=True):
+        self.connect_args = connect_args
+        self.size = size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+
+        self._idle = deque()          # (conexion, creada_en)
+        self._created_at = {}         # id(conexion) -> timestamp de creación
+        self._open = 0                # conexiones abiertas (en uso + libres)
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        # Estadísticas
+        self._created = 0
+        self._recycled = 0
+        self._ping_failures = 0
+        self._timeouts = 0
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.connect_args)
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._created += 1
+        return conn
+
+    def _discard(self, conn):
+        # _cond es reentrante: release() llama a _discard con el lock tomado
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, conn, created_at):
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            with self._cond:
+                self._recycled += 1
+            return False
+        if self.pre_ping:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._ping_failures += 1
+                return False
+        return True
+
+    def acquire(self):
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+
+        with self._cond:
+            while not self._idle and self._open >= self.size + self.max_overflow:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"Sin conexiones disponibles tras {self.timeout}s "
+                        f"({self._in_use} en uso)"
+                    )
+                self._cond.wait(restante)
+
+            if self._idle:
+                conn, created_at = self._idle.pop()
+            else:
+                conn, created_at = None, None
+                self._open += 1
+            self._in_use += 1
+
+        # La conexión (o el health check) se hace fuera del lock
+        try:
+            if conn is not None and not self._healthy(conn, created_at):
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        espera = time.monotonic() - inicio
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += espera
+            self._wait_max = max(self._wait_max, espera)
+        return conn
+
+    def release(self, conn):
+        # Descartar cualquier transacción que el request haya dejado abierta
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            reutilizable = True
+        except Exception:
+            reutilizable = False
+
+        with self._cond:
+            self._in_use -= 1
+            if reutilizable and len(self._idle) < self.size:
+                self._idle.append((conn, self._created_at.get(id(conn), time.monotonic())))
+            else:
+                # Conexiones de overflow (o rotas) se cierran al devolverse
+                self._open -= 1
+                self._discard(conn)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "created": self._created,
+                "recycled": self._recycled,
+                "ping_failures": self._ping_failures,
+                "timeouts": self._timeouts,
+                "checkouts": self._checkouts,
+                "wait_avg_ms": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+# ================================
+# Observadores de consultas (métricas, trazas)
+# ================================
+# Cada observador recibe (sql, params, duracion_s, filas) después de cada execute/executemany
+# hecho con una conexión de get_db(). filas es None si no se conoce (cursor sin buffer).
+_observadores = []
+
+
+def agregar_observador(funcion):
+    _observadores.append(funcion)
+
+
+def _notificar(sql, params, duracion, filas):
+    for observador in _observadores:
+        observador(sql, params, duracion, filas)
+
+
+class CursorObservado:
+    """Envuelve un cursor de mysql-connector y cronometra execute/executemany"""
+
+    __slots__ = ("_cursor",)
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            filas = self._cursor.rowcount
+            _notificar(operation, params, time.perf_counter() - inicio, filas if filas >= 0 else None)
+
+    def executemany(self, operation, seq_params):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params)
+        finally:
+            filas = self._cursor.rowcount
+            _notificar(operation, seq_params, time.perf_counter() - inicio, filas if filas >= 0 else None)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+class ConexionObservada:
+    """Envuelve la conexión del request para que sus cursores notifiquen a los observadores"""
+
+    __slots__ = ("conexion",)
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def cursor(self, *args, **kwargs):
+        return CursorObservado(self.conexion.cursor(*args, **kwargs))
+
+    def __getattr__(self, nombre):
+        return getattr(self.conexion, nombre)
+
+
+# ================================
+# Integración con Flask
+# ================================
+def init_app(app):
+    """Crea el pool a partir de la configuración MYSQL_* y registra la devolución
+    de la conexión al terminar cada request."""
+    connect_args = {
+        "host": app.config.get("MYSQL_HOST", "localhost"),
+        "user": app.config.get("MYSQL_USER", "root"),
+        "password": app.config.get("MYSQL_PASSWORD", ""),
+        "database": app.config.get("MYSQL_DB"),
+        # Varias consultas comparten la conexión del request: resultados en buffer
+        "buffered": True,
+    }
+    if app.config.get("MYSQL_PORT"):
+        connect_args["port"] = app.config["MYSQL_PORT"]
+
+    app.extensions["db_pool"] = ConnectionPool(
+        connect_args,
+        size=app.config.get("DB_POOL_SIZE", 5),
+        max_overflow=app.config.get("DB_POOL_MAX_OVERFLOW", 10),
+        recycle=app.config.get("DB_POOL_RECYCLE", 3600),
+        timeout=app.config.get("DB_POOL_TIMEOUT", 10),
+        pre_ping=app.config.get("DB_POOL_PRE_PING", True),
+    )
+    app.teardown_appcontext(close_db)
+
+
+def get_pool():
+    return current_app.extensions["db_pool"]
+
+
+def get_db():
+    """Devuelve la conexión del request actual, pidiéndola al pool solo la primera vez"""
+    if "db_conn" not in g:
+        conn = get_pool().acquire()
+        # Sin observadores registrados se usa la conexión tal cual (sin costo extra)
+        g.db_conn = ConexionObservada(conn) if _observadores else conn
+    return g.db_conn
+
+
+def close_db(exc=None):
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        get_pool().release(conn.conexion if isinstance(conn, ConexionObservada) else conn)
+
+
+# ================================
+# Helpers de acceso a datos
+# ================================
+def query_all(sql, params=(), dictionary=False):
+    """Ejecuta un SELECT y devuelve todas las filas (tuplas o dicts)"""
+    cursor = get_db().cursor(dictionary=dictionary)
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def query_one(sql, params=(), dictionary=False):
+    """Ejecuta un SELECT y devuelve la primera fila o None"""
+    cursor = get_db().cursor(dictionary=dictionary)
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def execute(sql, params=(), commit=True):
+    """Ejecuta un INSERT/UPDATE/DELETE y devuelve (lastrowid, rowcount)"""
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        if commit:
+            conn.commit()
+        return cursor.lastrowid, cursor.rowcount
+    except Exception:
+        if commit:
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+@contextmanager
+def transaction(dictionary=False):
+    """Abre un cursor dentro de una transacción: commit al salir, rollback si hay error.
+
+        with transaction() as cursor:
+            cursor.execute(...)
+    """
+    conn = get_db()
+    cursor = conn.cursor(dictionary=dictionary)
+    try:
+        yield cursor
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# Los comodines que escribe el usuario se escapan con '!' (no con '\', cuyo
+# significado dentro de un literal depende de NO_BACKSLASH_ESCAPES)
+LIKE_ESCAPE = "ESCAPE '!'"
+
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="Root",
-        database="sweetland_by_anny"
-    )
\ No newline at end of file
+def escapar_like(valor):
+    """Escapa %, _ y ! de valor para compararlo con LIKE ... ESCAPE '!'"""
+    return valor.replace("!", "!!").replace("%", "!%").replace("_", "!_")
@@ -0,0 +1,15 @@
+from functools import wraps
+
+from flask import jsonify
+from flask_login import current_user, login_required
+
+
+def admin_required(view):
+    """Como login_required, pero además exige rol 'admin'"""
+    @wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if current_user.rol != "admin":
+            return jsonify({"error": "Se requiere rol de administrador"}), 403
+        return view(*args, **kwargs)
+    return wrapper
@@ -1,76 +1,92 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required
-from extensions import mysql
+from db import get_db
 from flask_cors import cross_origin
+from streaming import quiere_streaming, stream_query
+from resumen_pedidos import ajustar_resumen, linea_actual
+from resumen_ventas import ajustar_ventas_lineas
+from decimal import Decimal
+from json_rapido import EspecFilas, formato_tabular
+from campos import Campos
 
 detalle_pedidos_bp = Blueprint("detalle_pedidos", __name__, url_prefix="/detalle_pedidos")
 
-# Obtener todos los detalles de todos los pedidos
+SQL_DETALLES = """
+    SELECT 
+        dp.id_detalle, 
+        dp.pedido_id, 
+        p.nombre AS producto, 
+        dp.cantidad, 
+        COALESCE(dp.precio_unitario, 0) AS precio_unitario,
+        COALESCE(dp.subtotal, 0) AS subtotal
+    FROM detalle_pedidos dp
+    LEFT JOIN productos p ON dp.producto_id = p.id_producto
+    {where}
+    ORDER BY dp.id_detalle DESC
+"""
+
+ESPEC_DETALLES = EspecFilas("id_detalle", "pedido_id", "producto", "cantidad", "precio_unitario", "subtotal")
+detalle_a_dict = ESPEC_DETALLES.objeto
+
+# Campos de ?fields=; el JOIN a productos solo se hace si se pide el nombre del producto
+CAMPOS_DETALLES = Campos("detalle_pedidos dp", {
+    "id_detalle": "dp.id_detalle",
+    "pedido_id": "dp.pedido_id",
+    "producto": ("p.nombre", "p"),
+    "cantidad": "dp.cantidad",
+    "precio_unitario": "COALESCE(dp.precio_unitario, 0)",
+    "subtotal": "COALESCE(dp.subtotal, 0)",
+}, {
+    "p": "LEFT JOIN productos p ON dp.producto_id = p.id_producto",
+})
+
+# Obtener todos los detalles de todos los pedidos (?stream=1 o ?format=ndjson para streaming,
+# ?fields=id_detalle,subtotal para leer solo esas columnas)
 @detalle_pedidos_bp.route("/", methods=["GET"])
 @login_required
 @cross_origin()
 def get_detalles():
-    cursor = mysql.connection.cursor()
-    cursor.execute("""
-        SELECT 
-            dp.id_detalle, 
-            dp.pedido_id, 
-            p.nombre AS producto, 
-            dp.cantidad, 
-            dp.precio_unitario,
-            dp.subtotal
-        FROM detalle_pedidos dp
-        LEFT JOIN productos p ON dp.producto_id = p.id_producto
-        ORDER BY dp.id_detalle DESC
-    """)
+    campos = CAMPOS_DETALLES.solicitados()
+    if quiere_streaming():
+        if campos:
+            return stream_query(
+                CAMPOS_DETALLES.sql(campos, orden="ORDER BY dp.id_detalle DESC"),
+                fila_a_dict=CAMPOS_DETALLES.espec(campos).objeto
+            )
+        return stream_query(SQL_DETALLES.format(where=""), fila_a_dict=detalle_a_dict)
+
+    if campos:
+        filas = CAMPOS_DETALLES.filas(campos, orden="ORDER BY dp.id_detalle DESC")
+        return jsonify(CAMPOS_DETALLES.espec(campos).tabla(filas, formato_tabular()))
+
+    cursor = get_db().cursor()
+    cursor.execute(SQL_DETALLES.format(where=""))
     filas = cursor.fetchall()
     cursor.close()
 
-    detalles = []
-    for f in filas:
-        detalles.append({
-            "id_detalle": f[0],
-            "pedido_id": f[1],
-            "producto": f[2],
-            "cantidad": f[3],
-            "precio_unitario": float(f[4]) if f[4] else 0,
-            "subtotal": float(f[5]) if f[5] else 0
-        })
-    return jsonify(detalles)
+    return jsonify(ESPEC_DETALLES.tabla(filas, formato_tabular()))
 
 # Obtener detalle por ID
 @detalle_pedidos_bp.route("/<int:id>", methods=["GET"])
 @login_required
 @cross_origin()
 def get_detalle(id):
-    cursor = mysql.connection.cursor()
-    cursor.execute("""
-        SELECT 
-            dp.id_detalle, 
-            dp.pedido_id, 
-            p.nombre AS producto, 
-            dp.cantidad, 
-            dp.precio_unitario,
-            dp.subtotal
-        FROM detalle_pedidos dp
-        LEFT JOIN productos p ON dp.producto_id = p.id_producto
-        WHERE dp.id_detalle = %s
-    """, (id,))
+    campos = CAMPOS_DETALLES.solicitados()
+    if campos:
+        detalle = CAMPOS_DETALLES.fila(campos, "WHERE dp.id_detalle = %s", (id,))
+        if detalle is None:
+            return jsonify({"error": "Detalle no encontrado"}), 404
+        return jsonify(detalle)
+
+    cursor = get_db().cursor()
+    cursor.execute(SQL_DETALLES.format(where="WHERE dp.id_detalle = %s"), (id,))
     f = cursor.fetchone()
     cursor.close()
     
     if not f:
         return jsonify({"error": "Detalle no encontrado"}), 404
 
-    detalle = {
-        "id_detalle": f[0],
-        "pedido_id": f[1],
-        "producto": f[2],
-        "cantidad": f[3],
-        "precio_unitario": float(f[4]) if f[4] else 0,
-        "subtotal": float(f[5]) if f[5] else 0
-    }
-    return jsonify(detalle)
+    return jsonify(detalle_a_dict(f))
 
 # Actualizar un detalle
 @detalle_pedidos_bp.route("/<int:id>", methods=["PUT"])
@@ -82,13 +98,19 @@ def update_detalle(id):
     precio_unitario = data.get("precio_unitario")
     subtotal = data.get("subtotal")
 
-    cursor = mysql.connection.cursor()
+    cursor = get_db().cursor()
+    actual = linea_actual(cursor, id)
+    ajustar_ventas_lineas(cursor, [id], -1)
     cursor.execute("""
         UPDATE detalle_pedidos 
         SET cantidad=%s, precio_unitario=%s, subtotal=%s 
         WHERE id_detalle=%s
     """, (cantidad, precio_unitario, subtotal, id))
-    mysql.connection.commit()
+    ajustar_ventas_lineas(cursor, [id], 1)
+    if actual:
+        pedido_id, subtotal_anterior = actual
+        ajustar_resumen(cursor, pedido_id, 0, Decimal(str(subtotal or 0)) - (subtotal_anterior or 0))
+    get_db().commit()
     cursor.close()
     return jsonify({"mensaje": "Detalle actualizado correctamente"})
 
@@ -110,14 +132,16 @@ def create_detalle():
         if not all([pedido_id, producto_id, cantidad, precio_unitario, subtotal]):
             return jsonify({"error": "Todos los campos son requeridos"}), 400
         
-        cursor = mysql.connection.cursor()
+        cursor = get_db().cursor()
         cursor.execute("""
             INSERT INTO detalle_pedidos (pedido_id, producto_id, cantidad, precio_unitario, subtotal)
             VALUES (%s, %s, %s, %s, %s)
         """, (pedido_id, producto_id, cantidad, precio_unitario, subtotal))
         
         detalle_id = cursor.lastrowid
-        mysql.connection.commit()
+        ajustar_resumen(cursor, pedido_id, 1, subtotal)
+        ajustar_ventas_lineas(cursor, [detalle_id], 1)
+        get_db().commit()
         cursor.close()
         
         return jsonify({
@@ -133,8 +157,13 @@ def create_detalle():
 @login_required
 @cross_origin()
 def delete_detalle(id):
-    cursor = mysql.connection.cursor()
+    cursor = get_db().cursor()
+    actual = linea_actual(cursor, id)
+    ajustar_ventas_lineas(cursor, [id], -1)
     cursor.execute("DELETE FROM detalle_pedidos WHERE id_detalle = %s", (id,))
-    mysql.connection.commit()
+    if actual:
+        pedido_id, subtotal_anterior = actual
+        ajustar_resumen(cursor, pedido_id, -1, -(subtotal_anterior or 0))
+    get_db().commit()
     cursor.close()
     return jsonify({"mensaje": "Detalle eliminado correctamente"})
\ No newline at end of file
@@ -1,3 +0,0 @@
-from flask_mysqldb import MySQL
-
-mysql = MySQL()
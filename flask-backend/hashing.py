@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Demasiadas operaciones de hash pendientes (backpressure)"""
+
+
+# ================================
+# Servicio de hashing de contraseñas
+# ================================
+class PasswordHasher:
+    """Ejecuta hash/verificación en un pool acotado de hilos.
+
+    max_pending limita cuántas operaciones pueden estar en curso o en cola;
+    si no hay cupo en `timeout` segundos se lanza HashingBusy en lugar de
+    acumular requests bloqueados.
+    """
+
+    def __init__(self, method="pbkdf2:sha256:600000", workers=2, max_pending=16, timeout=5):
+        self._executor = None
+        self.configure(method, workers, max_pending, timeout)
+
+    def configure(self, method, workers, max_pending, timeout):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hashing")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        # Prefijo de los hashes generados con los parámetros actuales, p. ej. "scrypt:32768:8:1";
+        # se calcula con el primer hash para que Werkzeug complete los valores por defecto
+        self._prefix = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingBusy("Servicio de autenticación saturado")
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        pwhash = self._run(generate_password_hash, password, self.method)
+        self._prefix = pwhash.split("$", 1)[0]
+        return pwhash
+
+    def verify(self, pwhash, password):
+        if not pwhash:
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True si el hash se generó con parámetros distintos a los actuales"""
+        if self._prefix is None:
+            self._prefix = generate_password_hash("", method=self.method).split("$", 1)[0]
+        return pwhash.split("$", 1)[0] != self._prefix
+
+
+hasher = PasswordHasher()
+
+
+def init_app(app):
+    hasher.configure(
+        app.config.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000"),
+        app.config.get("PASSWORD_HASH_WORKERS", 2),
+        app.config.get("PASSWORD_HASH_MAX_PENDING", 16),
+        app.config.get("PASSWORD_HASH_TIMEOUT", 5),
+    )
+
+    @app.errorhandler(HashingBusy)
+    def handle_hashing_busy(e):
+        response = jsonify({"error": str(e)})
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+        return response
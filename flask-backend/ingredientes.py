@@ -1,55 +1,52 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required
-from extensions import mysql
+from db import get_db, transaction
+from decimal import Decimal
+from costos import productos_que_usan, propagar_costo_ingredientes, recostear_productos
+from versiones import condicional, versionar
+from cache_catalogo import invalidar_recetas
+from campos import Campos
+from json_rapido import formato_tabular
 
 ingredientes_bp = Blueprint("ingredientes", __name__, url_prefix="/ingredientes")
+versionar(ingredientes_bp, "ingredientes")
 
-# Obtener todos los ingredientes
+def _costo_cambio(anterior, nuevo):
+    if anterior is None or nuevo is None:
+        return anterior != nuevo
+    return Decimal(str(anterior)) != Decimal(str(nuevo))
+
+
+# Campos disponibles en ?fields=
+CAMPOS_INGREDIENTES = Campos("ingredientes", {
+    "id_ingrediente": "id_ingrediente",
+    "nombre": "nombre",
+    "unidad": "unidad",
+    "cantidad": "cantidad",
+    "costo_unitario": "costo_unitario",
+})
+
+
+# Obtener todos los ingredientes (?fields=id_ingrediente,nombre para leer solo esas columnas)
 @ingredientes_bp.route("/", methods=["GET"])
 @login_required
+@condicional("ingredientes")
 def get_ingredientes():
-    cursor = mysql.connection.cursor()
-    cursor.execute("""
-        SELECT id_ingrediente, nombre, unidad, cantidad, costo_unitario
-        FROM ingredientes
-    """)
-    filas = cursor.fetchall()
-    cursor.close()
-
-    ingredientes = []
-    for f in filas:
-        ingredientes.append({
-            "id_ingrediente": f[0],
-            "nombre": f[1],
-            "unidad": f[2],
-            "cantidad": float(f[3]) if f[3] is not None else None,
-            "costo_unitario": float(f[4]) if f[4] is not None else None
-        })
-    return jsonify(ingredientes)
+    campos = CAMPOS_INGREDIENTES.solicitados() or list(CAMPOS_INGREDIENTES.columnas)
+    filas = CAMPOS_INGREDIENTES.filas(campos)
+    return jsonify(CAMPOS_INGREDIENTES.espec(campos).tabla(filas, formato_tabular()))
 
 
 # Obtener ingrediente por ID
 @ingredientes_bp.route("/<int:id>", methods=["GET"])
 @login_required
+@condicional("ingredientes")
 def get_ingrediente(id):
-    cursor = mysql.connection.cursor()
-    cursor.execute("""
-        SELECT id_ingrediente, nombre, unidad, cantidad, costo_unitario
-        FROM ingredientes WHERE id_ingrediente = %s
-    """, (id,))
-    f = cursor.fetchone()
-    cursor.close()
-
-    if not f:
+    campos = CAMPOS_INGREDIENTES.solicitados() or list(CAMPOS_INGREDIENTES.columnas)
+    ingrediente = CAMPOS_INGREDIENTES.fila(campos, "WHERE id_ingrediente = %s", (id,))
+    if ingrediente is None:
         return jsonify({"error": "Ingrediente no encontrado"}), 404
-
-    return jsonify({
-        "id_ingrediente": f[0],
-        "nombre": f[1],
-        "unidad": f[2],
-        "cantidad": float(f[3]) if f[3] is not None else None,
-        "costo_unitario": float(f[4]) if f[4] is not None else None
-    })
+    return jsonify(ingrediente)
 
 
 # Crear ingrediente
@@ -62,12 +59,12 @@ def create_ingrediente():
     cantidad = data.get("cantidad")
     costo_unitario = data.get("costo_unitario")
 
-    cursor = mysql.connection.cursor()
+    cursor = get_db().cursor()
     cursor.execute("""
         INSERT INTO ingredientes (nombre, unidad, cantidad, costo_unitario)
         VALUES (%s, %s, %s, %s)
     """, (nombre, unidad, cantidad, costo_unitario))
-    mysql.connection.commit()
+    get_db().commit()
     cursor.close()
 
     return jsonify({"mensaje": "Ingrediente creado correctamente"}), 201
@@ -83,25 +80,41 @@ def update_ingrediente(id):
     cantidad = data.get("cantidad")
     costo_unitario = data.get("costo_unitario")
 
-    cursor = mysql.connection.cursor()
-    cursor.execute("""
-        UPDATE ingredientes
-        SET nombre=%s, unidad=%s, cantidad=%s, costo_unitario=%s
-        WHERE id_ingrediente=%s
-    """, (nombre, unidad, cantidad, costo_unitario, id))
-    mysql.connection.commit()
-    cursor.close()
+    with transaction() as cursor:
+        cursor.execute(
+            "SELECT costo_unitario FROM ingredientes WHERE id_ingrediente = %s FOR UPDATE", (id,)
+        )
+        anterior = cursor.fetchone()
+        cursor.execute("""
+            UPDATE ingredientes
+            SET nombre=%s, unidad=%s, cantidad=%s, costo_unitario=%s
+            WHERE id_ingrediente=%s
+        """, (nombre, unidad, cantidad, costo_unitario, id))
+
+        # Si cambió el costo, recostear en la misma transacción los productos que lo usan
+        productos_afectados = []
+        if anterior and _costo_cambio(anterior[0], costo_unitario):
+            productos_afectados = propagar_costo_ingredientes(cursor, [id])
+        # Nombre, unidad y costo aparecen en las recetas cacheadas de esos productos
+        productos_con_receta = productos_afectados or productos_que_usan(cursor, [id])
+
+    invalidar_recetas(productos_con_receta)
 
-    return jsonify({"mensaje": "Ingrediente actualizado correctamente"})
+    return jsonify({
+        "mensaje": "Ingrediente actualizado correctamente",
+        "productos_recosteados": len(productos_afectados)
+    })
 
 
 # Eliminar ingrediente
 @ingredientes_bp.route("/<int:id>", methods=["DELETE"])
 @login_required
 def delete_ingrediente(id):
-    cursor = mysql.connection.cursor()
-    cursor.execute("DELETE FROM ingredientes WHERE id_ingrediente = %s", (id,))
-    mysql.connection.commit()
-    cursor.close()
+    with transaction() as cursor:
+        productos_afectados = productos_que_usan(cursor, [id])
+        cursor.execute("DELETE FROM ingredientes WHERE id_ingrediente = %s", (id,))
+        recostear_productos(cursor, productos_afectados)
+
+    invalidar_recetas(productos_afectados)
 
     return jsonify({"mensaje": "Ingrediente eliminado correctamente"})
@@ -0,0 +1,213 @@
+from flask import current_app
+
+import schema
+from resumen_ventas import ajustar_ventas_pedidos, preparar_cambio_estado
+
+# ================================
+# Descuento de stock de ingredientes según el estado de los pedidos
+# ================================
+# Al pasar a en_preparacion se descuentan de ingredientes.cantidad las cantidades
+# de las recetas de cada línea; al cancelar (o eliminar) un pedido en_preparacion se
+# reponen. Un pedido completado ya usó los ingredientes: no se repone. pedidos.stock_descontado
+# (migración 004) evita descontar o reponer dos veces el mismo pedido.
+#
+# Lo descontado a cada pedido queda en consumo_pedidos (migración 007) y al reponer se
+# devuelve exactamente eso, aunque después cambien las líneas del pedido o las recetas.
+#
+# Orden de bloqueo (siempre el mismo para evitar deadlocks entre transiciones concurrentes):
+#   1. filas de pedidos, por id_pedido ascendente
+#   2. filas de ingredientes, por id_ingrediente ascendente
+# Todas las funciones reciben el cursor de la transacción en curso y no hacen commit.
+
+ESTADOS_PEDIDO = ('pendiente', 'confirmado', 'en_preparacion', 'completado', 'cancelado')
+
+SQL_REGISTRAR_CONSUMO = """
+    INSERT INTO consumo_pedidos (pedido_id, id_ingrediente, cantidad)
+    SELECT dp.pedido_id, r.id_ingrediente, SUM(dp.cantidad * r.cantidad_necesaria)
+    FROM detalle_pedidos dp
+    INNER JOIN recetas r ON r.id_producto = dp.producto_id
+    WHERE {filtro}
+    GROUP BY dp.pedido_id, r.id_ingrediente
+"""
+
+SQL_CONSUMO = """
+    SELECT id_ingrediente, SUM(cantidad) AS consumo
+    FROM consumo_pedidos
+    WHERE pedido_id IN ({placeholders})
+    GROUP BY id_ingrediente
+"""
+
+
+class StockInsuficiente(Exception):
+    def __init__(self, faltantes):
+        super().__init__("Stock insuficiente")
+        self.faltantes = faltantes
+
+
+def _placeholders(valores):
+    return ", ".join(["%s"] * len(valores))
+
+
+def stock_controlado():
+    """True si está activado INVENTARIO_DESCONTAR_STOCK y están las migraciones 004 y 007"""
+    return (current_app.config.get("INVENTARIO_DESCONTAR_STOCK", False)
+            and schema.tiene("pedidos", "stock_descontado")
+            and schema.tiene("consumo_pedidos", "cantidad"))
+
+
+def bloquear_pedidos(cursor, pedido_ids):
+    """{id_pedido: (estado, stock_descontado)} de los pedidos existentes, bloqueados
+    en orden de id"""
+    descontado = "stock_descontado" if schema.tiene("pedidos", "stock_descontado") else "0"
+    estado = "estado" if schema.tiene("pedidos", "estado") else "NULL"
+    cursor.execute(f"""
+        SELECT id_pedido, {estado}, {descontado}
+        FROM pedidos
+        WHERE id_pedido IN ({_placeholders(pedido_ids)})
+        ORDER BY id_pedido
+        FOR UPDATE
+    """, pedido_ids)
+    return {fila[0]: (fila[1], bool(fila[2])) for fila in cursor.fetchall()}
+
+
+def _reponibles(pedidos):
+    """Pedidos con stock descontado cuyos ingredientes todavía no se usaron"""
+    return [pedido_id for pedido_id, (estado, descontado) in pedidos.items()
+            if descontado and estado == "en_preparacion"]
+
+
+def registrar_consumo(cursor, pedido_ids):
+    """Guarda en consumo_pedidos lo que consumen ahora las líneas de los pedidos"""
+    placeholders = _placeholders(pedido_ids)
+    cursor.execute(f"DELETE FROM consumo_pedidos WHERE pedido_id IN ({placeholders})", pedido_ids)
+    cursor.execute(SQL_REGISTRAR_CONSUMO.format(filtro=f"dp.pedido_id IN ({placeholders})"), pedido_ids)
+
+
+def registrar_descontados(cursor):
+    """Paso de la migración 007: registra el consumo de los pedidos ya descontados
+    (con sus líneas y recetas actuales, lo único disponible)"""
+    cursor.execute(SQL_REGISTRAR_CONSUMO.format(
+        filtro="dp.pedido_id IN (SELECT id_pedido FROM pedidos WHERE stock_descontado = 1)"
+    ))
+
+
+def consumo_de(cursor, pedido_ids):
+    """{id_ingrediente: cantidad} registrado para los pedidos"""
+    cursor.execute(SQL_CONSUMO.format(placeholders=_placeholders(pedido_ids)), pedido_ids)
+    return dict(cursor.fetchall())
+
+
+def bloquear_ingredientes(cursor, ingrediente_ids):
+    """{id_ingrediente: (nombre, cantidad)} bloqueando las filas en orden de id"""
+    ingrediente_ids = sorted(ingrediente_ids)
+    cursor.execute(f"""
+        SELECT id_ingrediente, nombre, cantidad
+        FROM ingredientes
+        WHERE id_ingrediente IN ({_placeholders(ingrediente_ids)})
+        ORDER BY id_ingrediente
+        FOR UPDATE
+    """, ingrediente_ids)
+    return {fila[0]: (fila[1], fila[2]) for fila in cursor.fetchall()}
+
+
+def mover_stock(cursor, pedido_ids, signo):
+    """Descuenta (signo=-1) o repone (signo=1) el consumo registrado de los pedidos con
+    un solo UPDATE ... JOIN; al reponer borra el registro. Devuelve las filas de
+    ingredientes modificadas."""
+    cursor.execute(f"""
+        UPDATE ingredientes i
+        INNER JOIN ({SQL_CONSUMO.format(placeholders=_placeholders(pedido_ids))}) c
+            ON c.id_ingrediente = i.id_ingrediente
+        SET i.cantidad = COALESCE(i.cantidad, 0) + %s * c.consumo
+    """, list(pedido_ids) + [signo])
+    filas = cursor.rowcount
+    cursor.execute(f"""
+        UPDATE pedidos
+        SET stock_descontado = %s
+        WHERE id_pedido IN ({_placeholders(pedido_ids)})
+    """, [1 if signo < 0 else 0] + list(pedido_ids))
+    if signo > 0:
+        cursor.execute(
+            f"DELETE FROM consumo_pedidos WHERE pedido_id IN ({_placeholders(pedido_ids)})",
+            list(pedido_ids)
+        )
+    return filas
+
+
+def reponer_stock(cursor, pedido_ids):
+    """Devuelve a ingredientes el consumo registrado de los pedidos"""
+    consumo = consumo_de(cursor, pedido_ids)
+    if consumo:
+        bloquear_ingredientes(cursor, consumo)
+    mover_stock(cursor, pedido_ids, 1)
+
+
+def preparar_eliminacion(cursor, pedido_ids):
+    """Llamar antes de borrar pedidos: los bloquea, repone el stock de los que están
+    en_preparacion y borra el consumo registrado de todos.
+
+    Devuelve (ids no encontrados, ids con stock repuesto)."""
+    pedido_ids = sorted(set(pedido_ids))
+    pedidos = bloquear_pedidos(cursor, pedido_ids)
+    no_encontrados = [pedido_id for pedido_id in pedido_ids if pedido_id not in pedidos]
+    if no_encontrados or not stock_controlado():
+        return no_encontrados, []
+
+    reponer = _reponibles(pedidos)
+    if reponer:
+        reponer_stock(cursor, reponer)
+    # mover_stock ya borró el consumo de los repuestos
+    restantes = [pedido_id for pedido_id in pedido_ids if pedido_id not in reponer]
+    if restantes:
+        cursor.execute(
+            f"DELETE FROM consumo_pedidos WHERE pedido_id IN ({_placeholders(restantes)})", restantes
+        )
+    return [], reponer
+
+
+def cambiar_estado(cursor, pedido_ids, nuevo_estado):
+    """Cambia el estado de los pedidos y, si el stock está controlado, descuenta o
+    repone ingredientes en la misma transacción.
+
+    Devuelve (ids no encontrados, ids con stock descontado, ids con stock repuesto).
+    Si falta algún pedido no se modifica nada. Lanza StockInsuficiente si un
+    ingrediente quedaría en negativo. Después del commit, si se descontó o repuso,
+    hay que marcar("ingredientes") para las versiones del catálogo."""
+    pedido_ids = sorted(set(pedido_ids))
+    pedidos = bloquear_pedidos(cursor, pedido_ids)
+    no_encontrados = [pedido_id for pedido_id in pedido_ids if pedido_id not in pedidos]
+    if no_encontrados:
+        return no_encontrados, [], []
+
+    descontar, reponer = [], []
+    if stock_controlado():
+        if nuevo_estado == "en_preparacion":
+            descontar = [pedido_id for pedido_id, (_, descontado) in pedidos.items() if not descontado]
+        elif nuevo_estado == "cancelado":
+            reponer = _reponibles(pedidos)
+
+    if descontar:
+        registrar_consumo(cursor, descontar)
+        consumo = consumo_de(cursor, descontar)
+        if consumo:
+            stock = bloquear_ingredientes(cursor, consumo)
+            faltantes = [
+                {"id_ingrediente": ingrediente_id, "nombre": nombre,
+                 "disponible": float(cantidad or 0), "requerido": float(consumo[ingrediente_id])}
+                for ingrediente_id, (nombre, cantidad) in stock.items()
+                if (cantidad or 0) < consumo[ingrediente_id]
+            ]
+            if faltantes:
+                raise StockInsuficiente(faltantes)
+        mover_stock(cursor, descontar, -1)
+    elif reponer:
+        reponer_stock(cursor, reponer)
+
+    reactivados = preparar_cambio_estado(cursor, pedido_ids, nuevo_estado)
+    cursor.execute(f"""
+        UPDATE pedidos
+        SET estado = %s
+        WHERE id_pedido IN ({_placeholders(pedido_ids)})
+    """, [nuevo_estado] + pedido_ids)
+    ajustar_ventas_pedidos(cursor, reactivados, 1)
+    return [], descontar, reponer
@@ -0,0 +1,129 @@
+import datetime
+import json
+from decimal import Decimal
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # se usa json de la biblioteca estándar
+    orjson = None
+
+# ================================
+# Serialización JSON de la app
+# ================================
+# RapidoJSONProvider reemplaza al proveedor por defecto de Flask (app.json), así que lo
+# usan jsonify, stream_query y el cache del catálogo en todos los blueprints:
+#   Decimal  -> número
+#   datetime -> ISO 8601 "YYYY-MM-DDTHH:MM:SS" (lo entiende new Date() en todos los navegadores)
+#   date     -> "YYYY-MM-DD"
+#   tuplas   -> listas
+# Con orjson instalado se usa orjson; JSON_MOTOR = "json" fuerza la biblioteca estándar.
+#
+# EspecFilas convierte las tuplas del cursor en objetos según una lista de columnas,
+# o en formato tabular (?format=columns / ?format=rows) sin repetir los nombres por fila.
+
+if orjson is not None:
+    # orjson serializa datetime/date de forma nativa; Decimal pasa por _default
+    OPCIONES_ORJSON = orjson.OPT_NON_STR_KEYS
+
+
+def _default(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (datetime.datetime, datetime.date, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, datetime.timedelta):
+        return str(valor)
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    if isinstance(valor, bytes):
+        return valor.decode("utf-8", "replace")
+    raise TypeError(f"Objeto de tipo {type(valor).__name__} no serializable a JSON")
+
+
+class RapidoJSONProvider(DefaultJSONProvider):
+    motor = "orjson" if orjson is not None else "json"
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if self.motor == "orjson" and not kwargs:
+            return orjson.dumps(obj, default=_default, option=OPCIONES_ORJSON).decode()
+        kwargs.setdefault("default", _default)
+        kwargs.setdefault("ensure_ascii", False)
+        kwargs.setdefault("separators", (",", ":"))
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.motor == "orjson" and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps(obj), mimetype=self.mimetype)
+
+
+# ================================
+# Listados a partir de tuplas + especificación de columnas
+# ================================
+class EspecFilas:
+    """Nombres de salida de las columnas de un SELECT, en el mismo orden.
+
+    La consulta ya entrega cada columna lista para serializar (COALESCE para los valores
+    por defecto, Decimal/datetime los resuelve el proveedor), así que convertir una fila
+    es solo dict(zip(...)), hecho en C, sin conversiones valor por valor en Python.
+    """
+
+    def __init__(self, *nombres):
+        self.nombres = nombres
+
+    def objeto(self, fila):
+        return dict(zip(self.nombres, fila))
+
+    def objetos(self, filas):
+        nombres = self.nombres
+        return [dict(zip(nombres, fila)) for fila in filas]
+
+    def tabla(self, filas, formato=None):
+        """Listado en el formato pedido (ver formato_tabular):
+            None       [{columna: valor, ...}, ...]
+            "rows"     {"columns": [...], "rows": [[...], ...]}
+            "columns"  {"columns": [...], "data": [[valores de la columna 1], ...]}
+        """
+        if formato == "rows":
+            return {"columns": self.nombres, "rows": filas}
+        if formato == "columns":
+            datos = [list(columna) for columna in zip(*filas)] if filas else [[] for _ in self.nombres]
+            return {"columns": self.nombres, "data": datos}
+        return self.objetos(filas)
+
+
+# Media types equivalentes a ?format=columns / ?format=rows
+FORMATOS_TABULARES = {
+    "columns": "application/vnd.sweetland.columns+json",
+    "rows": "application/vnd.sweetland.rows+json",
+}
+
+
+def formato_tabular():
+    """"columns", "rows" o None según ?format= o la cabecera Accept (opcional para el cliente)"""
+    formato = request.args.get("format")
+    if formato in FORMATOS_TABULARES:
+        return formato
+    aceptados = {valor for valor, calidad in request.accept_mimetypes if calidad > 0}
+    for formato, mimetype in FORMATOS_TABULARES.items():
+        if mimetype in aceptados:
+            return formato
+    return None
+
+
+def init_app(app):
+    """Instala el proveedor en app.json (lo comparten todos los blueprints)"""
+    proveedor = RapidoJSONProvider(app)
+    motor = app.config.get("JSON_MOTOR")
+    if motor == "json" or (motor == "orjson" and orjson is not None):
+        proveedor.motor = motor
+    app.json = proveedor
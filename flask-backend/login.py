@@ -1,8 +1,9 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, session
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash
-from db import get_db_connection
+from hashing import hasher
+from db import get_db
 from models import User
+import busqueda
 
 auth_bp = Blueprint("auth_bp", __name__, url_prefix="/auth")
 
@@ -34,17 +35,18 @@ def registrarse():
     if User.get_by_email(email):
         return jsonify({"error": "El email ya está registrado"}), 400
 
-    hashed_pw = generate_password_hash(password)
+    hashed_pw = hasher.hash(password)
 
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("""
         INSERT INTO usuarios (nombre, email, password, telefono, direccion, rol)
         VALUES (%s, %s, %s, %s, %s, %s)
     """, (nombre, email, hashed_pw, telefono, direccion, rol))
+    usuario_id = cursor.lastrowid
     conn.commit()
     cursor.close()
-    conn.close()
+    busqueda.clientes.actualizar([usuario_id])
 
     return jsonify({"mensaje": "Usuario registrado con éxito"}), 201
 
@@ -68,6 +70,8 @@ def login():
     user = User.get_by_email(email)
     if user and user.check_password(password):
         login_user(user)
+        if current_app.config.get("USER_SESSION_CLAIMS"):
+            session["usuario"] = user.to_claims()
         return jsonify({
             "mensaje": "Login exitoso",
             "usuario": {
@@ -88,6 +92,7 @@ def login():
 @login_required
 def logout():
     logout_user()
+    session.pop("usuario", None)
     return jsonify({"mensaje": "Sesión cerrada"})
 
 # =========================
@@ -96,13 +101,17 @@ def logout():
 @auth_bp.route("/me", methods=["GET"])
 @login_required
 def get_current_user():
+    usuario = current_user
+    if current_app.config.get("USER_SESSION_CLAIMS"):
+        # Los claims de la sesión no traen los datos de contacto
+        usuario = User.get_cached(current_user.id) or current_user
     return jsonify({
         "usuario": {
-            "id": current_user.id,
-            "nombre": current_user.nombre,
-            "email": current_user.email, 
-            "telefono": current_user.telefono,
-            "direccion": current_user.direccion,
-            "rol": current_user.rol
+            "id": usuario.id,
+            "nombre": usuario.nombre,
+            "email": usuario.email, 
+            "telefono": usuario.telefono,
+            "direccion": usuario.direccion,
+            "rol": usuario.rol
         }
     })
\ No newline at end of file
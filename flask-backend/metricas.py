@@ -0,0 +1,189 @@
+import bisect
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+
+import db
+
+# ================================
+# Métricas en formato de texto de Prometheus
+# ================================
+# Se registran por endpoint de Flask (blueprint.función): latencia, códigos de estado,
+# peticiones en curso, y por sentencia SQL: duración, filas y consultas por request.
+# Todo se guarda en memoria del proceso; /metrics lo exporta.
+
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_SQL = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(nombres, valores, extra=""):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            valores = list(self._valores.items())
+        for clave, valor in valores:
+            lineas.extend(self._lineas(clave, valor))
+        return lineas
+
+    def _lineas(self, clave, valor):
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {valor}"]
+
+
+class Contador(Metrica):
+    tipo = "counter"
+
+    def inc(self, *etiquetas, valor=1):
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + valor
+
+
+class Gauge(Metrica):
+    tipo = "gauge"
+
+    def inc(self, *etiquetas, valor=1):
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + valor
+
+    def dec(self, *etiquetas):
+        self.inc(*etiquetas, valor=-1)
+
+
+class Histograma(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_HTTP):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = buckets
+
+    def observar(self, *etiquetas, valor):
+        # Se cuenta en un solo bucket y se acumula al exportar
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            datos = self._valores.get(etiquetas)
+            if datos is None:
+                datos = self._valores[etiquetas] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            datos[0][indice] += 1
+            datos[1] += valor
+            datos[2] += 1
+
+    def _lineas(self, clave, datos):
+        conteos, suma, total = datos
+        lineas = []
+        acumulado = 0
+        for limite, conteo in zip(self.buckets, conteos):
+            acumulado += conteo
+            etiquetas = _etiquetas(self.etiquetas, clave, 'le="%s"' % limite)
+            lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+        etiquetas = _etiquetas(self.etiquetas, clave, 'le="+Inf"')
+        lineas.append(f"{self.nombre}_bucket{etiquetas} {total}")
+        lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {suma}")
+        lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {total}")
+        return lineas
+
+
+http_peticiones = Contador(
+    "http_requests_total", "Peticiones HTTP por endpoint, método y código", ("endpoint", "method", "status"))
+http_duracion = Histograma(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("endpoint",), BUCKETS_HTTP)
+http_en_curso = Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso", ("endpoint",))
+sql_duracion = Histograma(
+    "db_query_duration_seconds", "Duración de las sentencias SQL", ("endpoint", "statement"), BUCKETS_SQL)
+sql_filas = Contador(
+    "db_rows_total", "Filas devueltas o afectadas por las sentencias SQL", ("endpoint", "statement"))
+sql_por_request = Histograma(
+    "db_queries_per_request", "Sentencias SQL ejecutadas por petición", ("endpoint",), BUCKETS_CONSULTAS)
+
+METRICAS = (http_peticiones, http_duracion, http_en_curso, sql_duracion, sql_filas, sql_por_request)
+
+
+def _endpoint():
+    if not has_request_context():
+        return "cli"
+    return request.endpoint or "sin_ruta"
+
+
+def _tipo_sentencia(sql):
+    partes = sql.split(None, 1)
+    return partes[0].upper() if partes else ""
+
+
+def observar_consulta(sql, params, duracion, filas):
+    endpoint = _endpoint()
+    sentencia = _tipo_sentencia(sql)
+    sql_duracion.observar(endpoint, sentencia, valor=duracion)
+    if filas:
+        sql_filas.inc(endpoint, sentencia, valor=filas)
+    g.consultas_sql = g.get("consultas_sql", 0) + 1
+
+
+def _exportar_pool():
+    lineas = []
+    for clave, valor in db.get_pool().stats().items():
+        nombre = f"db_pool_{clave}"
+        lineas += [f"# TYPE {nombre} gauge", f"{nombre} {valor}"]
+    return lineas
+
+
+def exportar():
+    lineas = []
+    for metrica in METRICAS:
+        lineas.extend(metrica.exportar())
+    lineas.extend(_exportar_pool())
+    return "\n".join(lineas) + "\n"
+
+
+def init_app(app):
+    if not app.config.get("METRICAS_HABILITADAS", True):
+        return
+
+    db.agregar_observador(observar_consulta)
+
+    @app.before_request
+    def iniciar_medicion():
+        g.metricas_inicio = time.perf_counter()
+        g.metricas_endpoint = _endpoint()
+        http_en_curso.inc(g.metricas_endpoint)
+
+    @app.after_request
+    def registrar_estado(response):
+        g.metricas_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def terminar_medicion(exc=None):
+        inicio = g.pop("metricas_inicio", None)
+        if inicio is None:
+            return
+        endpoint = g.pop("metricas_endpoint")
+        status = 500 if exc is not None else g.pop("metricas_status", 500)
+        http_en_curso.dec(endpoint)
+        http_duracion.observar(endpoint, valor=time.perf_counter() - inicio)
+        http_peticiones.inc(endpoint, request.method, str(status))
+        sql_por_request.observar(endpoint, valor=g.pop("consultas_sql", 0))
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(exportar(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,160 @@
+import click
+import mysql.connector
+
+from db import get_db
+import schema
+import inventario
+import resumen_pedidos
+import resumen_ventas
+
+# ================================
+# Migraciones del esquema (en orden; cada una se aplica una sola vez).
+# Cada paso es una sentencia SQL o una función que recibe el cursor.
+# ================================
+# Como MySQL hace commit con cada DDL, una migración que falla a la mitad deja sus
+# primeros pasos aplicados; al reintentarla se saltean las tablas, columnas e índices
+# que ya existen.
+YA_EXISTE = {
+    1050: "tabla",    # ER_TABLE_EXISTS_ERROR
+    1060: "columna",  # ER_DUP_FIELDNAME
+    1061: "índice",   # ER_DUP_KEYNAME
+}
+
+
+def _ejecutar(cursor, sentencia):
+    try:
+        cursor.execute(sentencia)
+    except mysql.connector.Error as e:
+        if e.errno not in YA_EXISTE:
+            raise
+        click.echo(f"  {YA_EXISTE[e.errno]} ya existente, se saltea: {e.msg}")
+
+
+def si_existe_columna(tabla, columna, sentencia):
+    """Paso que solo ejecuta la sentencia si la columna existe"""
+    def paso(cursor):
+        cursor.execute("""
+            SELECT COUNT(*)
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """, (tabla, columna))
+        if cursor.fetchone()[0]:
+            _ejecutar(cursor, sentencia)
+        else:
+            click.echo(f"  falta {tabla}.{columna}, se saltea: {sentencia}")
+    return paso
+
+
+MIGRACIONES = [
+    ("001_indices_listado_pedidos", [
+        # Paginación por cursor sobre (fecha_pedido, id_pedido) y filtros del listado
+        "CREATE INDEX idx_pedidos_fecha_id ON pedidos (fecha_pedido, id_pedido)",
+        # No todas las bases tienen pedidos.estado (el código lo consulta con schema.tiene)
+        si_existe_columna("pedidos", "estado",
+                          "CREATE INDEX idx_pedidos_estado_fecha_id ON pedidos (estado, fecha_pedido, id_pedido)"),
+        "CREATE INDEX idx_pedidos_usuario_fecha_id ON pedidos (usuario_id, fecha_pedido, id_pedido)",
+        "CREATE INDEX idx_pedidos_telefono ON pedidos (telefono)",
+        "CREATE INDEX idx_usuarios_nombre ON usuarios (nombre)",
+        "CREATE INDEX idx_detalle_pedidos_pedido ON detalle_pedidos (pedido_id)",
+    ]),
+    ("002_resumen_pedidos", [
+        # Conteo de líneas mantenido junto con total (ver resumen_pedidos.py)
+        "ALTER TABLE pedidos ADD COLUMN total_productos INT NOT NULL DEFAULT 0",
+        resumen_pedidos.reparar,
+    ]),
+    ("003_indices_recetas", [
+        # Índice inverso ingrediente -> productos para propagar cambios de costo
+        "CREATE INDEX idx_recetas_ingrediente_producto ON recetas (id_ingrediente, id_producto)",
+        "CREATE INDEX idx_recetas_producto_ingrediente ON recetas (id_producto, id_ingrediente)",
+    ]),
+    ("004_stock_descontado", [
+        # Marca de pedidos cuyo consumo ya se descontó de ingredientes (ver inventario.py)
+        "ALTER TABLE pedidos ADD COLUMN stock_descontado TINYINT(1) NOT NULL DEFAULT 0",
+    ]),
+    ("005_fulltext_busqueda", [
+        # Respaldo de /buscar cuando el índice en memoria no está disponible (ver busqueda.py)
+        "CREATE FULLTEXT INDEX ft_usuarios_busqueda ON usuarios (nombre, email, telefono)",
+        "CREATE FULLTEXT INDEX ft_productos_busqueda ON productos (nombre, categoria)",
+    ]),
+    ("006_resumen_ventas", [
+        # Ventas por día y por día/producto mantenidas incrementalmente (ver resumen_ventas.py)
+        "ALTER TABLE detalle_pedidos ADD COLUMN costo_unitario DECIMAL(12,2) NULL",
+        """CREATE TABLE ventas_diarias (
+            fecha DATE PRIMARY KEY,
+            pedidos INT NOT NULL DEFAULT 0,
+            lineas INT NOT NULL DEFAULT 0,
+            unidades DECIMAL(14,2) NOT NULL DEFAULT 0,
+            ingresos DECIMAL(14,2) NOT NULL DEFAULT 0,
+            costo DECIMAL(14,2) NOT NULL DEFAULT 0
+        )""",
+        """CREATE TABLE ventas_diarias_producto (
+            fecha DATE NOT NULL,
+            id_producto INT NOT NULL,
+            lineas INT NOT NULL DEFAULT 0,
+            unidades DECIMAL(14,2) NOT NULL DEFAULT 0,
+            ingresos DECIMAL(14,2) NOT NULL DEFAULT 0,
+            costo DECIMAL(14,2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (fecha, id_producto),
+            KEY idx_ventas_producto_fecha (id_producto, fecha)
+        )""",
+        resumen_ventas.reconstruir,
+    ]),
+    ("007_consumo_pedidos", [
+        # Consumo descontado a cada pedido, para reponer exactamente eso (ver inventario.py)
+        """CREATE TABLE consumo_pedidos (
+            pedido_id INT NOT NULL,
+            id_ingrediente INT NOT NULL,
+            cantidad DECIMAL(14,4) NOT NULL,
+            PRIMARY KEY (pedido_id, id_ingrediente)
+        )""",
+        inventario.registrar_descontados,
+    ]),
+]
+
+
+def _aplicadas(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            id VARCHAR(100) PRIMARY KEY,
+            aplicada_en DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT id FROM schema_migrations")
+    return {fila[0] for fila in cursor.fetchall()}
+
+
+def migrar():
+    """Aplica las migraciones pendientes y devuelve sus ids"""
+    conn = get_db()
+    cursor = conn.cursor()
+    aplicadas = _aplicadas(cursor)
+
+    nuevas = []
+    for id_migracion, sentencias in MIGRACIONES:
+        if id_migracion in aplicadas:
+            continue
+        # MySQL hace commit implícito con cada DDL: se registra al terminar todas
+        for sentencia in sentencias:
+            if callable(sentencia):
+                sentencia(cursor)
+            else:
+                _ejecutar(cursor, sentencia)
+        cursor.execute("INSERT INTO schema_migrations (id) VALUES (%s)", (id_migracion,))
+        conn.commit()
+        nuevas.append(id_migracion)
+
+    cursor.close()
+    if nuevas:
+        schema.refresh()
+    return nuevas
+
+
+def init_app(app):
+    @app.cli.command("migrate")
+    def migrate_command():
+        """Aplica las migraciones pendientes del esquema."""
+        nuevas = migrar()
+        if not nuevas:
+            click.echo("El esquema ya está actualizado")
+        for id_migracion in nuevas:
+            click.echo(f"Aplicada {id_migracion}")
@@ -1,6 +1,20 @@
 from flask_login import UserMixin
-from werkzeug.security import check_password_hash, generate_password_hash
-from db import get_db_connection
+import threading
+import time
+from collections import OrderedDict
+from db import query_one, execute
+from hashing import hasher
+from cache import TTLCache
+
+# Cache de usuarios para el user_loader de Flask-Login (se ajusta en configure_user_cache)
+user_cache = TTLCache(maxsize=1000, ttl=60)
+
+# id -> momento de la última modificación; invalida claims de sesión anteriores.
+# Una entrada solo importa mientras puedan seguir vigentes claims validados antes que
+# ella, o sea USER_REVALIDATE_SECONDS: las más viejas se descartan (en orden de llegada)
+_invalidados = OrderedDict()
+_invalidados_lock = threading.Lock()
+_invalidados_max_age = 300
 
 class User(UserMixin):
     def __init__(self, id, nombre, email, password, telefono=None, direccion=None, rol='cliente'):
@@ -12,48 +26,106 @@ class User(UserMixin):
         self.direccion = direccion
         self.rol = rol
 
+    @staticmethod
+    def from_row(row):
+        return User(
+            id=row["id_usuario"],
+            nombre=row["nombre"],
+            email=row["email"],
+            password=row["password"],
+            telefono=row.get("telefono"),
+            direccion=row.get("direccion"),
+            rol=row.get("rol", "cliente")
+        )
+
     @staticmethod
     def get_by_email(email):
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM usuarios WHERE email = %s", (email,))
-        row = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        if row:
-            return User(
-                id=row["id_usuario"],
-                nombre=row["nombre"],
-                email=row["email"],
-                password=row["password"],
-                telefono=row.get("telefono"),
-                direccion=row.get("direccion"),
-                rol=row.get("rol", "cliente")
-            )
-        return None
+        row = query_one("SELECT * FROM usuarios WHERE email = %s", (email,), dictionary=True)
+        return User.from_row(row) if row else None
 
     @staticmethod
     def get_by_id(user_id):
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM usuarios WHERE id_usuario = %s", (user_id,))
-        row = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        if row:
-            return User(
-                id=row["id_usuario"],
-                nombre=row["nombre"],
-                email=row["email"],
-                password=row["password"],
-                telefono=row.get("telefono"),
-                direccion=row.get("direccion"),
-                rol=row.get("rol", "cliente")
-            )
-        return None
+        row = query_one("SELECT * FROM usuarios WHERE id_usuario = %s", (user_id,), dictionary=True)
+        return User.from_row(row) if row else None
+
+    @staticmethod
+    def get_cached(user_id):
+        """get_by_id pasando por el cache en memoria"""
+        key = str(user_id)
+        user = user_cache.get(key)
+        if user is None:
+            user = User.get_by_id(user_id)
+            if user is not None:
+                user_cache.set(key, user)
+        return user
+
+    # ================================
+    # Claims para el modo de sesión firmada
+    # ================================
+    # La cookie está firmada pero no cifrada: solo lo necesario para autorizar,
+    # sin datos de contacto
+    def to_claims(self):
+        return {
+            "id": self.id,
+            "nombre": self.nombre,
+            "rol": self.rol,
+            "validado": time.time(),
+        }
+
+    @staticmethod
+    def from_claims(claims):
+        # Sin hash de contraseña ni datos de contacto: el login siempre pasa por
+        # get_by_email y /auth/me los lee con get_cached
+        return User(
+            id=claims["id"],
+            nombre=claims.get("nombre"),
+            email=claims.get("email"),
+            password=None,
+            telefono=claims.get("telefono"),
+            direccion=claims.get("direccion"),
+            rol=claims.get("rol", "cliente")
+        )
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        if not hasher.verify(self.password, password):
+            return False
+        # Actualizar el hash si se generó con parámetros anteriores
+        if hasher.needs_rehash(self.password):
+            self.password = hasher.hash(password)
+            execute("UPDATE usuarios SET password = %s WHERE id_usuario = %s",
+                    (self.password, self.id))
+            invalidate_user(self.id)
+        return True
 
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = hasher.hash(password)
+
+
+def configure_user_cache(maxsize, ttl):
+    user_cache.maxsize = maxsize
+    user_cache.ttl = ttl
+
+
+def configure_claims(max_age):
+    global _invalidados_max_age
+    _invalidados_max_age = max_age
+
+
+def invalidate_user(user_id):
+    """Descarta el usuario del cache y fuerza revalidar sus claims de sesión"""
+    user_cache.invalidate(str(user_id))
+    ahora = time.time()
+    with _invalidados_lock:
+        _invalidados[str(user_id)] = ahora
+        _invalidados.move_to_end(str(user_id))
+        while next(iter(_invalidados.values())) < ahora - _invalidados_max_age:
+            _invalidados.popitem(last=False)
+
+
+def claims_vigentes(claims, max_age):
+    """True si los claims se validaron hace menos de max_age segundos
+    y el usuario no se modificó desde entonces."""
+    validado = claims.get("validado", 0)
+    if time.time() - validado > max_age:
+        return False
+    return _invalidados.get(str(claims.get("id")), 0) < validado
@@ -1,109 +1,251 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required
-from extensions import mysql
+from db import LIKE_ESCAPE, escapar_like, get_db, transaction
+import schema
+from resumen_pedidos import ajustar_resumen, resumen_mantenido
+from resumen_ventas import ajustar_ventas_lineas, ajustar_ventas_pedidos
+from inventario import ESTADOS_PEDIDO, StockInsuficiente, cambiar_estado, preparar_eliminacion
+from versiones import marcar
 import logging
-from werkzeug.security import generate_password_hash
+from hashing import hasher
+from json_rapido import EspecFilas, formato_tabular
+from campos import Campos, CamposInvalidos
+import busqueda
 import secrets
 import string
+import base64
+from datetime import datetime, timedelta
 
-# Configurar logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 pedidos_bp = Blueprint("pedidos", __name__, url_prefix="/pedidos")
 
+# ================================
+# Consultas precompiladas según las columnas opcionales (ver schema.py)
+# ================================
+# Columnas del listado. Con la migración 002 total_productos se lee de pedidos;
+# sin ella se cuenta con una subconsulta por fila de la página
+SQL_CONTEO_LINEAS = "(SELECT COUNT(*) FROM detalle_pedidos dp WHERE dp.pedido_id = p.id_pedido)"
+
+# Las columnas salen en el orden y con los valores por defecto de la respuesta
+# (ver ESPEC_PEDIDOS); fecha_pedido e id_pedido quedan en 3 y 0 para el cursor
+SQL_PEDIDOS_COLUMNAS = """
+    p.id_pedido, 
+    COALESCE(NULLIF(u.nombre, ''), 'Cliente no registrado') AS cliente_nombre,
+    COALESCE(NULLIF(u.telefono, ''), 'Sin teléfono') AS cliente_telefono,
+    p.fecha_pedido, 
+    {estado} AS estado,
+    COALESCE(p.total, 0) AS total,
+    COALESCE(NULLIF(p.direccion, ''), 'Sin dirección') AS direccion,
+    {total_productos} AS total_productos
+"""
+SQL_ESTADO = "COALESCE(NULLIF(p.estado, ''), 'pendiente')"
+SQL_ESTADO_POR_DEFECTO = "'pendiente'"
+
+ESPEC_PEDIDOS = EspecFilas(
+    "id", "cliente_nombre", "cliente_telefono", "fecha_pedido",
+    "estado", "total", "direccion", "total_productos"
+)
+
+SQL_PEDIDOS = """
+    SELECT {columnas}
+    FROM pedidos p
+    LEFT JOIN usuarios u ON p.usuario_id = u.id_usuario
+    {where}
+    ORDER BY p.fecha_pedido DESC, p.id_pedido DESC
+"""
+
+JOIN_USUARIOS = "LEFT JOIN usuarios u ON p.usuario_id = u.id_usuario"
+
+def campos_pedidos(tiene_estado, detalle=False):
+    """Campos de ?fields= para el listado (o el detalle, que usa id_pedido y son también
+    los campos por defecto). El JOIN a usuarios solo se hace si se piden datos del cliente."""
+    columnas = {
+        "id_pedido" if detalle else "id": "p.id_pedido",
+        "cliente_nombre": ("COALESCE(NULLIF(u.nombre, ''), 'Cliente no registrado')", "u"),
+        "cliente_telefono": ("COALESCE(NULLIF(u.telefono, ''), 'Sin teléfono')", "u"),
+        "fecha_pedido": "p.fecha_pedido",
+        "estado": SQL_ESTADO if tiene_estado else SQL_ESTADO_POR_DEFECTO,
+        "total": "COALESCE(p.total, 0)",
+        "direccion": "COALESCE(NULLIF(p.direccion, ''), 'Sin dirección')",
+    }
+    if not detalle:
+        columnas["total_productos"] = "p.total_productos" if resumen_mantenido() else SQL_CONTEO_LINEAS
+    return Campos("pedidos p", columnas, {"u": JOIN_USUARIOS})
+
+SQL_DETALLES_CON_PRECIO = """
+    SELECT 
+        dp.id_detalle,
+        dp.producto_id,
+        p.nombre AS producto_nombre,
+        p.categoria,
+        dp.cantidad,
+        COALESCE(dp.precio_unitario, 0) AS precio_unitario,
+        COALESCE(dp.subtotal, 0) AS subtotal
+    FROM detalle_pedidos dp
+    INNER JOIN productos p ON dp.producto_id = p.id_producto
+    WHERE dp.pedido_id = %s
+"""
+
+# Sin precio_unitario se calcula a partir de subtotal / cantidad
+SQL_DETALLES_SIN_PRECIO = """
+    SELECT 
+        dp.id_detalle,
+        dp.producto_id,
+        p.nombre AS producto_nombre,
+        p.categoria,
+        COALESCE(NULLIF(dp.cantidad, 0), 1) AS cantidad,
+        COALESCE(dp.subtotal, 0) / COALESCE(NULLIF(dp.cantidad, 0), 1) AS precio_unitario,
+        COALESCE(dp.subtotal, 0) AS subtotal
+    FROM detalle_pedidos dp
+    INNER JOIN productos p ON dp.producto_id = p.id_producto
+    WHERE dp.pedido_id = %s
+"""
+
+ESPEC_DETALLES = EspecFilas(
+    "id", "producto_id", "producto_nombre", "categoria", "cantidad", "precio_unitario", "subtotal"
+)
+
+# ================================
+# Paginación por cursor (keyset) y filtros del listado
+# ================================
+PEDIDOS_LIMITE_MAXIMO = 200
+
+def codificar_cursor(fecha_pedido, id_pedido):
+    valor = f"{fecha_pedido.isoformat()}|{id_pedido}"
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+def decodificar_cursor(cursor):
+    fecha, id_pedido = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(fecha), int(id_pedido)
+
+def _parsear_fecha(valor, fin_de_rango=False):
+    fecha = datetime.fromisoformat(valor)
+    # Una fecha sin hora como límite superior incluye todo ese día
+    if fin_de_rango and len(valor) == 10:
+        fecha += timedelta(days=1)
+    return fecha
+
+def filtros_pedidos(args, tiene_estado):
+    """Traduce los parámetros del query string a condiciones WHERE.
+    Lanza ValueError si algún valor no es válido."""
+    condiciones, params = [], []
+
+    estado = args.get("estado")
+    if estado and tiene_estado:
+        condiciones.append("p.estado = %s")
+        params.append(estado)
+
+    if args.get("desde"):
+        condiciones.append("p.fecha_pedido >= %s")
+        params.append(_parsear_fecha(args["desde"]))
+
+    if args.get("hasta"):
+        hasta = args["hasta"]
+        condiciones.append("p.fecha_pedido < %s" if len(hasta) == 10 else "p.fecha_pedido <= %s")
+        params.append(_parsear_fecha(hasta, fin_de_rango=True))
+
+    if args.get("usuario_id"):
+        condiciones.append("p.usuario_id = %s")
+        params.append(int(args["usuario_id"]))
+
+    # Búsquedas por prefijo para que puedan usar los índices
+    if args.get("cliente"):
+        condiciones.append(f"u.nombre LIKE %s {LIKE_ESCAPE}")
+        params.append(escapar_like(args["cliente"]) + "%")
+
+    if args.get("telefono"):
+        condiciones.append(f"p.telefono LIKE %s {LIKE_ESCAPE}")
+        params.append(escapar_like(args["telefono"]) + "%")
+
+    return condiciones, params
+
 @pedidos_bp.route("/", methods=["GET"])
 @login_required
 def get_pedidos():
+    """Lista pedidos del más reciente al más antiguo.
+
+    Con ?limit= y/o ?cursor= responde por páginas: {"pedidos": [...], "next_cursor": ...}.
+    Sin ellos devuelve la lista completa (compatibilidad). Filtros opcionales:
+    estado, desde, hasta, usuario_id, cliente (prefijo del nombre), telefono (prefijo).
+    ?format=columns|rows devuelve los pedidos en formato tabular (ver json_rapido.py).
+    ?fields=id,total lee solo esas columnas (ver campos_pedidos).
+    """
     try:
-        logger.debug("Ejecutando consulta de pedidos")
-        cursor = mysql.connection.cursor()
-        
-        # Primero verificar si existe el campo 'estado'
-        cursor.execute("SHOW COLUMNS FROM pedidos LIKE 'estado'")
-        tiene_estado = cursor.fetchone()
-        
-        if tiene_estado:
-            # Consulta CON campo estado
-            cursor.execute("""
-                SELECT 
-                    p.id_pedido, 
-                    u.nombre AS cliente_nombre,
-                    u.telefono AS cliente_telefono,
-                    p.fecha_pedido, 
-                    p.estado,
-                    p.total,
-                    p.direccion,
-                    COUNT(dp.id_detalle) as total_productos
-                FROM pedidos p
-                LEFT JOIN usuarios u ON p.usuario_id = u.id_usuario
-                LEFT JOIN detalle_pedidos dp ON p.id_pedido = dp.pedido_id
-                GROUP BY p.id_pedido, u.nombre, u.telefono
-                ORDER BY p.fecha_pedido DESC
-            """)
+        tiene_estado = schema.tiene("pedidos", "estado")
+        paginado = "limit" in request.args or "cursor" in request.args
+        campos = campos_pedidos(tiene_estado)
+        nombres = campos.solicitados()
+
+        try:
+            condiciones, params = filtros_pedidos(request.args, tiene_estado)
+            if paginado:
+                limit = min(max(int(request.args.get("limit", 50)), 1), PEDIDOS_LIMITE_MAXIMO)
+                if request.args.get("cursor"):
+                    fecha, id_pedido = decodificar_cursor(request.args["cursor"])
+                    condiciones.append(
+                        "(p.fecha_pedido < %s OR (p.fecha_pedido = %s AND p.id_pedido < %s))"
+                    )
+                    params.extend([fecha, fecha, id_pedido])
+        except (ValueError, TypeError):
+            return jsonify({"error": "Parámetros de consulta no válidos"}), 400
+
+        where = "WHERE " + " AND ".join(condiciones) if condiciones else ""
+        if nombres:
+            # fecha_pedido e id_pedido van al final, fuera de la respuesta, para el cursor
+            sql = campos.sql(
+                nombres, where, "ORDER BY p.fecha_pedido DESC, p.id_pedido DESC",
+                extra=("p.fecha_pedido", "p.id_pedido"),
+                joins_extra=("u",) if request.args.get("cliente") else ()
+            )
         else:
-            # Consulta SIN campo estado
-            cursor.execute("""
-                SELECT 
-                    p.id_pedido, 
-                    u.nombre AS cliente_nombre,
-                    u.telefono AS cliente_telefono,
-                    p.fecha_pedido, 
-                    p.total,
-                    p.direccion,
-                    p.telefono,
-                    COUNT(dp.id_detalle) as total_productos
-                FROM pedidos p
-                LEFT JOIN usuarios u ON p.usuario_id = u.id_usuario
-                LEFT JOIN detalle_pedidos dp ON p.id_pedido = dp.pedido_id
-                GROUP BY p.id_pedido, u.nombre, u.telefono
-                ORDER BY p.fecha_pedido DESC
-            """)
+            sql = SQL_PEDIDOS.format(
+                columnas=SQL_PEDIDOS_COLUMNAS.format(
+                    estado=SQL_ESTADO if tiene_estado else SQL_ESTADO_POR_DEFECTO,
+                    total_productos="p.total_productos" if resumen_mantenido() else SQL_CONTEO_LINEAS
+                ),
+                where=where,
+            )
+        if paginado:
+            # Una fila extra indica si hay página siguiente
+            sql += " LIMIT %s"
+            params.append(limit + 1)
+
+        cursor = get_db().cursor()
+        cursor.execute(sql, params)
         
         filas = cursor.fetchall()
-        logger.debug(f"Pedidos encontrados: {len(filas)}")
-        
         cursor.close()
+        logger.debug("Pedidos encontrados: %d", len(filas))
 
-        pedidos = []
-        for f in filas:
-            if tiene_estado:
-                pedido = {
-                    "id": f[0],
-                    "cliente_nombre": f[1] or "Cliente no registrado",
-                    "cliente_telefono": f[2] or "Sin teléfono",
-                    "fecha_pedido": f[3].strftime('%Y-%m-%d %H:%M:%S') if f[3] else None,
-                    "estado": f[4] or "pendiente",
-                    "total": float(f[5]) if f[5] else 0,
-                    "direccion": f[6] or "Sin dirección",
-                    "total_productos": f[7]
-                }
-            else:
-                pedido = {
-                    "id": f[0],
-                    "cliente_nombre": f[1] or "Cliente no registrado",
-                    "cliente_telefono": f[2] or "Sin teléfono",
-                    "fecha_pedido": f[3].strftime('%Y-%m-%d %H:%M:%S') if f[3] else None,
-                    "estado": "pendiente",  # Valor por defecto
-                    "total": float(f[4]) if f[4] else 0,
-                    "direccion": f[5] or "Sin dirección",
-                    "total_productos": f[7]
-                }
-            pedidos.append(pedido)
-            logger.debug(f"Pedido procesado: {pedido}")
-
-        return jsonify(pedidos)
+        hay_siguiente = paginado and len(filas) > limit
+        if hay_siguiente:
+            filas = filas[:limit]
+
+        if nombres:
+            ultima = (filas[-1][-2], filas[-1][-1]) if filas else None
+            pedidos = campos.espec(nombres).tabla([f[:-2] for f in filas], formato_tabular())
+        else:
+            ultima = (filas[-1][3], filas[-1][0]) if filas else None
+            pedidos = ESPEC_PEDIDOS.tabla(filas, formato_tabular())
+
+        if not paginado:
+            return jsonify(pedidos)
+
+        next_cursor = codificar_cursor(*ultima) if hay_siguiente else None
+        return jsonify({"pedidos": pedidos, "next_cursor": next_cursor})
         
+    except CamposInvalidos:
+        raise
     except Exception as e:
-        logger.error(f"Error en get_pedidos: {str(e)}")
+        logger.exception("Error en get_pedidos")
         return jsonify({"error": f"Error del servidor: {str(e)}"}), 500
 
 @pedidos_bp.route("/<int:id>/detalles", methods=["GET"])
 @login_required
 def get_detalles_pedido(id):
     try:
-        logger.debug(f"Solicitando detalles del pedido {id}")
-        cursor = mysql.connection.cursor()
+        cursor = get_db().cursor()
         
         # Verificar que el pedido existe
         cursor.execute("SELECT id_pedido FROM pedidos WHERE id_pedido = %s", (id,))
@@ -113,139 +255,40 @@ def get_detalles_pedido(id):
             cursor.close()
             return jsonify({"error": f"Pedido {id} no encontrado"}), 404
         
-        # Verificar si existe precio_unitario en detalle_pedidos
-        cursor.execute("SHOW COLUMNS FROM detalle_pedidos LIKE 'precio_unitario'")
-        tiene_precio_unitario = cursor.fetchone()
-        
-        if tiene_precio_unitario:
-            # Consulta CON precio_unitario
-            cursor.execute("""
-                SELECT 
-                    dp.id_detalle,
-                    dp.producto_id,
-                    p.nombre AS producto_nombre,
-                    p.categoria,
-                    dp.cantidad,
-                    dp.precio_unitario,
-                    dp.subtotal
-                FROM detalle_pedidos dp
-                INNER JOIN productos p ON dp.producto_id = p.id_producto
-                WHERE dp.pedido_id = %s
-            """, (id,))
-        else:
-            # Consulta SIN precio_unitario - calcularlo
-            cursor.execute("""
-                SELECT 
-                    dp.id_detalle,
-                    dp.producto_id,
-                    p.nombre AS producto_nombre,
-                    p.categoria,
-                    dp.cantidad,
-                    dp.subtotal,
-                    p.precio as precio_referencia
-                FROM detalle_pedidos dp
-                INNER JOIN productos p ON dp.producto_id = p.id_producto
-                WHERE dp.pedido_id = %s
-            """, (id,))
+        tiene_precio_unitario = schema.tiene("detalle_pedidos", "precio_unitario")
+        cursor.execute(
+            SQL_DETALLES_CON_PRECIO if tiene_precio_unitario else SQL_DETALLES_SIN_PRECIO,
+            (id,)
+        )
         
         detalles = cursor.fetchall()
         cursor.close()
         
-        logger.debug(f"Detalles encontrados para pedido {id}: {len(detalles)}")
-        
-        detalles_formateados = []
-        for detalle in detalles:
-            if tiene_precio_unitario:
-                detalle_info = {
-                    "id": detalle[0],
-                    "producto_id": detalle[1],
-                    "producto_nombre": detalle[2],
-                    "categoria": detalle[3],
-                    "cantidad": detalle[4],
-                    "precio_unitario": float(detalle[5]) if detalle[5] else 0,
-                    "subtotal": float(detalle[6]) if detalle[6] else 0
-                }
-            else:
-                # Calcular precio unitario basado en subtotal / cantidad
-                cantidad = detalle[4] or 1
-                subtotal = float(detalle[5]) if detalle[5] else 0
-                precio_unitario = subtotal / cantidad if cantidad > 0 else 0
-                
-                detalle_info = {
-                    "id": detalle[0],
-                    "producto_id": detalle[1],
-                    "producto_nombre": detalle[2],
-                    "categoria": detalle[3],
-                    "cantidad": cantidad,
-                    "precio_unitario": precio_unitario,
-                    "subtotal": subtotal
-                }
-            detalles_formateados.append(detalle_info)
-            logger.debug(f"Detalle: {detalle_info}")
-
-        return jsonify(detalles_formateados)
+        logger.debug("Detalles encontrados para pedido %s: %d", id, len(detalles))
+        
+        return jsonify(ESPEC_DETALLES.tabla(detalles, formato_tabular()))
         
     except Exception as e:
-        logger.error(f"Error en get_detalles_pedido: {str(e)}")
+        logger.exception("Error en get_detalles_pedido")
         return jsonify({"error": f"Error del servidor: {str(e)}"}), 500
 
 @pedidos_bp.route("/<int:id>", methods=["GET"])
 @login_required
 def get_pedido(id):
     try:
-        cursor = mysql.connection.cursor()
-        
-        # Verificar si existe el campo 'estado'
-        cursor.execute("SHOW COLUMNS FROM pedidos LIKE 'estado'")
-        tiene_estado = cursor.fetchone()
-        
-        if tiene_estado:
-            cursor.execute("""
-                SELECT p.id_pedido, u.nombre, u.telefono, p.fecha_pedido, 
-                       p.estado, p.total, p.direccion
-                FROM pedidos p
-                LEFT JOIN usuarios u ON p.usuario_id = u.id_usuario
-                WHERE p.id_pedido = %s
-            """, (id,))
-        else:
-            cursor.execute("""
-                SELECT p.id_pedido, u.nombre, u.telefono, p.fecha_pedido, 
-                       p.total, p.direccion
-                FROM pedidos p
-                LEFT JOIN usuarios u ON p.usuario_id = u.id_usuario
-                WHERE p.id_pedido = %s
-            """, (id,))
-            
-        f = cursor.fetchone()
-        cursor.close()
-        
-        if not f:
+        tiene_estado = schema.tiene("pedidos", "estado")
+        campos = campos_pedidos(tiene_estado, detalle=True)
+        # Sin ?fields= van todos; fecha_pedido sale en ISO 8601 igual que en el listado
+        nombres = campos.solicitados() or list(campos.columnas)
+        pedido = campos.fila(nombres, "WHERE p.id_pedido = %s", (id,))
+        if pedido is None:
             return jsonify({"error": "Pedido no encontrado"}), 404
-
-        if tiene_estado:
-            pedido = {
-                "id_pedido": f[0],
-                "cliente_nombre": f[1] or "Cliente no registrado",
-                "cliente_telefono": f[2] or "Sin teléfono",
-                "fecha_pedido": f[3].strftime('%Y-%m-%d %H:%M:%S') if f[3] else None,
-                "estado": f[4] or "pendiente",
-                "total": float(f[5]) if f[5] else 0,
-                "direccion": f[6] or "Sin dirección"
-            }
-        else:
-            pedido = {
-                "id_pedido": f[0],
-                "cliente_nombre": f[1] or "Cliente no registrado",
-                "cliente_telefono": f[2] or "Sin teléfono",
-                "fecha_pedido": f[3].strftime('%Y-%m-%d %H:%M:%S') if f[3] else None,
-                "estado": "pendiente",
-                "total": float(f[4]) if f[4] else 0,
-                "direccion": f[5] or "Sin dirección"
-            }
         return jsonify(pedido)
         
+    except CamposInvalidos:
+        raise
     except Exception as e:
-        logger.error(f"Error en get_pedido: {str(e)}")
+        logger.exception("Error en get_pedido")
         return jsonify({"error": f"Error del servidor: {str(e)}"}), 500
 
 @pedidos_bp.route("/<int:id>", methods=["PUT"])
@@ -258,46 +301,57 @@ def update_pedido(id):
         telefono = data.get("telefono")
         estado = data.get("estado")
 
-        cursor = mysql.connection.cursor()
-        
-        # Verificar si existe el campo 'estado'
-        cursor.execute("SHOW COLUMNS FROM pedidos LIKE 'estado'")
-        tiene_estado = cursor.fetchone()
-        
-        if tiene_estado and estado:
-            cursor.execute("""
-                UPDATE pedidos 
-                SET total=%s, direccion=%s, telefono=%s, estado=%s 
-                WHERE id_pedido=%s
-            """, (total, direccion, telefono, estado, id))
+        if not schema.tiene("pedidos", "estado"):
+            estado = None
+
+        def actualizar(cursor):
+            if resumen_mantenido():
+                # El total se calcula a partir de las líneas del pedido
+                cursor.execute("""
+                    UPDATE pedidos 
+                    SET direccion=%s, telefono=%s
+                    WHERE id_pedido=%s
+                """, (direccion, telefono, id))
+            else:
+                cursor.execute("""
+                    UPDATE pedidos 
+                    SET total=%s, direccion=%s, telefono=%s
+                    WHERE id_pedido=%s
+                """, (total, direccion, telefono, id))
+
+        if estado:
+            # El estado pasa por inventario y resumen de ventas, en la misma transacción
+            respuesta, status = _cambiar_estado([id], estado, antes=actualizar)
+            if status != 200:
+                return jsonify(respuesta), status
         else:
-            cursor.execute("""
-                UPDATE pedidos 
-                SET total=%s, direccion=%s, telefono=%s
-                WHERE id_pedido=%s
-            """, (total, direccion, telefono, id))
-            
-        mysql.connection.commit()
-        cursor.close()
+            with transaction() as cursor:
+                actualizar(cursor)
         return jsonify({"mensaje": "Pedido actualizado correctamente"})
         
     except Exception as e:
-        logger.error(f"Error en update_pedido: {str(e)}")
+        logger.exception("Error en update_pedido")
         return jsonify({"error": f"Error del servidor: {str(e)}"}), 500
 
 @pedidos_bp.route("/<int:id>", methods=["DELETE"])
 @login_required
 def delete_pedido(id):
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute("DELETE FROM detalle_pedidos WHERE pedido_id = %s", (id,))
-        cursor.execute("DELETE FROM pedidos WHERE id_pedido = %s", (id,))
-        mysql.connection.commit()
-        cursor.close()
-        return jsonify({"mensaje": "Pedido eliminado correctamente"})
+        # Stock, resumen de ventas y borrado en una sola transacción (con el pedido bloqueado)
+        with transaction() as cursor:
+            no_encontrados, repuestos = preparar_eliminacion(cursor, [id])
+            if no_encontrados:
+                return jsonify({"error": "Pedido no encontrado"}), 404
+            ajustar_ventas_pedidos(cursor, [id], -1)
+            cursor.execute("DELETE FROM detalle_pedidos WHERE pedido_id = %s", (id,))
+            cursor.execute("DELETE FROM pedidos WHERE id_pedido = %s", (id,))
+
+        if repuestos:
+            marcar("ingredientes")
+        return jsonify({"mensaje": "Pedido eliminado correctamente", "stock_repuesto": repuestos})
         
     except Exception as e:
-        logger.error(f"Error en delete_pedido: {str(e)}")
+        logger.exception("Error en delete_pedido")
         return jsonify({"error": f"Error del servidor: {str(e)}"}), 500
 
 @pedidos_bp.route("/", methods=["POST"])
@@ -310,14 +364,13 @@ def create_pedido():
         cliente_telefono = data.get("telefono")
         direccion = data.get("direccion")
         total = data.get("total", 0)
+        if resumen_mantenido():
+            # El total se acumula al agregar las líneas del pedido
+            total = 0
         
-        cursor = mysql.connection.cursor()
-        
-        # Verificar si existe el campo 'estado'
-        cursor.execute("SHOW COLUMNS FROM pedidos LIKE 'estado'")
-        tiene_estado = cursor.fetchone()
+        cursor = get_db().cursor()
 
-        if tiene_estado:
+        if schema.tiene("pedidos", "estado"):
             cursor.execute("""
                 INSERT INTO pedidos (usuario_id, telefono, direccion, total, estado, fecha_pedido)
                 VALUES (%s, %s, %s, %s, 'pendiente', NOW())
@@ -329,11 +382,10 @@ def create_pedido():
             """, (usuario_id, cliente_telefono, direccion, total))
         
         pedido_id = cursor.lastrowid
-        mysql.connection.commit()
+        ajustar_ventas_pedidos(cursor, [pedido_id], 1)
+        get_db().commit()
         cursor.close()
-        
-        # ✅ DEBUG: Verificar qué ID se está devolviendo
-        print(f"🎯 [BACKEND] Pedido creado con ID: {pedido_id}")
+        logger.debug("Pedido creado con ID %s", pedido_id)
         
         return jsonify({
             "mensaje": "Pedido creado correctamente",
@@ -341,68 +393,177 @@ def create_pedido():
         }), 201
         
     except Exception as e:
-        logger.error(f"Error en create_pedido: {str(e)}")
+        logger.exception("Error en create_pedido")
+        return jsonify({"error": f"Error del servidor: {str(e)}"}), 500
+
+@pedidos_bp.route("/completo", methods=["POST"])
+@login_required
+def create_pedido_completo():
+    """Crea el pedido con todas sus líneas en una sola transacción.
+
+    Body: {usuario_id, telefono, direccion, detalles: [{producto_id, cantidad}, ...]}
+    Los precios y el total se calculan en el servidor a partir de productos.precio.
+    """
+    try:
+        data = request.get_json() or {}
+        detalles = data.get("detalles") or []
+
+        if not detalles:
+            return jsonify({"error": "El pedido debe tener al menos un producto"}), 400
+        try:
+            lineas = [(int(d["producto_id"]), int(d["cantidad"])) for d in detalles]
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "Cada detalle requiere producto_id y cantidad numéricos"}), 400
+        if any(cantidad < 1 for _, cantidad in lineas):
+            return jsonify({"error": "La cantidad debe ser mayor que cero"}), 400
+
+        producto_ids = sorted({producto_id for producto_id, _ in lineas})
+        placeholders = ", ".join(["%s"] * len(producto_ids))
+
+        with transaction() as cursor:
+            # Validar todos los productos con una sola consulta
+            cursor.execute(
+                f"SELECT id_producto, precio FROM productos WHERE id_producto IN ({placeholders})",
+                producto_ids
+            )
+            precios = dict(cursor.fetchall())
+            faltantes = [producto_id for producto_id in producto_ids if producto_id not in precios]
+            if faltantes:
+                return jsonify({"error": f"Productos no encontrados: {faltantes}"}), 404
+
+            filas = [
+                (producto_id, cantidad, precios[producto_id], precios[producto_id] * cantidad)
+                for producto_id, cantidad in lineas
+            ]
+            total = sum(fila[3] for fila in filas)
+
+            if schema.tiene("pedidos", "estado"):
+                cursor.execute("""
+                    INSERT INTO pedidos (usuario_id, telefono, direccion, total, estado, fecha_pedido)
+                    VALUES (%s, %s, %s, %s, 'pendiente', NOW())
+                """, (data.get("usuario_id"), data.get("telefono"), data.get("direccion"), total))
+            else:
+                cursor.execute("""
+                    INSERT INTO pedidos (usuario_id, telefono, direccion, total, fecha_pedido)
+                    VALUES (%s, %s, %s, %s, NOW())
+                """, (data.get("usuario_id"), data.get("telefono"), data.get("direccion"), total))
+            pedido_id = cursor.lastrowid
+
+            # executemany agrupa las líneas en un único INSERT multi-fila
+            if schema.tiene("detalle_pedidos", "precio_unitario"):
+                cursor.executemany("""
+                    INSERT INTO detalle_pedidos (pedido_id, producto_id, cantidad, precio_unitario, subtotal)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, [(pedido_id,) + fila for fila in filas])
+            else:
+                cursor.executemany("""
+                    INSERT INTO detalle_pedidos (pedido_id, producto_id, cantidad, subtotal)
+                    VALUES (%s, %s, %s, %s)
+                """, [(pedido_id, fila[0], fila[1], fila[3]) for fila in filas])
+
+            # El total ya se insertó con el encabezado; solo falta el conteo de líneas
+            ajustar_resumen(cursor, pedido_id, len(filas), 0)
+            ajustar_ventas_pedidos(cursor, [pedido_id], 1)
+
+        return jsonify({
+            "mensaje": "Pedido creado correctamente",
+            "id_pedido": pedido_id,
+            "total": float(total),
+            "total_productos": len(filas)
+        }), 201
+        
+    except Exception as e:
+        logger.exception("Error en create_pedido_completo")
         return jsonify({"error": f"Error del servidor: {str(e)}"}), 500
 
+def _cambiar_estado(pedido_ids, nuevo_estado, antes=None):
+    """Cambio de estado transaccional compartido por la ruta individual, la de lote y
+    update_pedido. antes(cursor) se ejecuta en la misma transacción, antes del cambio."""
+    if nuevo_estado not in ESTADOS_PEDIDO:
+        return {"error": "Estado no válido"}, 400
+
+    try:
+        with transaction() as cursor:
+            if antes:
+                antes(cursor)
+            no_encontrados, descontados, repuestos = cambiar_estado(cursor, pedido_ids, nuevo_estado)
+            if no_encontrados:
+                # Nada se modificó; el rollback libera los bloqueos
+                raise LookupError(no_encontrados)
+    except LookupError as e:
+        return {"error": f"Pedidos no encontrados: {e.args[0]}"}, 404
+    except StockInsuficiente as e:
+        return {"error": "Stock insuficiente de ingredientes", "faltantes": e.faltantes}, 409
+
+    if descontados or repuestos:
+        marcar("ingredientes")
+
+    return {
+        "mensaje": f"Estado del pedido actualizado a '{nuevo_estado}'",
+        "estado": nuevo_estado,
+        "stock_descontado": descontados,
+        "stock_repuesto": repuestos
+    }, 200
+
 @pedidos_bp.route("/<int:id>/estado", methods=["PUT"])
 @login_required
 def update_estado_pedido(id):
     try:
-        data = request.get_json()
-        nuevo_estado = data.get("estado")
+        data = request.get_json() or {}
+        respuesta, status = _cambiar_estado([id], data.get("estado"))
+        return jsonify(respuesta), status
         
-        # Validar estados permitidos
-        estados_permitidos = ['pendiente', 'confirmado', 'en_preparacion', 'completado', 'cancelado']
-        if nuevo_estado not in estados_permitidos:
-            return jsonify({"error": "Estado no válido"}), 400
+    except Exception as e:
+        logger.exception("Error en update_estado_pedido")
+        return jsonify({"error": f"Error del servidor: {str(e)}"}), 500
 
-        cursor = mysql.connection.cursor()
-        cursor.execute("""
-            UPDATE pedidos 
-            SET estado = %s 
-            WHERE id_pedido = %s
-        """, (nuevo_estado, id))
-        
-        mysql.connection.commit()
-        cursor.close()
-        
-        return jsonify({
-            "mensaje": f"Estado del pedido actualizado a '{nuevo_estado}'",
-            "estado": nuevo_estado
-        })
+@pedidos_bp.route("/estado", methods=["PUT"])
+@login_required
+def update_estado_pedidos():
+    """Cambia el estado de varios pedidos en una transacción.
+
+    Body: {ids: [id_pedido, ...], estado}
+    """
+    try:
+        data = request.get_json() or {}
+        try:
+            pedido_ids = [int(pedido_id) for pedido_id in data.get("ids") or []]
+        except (TypeError, ValueError):
+            return jsonify({"error": "ids debe ser una lista de ids numéricos"}), 400
+        if not pedido_ids:
+            return jsonify({"error": "Debe indicar al menos un pedido"}), 400
+
+        respuesta, status = _cambiar_estado(pedido_ids, data.get("estado"))
+        return jsonify(respuesta), status
         
     except Exception as e:
-        logger.error(f"Error en update_estado_pedido: {str(e)}")
+        logger.exception("Error en update_estado_pedidos")
         return jsonify({"error": f"Error del servidor: {str(e)}"}), 500
 
+# Campos de ?fields= del selector de clientes de PedidoForm; los datos de contacto
+# vacíos salen como "" con o sin ?fields=
+CAMPOS_CLIENTES = Campos("usuarios", {
+    "id_usuario": "id_usuario",
+    "nombre": "nombre",
+    "telefono": "COALESCE(telefono, '')",
+    "email": "COALESCE(email, '')",
+    "direccion": "COALESCE(direccion, '')",
+})
+
 @pedidos_bp.route("/usuarios", methods=["GET"])
 @login_required
 def get_usuarios():
+    """Clientes por nombre. ?fields=id_usuario,nombre lee solo esas columnas;
+    ?format=columns|rows en formato tabular."""
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute("""
-            SELECT id_usuario, nombre, telefono, email, direccion 
-            FROM usuarios 
-            WHERE rol = 'cliente'
-            ORDER BY nombre
-        """)
-        filas = cursor.fetchall()
-        cursor.close()
-
-        usuarios = []
-        for f in filas:
-            usuarios.append({
-                "id_usuario": f[0],
-                "nombre": f[1],
-                "telefono": f[2] or "",
-                "email": f[3] or "",
-                "direccion": f[4] or ""
-            })
-        
-        return jsonify(usuarios)
+        nombres = CAMPOS_CLIENTES.solicitados() or list(CAMPOS_CLIENTES.columnas)
+        filas = CAMPOS_CLIENTES.filas(nombres, "WHERE rol = 'cliente'", orden="ORDER BY nombre")
+        return jsonify(CAMPOS_CLIENTES.espec(nombres).tabla(filas, formato_tabular()))
         
+    except CamposInvalidos:
+        raise
     except Exception as e:
-        logger.error(f"Error en get_usuarios: {str(e)}")
+        logger.exception("Error en get_usuarios")
         return jsonify({"error": f"Error del servidor: {str(e)}"}), 500
 
 @pedidos_bp.route("/usuarios", methods=["POST"])
@@ -422,9 +583,9 @@ def create_usuario():
         
         # Generar un password temporal
         password_temp = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(8))
-        password_hash = generate_password_hash(password_temp)
+        password_hash = hasher.hash(password_temp)
         
-        cursor = mysql.connection.cursor()
+        cursor = get_db().cursor()
         
         # Verificar si el email ya existe
         cursor.execute("SELECT id_usuario FROM usuarios WHERE email = %s", (email,))
@@ -438,8 +599,9 @@ def create_usuario():
         """, (nombre, email, password_hash, telefono, direccion))
         
         usuario_id = cursor.lastrowid
-        mysql.connection.commit()
+        get_db().commit()
         cursor.close()
+        busqueda.clientes.actualizar([usuario_id])
         
         return jsonify({
             "mensaje": "Usuario creado correctamente",
@@ -452,7 +614,7 @@ def create_usuario():
         }), 201
         
     except Exception as e:
-        logger.error(f"Error en create_usuario: {str(e)}")
+        logger.exception("Error en create_usuario")
         return jsonify({"error": f"Error del servidor: {str(e)}"}), 500
     
 @pedidos_bp.route("/<int:pedido_id>/agregar_detalle", methods=["POST"])
@@ -469,7 +631,7 @@ def agregar_detalle_pedido(pedido_id):
         if not all([producto_id, cantidad, subtotal]):
             return jsonify({"error": "Todos los campos son requeridos"}), 400
         
-        cursor = mysql.connection.cursor()
+        cursor = get_db().cursor()
         
         # Verificar que el pedido existe
         cursor.execute("SELECT id_pedido FROM pedidos WHERE id_pedido = %s", (pedido_id,))
@@ -484,7 +646,9 @@ def agregar_detalle_pedido(pedido_id):
         """, (pedido_id, producto_id, cantidad, subtotal))
         
         detalle_id = cursor.lastrowid
-        mysql.connection.commit()
+        ajustar_resumen(cursor, pedido_id, 1, subtotal)
+        ajustar_ventas_lineas(cursor, [detalle_id], 1)
+        get_db().commit()
         cursor.close()
         
         return jsonify({
@@ -493,5 +657,5 @@ def agregar_detalle_pedido(pedido_id):
         }), 201
         
     except Exception as e:
-        logger.error(f"Error en agregar_detalle_pedido: {str(e)}")
+        logger.exception("Error en agregar_detalle_pedido")
         return jsonify({"error": f"Error del servidor: {str(e)}"}), 500
\ No newline at end of file
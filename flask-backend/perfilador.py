@@ -0,0 +1,185 @@
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, jsonify, request, Response
+from flask_login import current_user
+
+from decorators import admin_required
+from trazas_sql import request_id
+
+# ================================
+# Perfilado de requests bajo demanda
+# ================================
+# Un request se perfila si lo pide un admin con la cabecera X-Profile: 1, o al azar
+# con probabilidad PERFIL_MUESTREO. Se guardan en PERFIL_DIRECTORIO (rotando a
+# PERFIL_MAX_ARCHIVOS):
+#   <fecha>_<endpoint>_<request_id>.prof    pstats de cProfile (snakeviz, pstats)
+#   <fecha>_<endpoint>_<request_id>.folded  pilas colapsadas del muestreo (flamegraph.pl, speedscope)
+# Además las muestras se acumulan en memoria por endpoint y se clasifican por categoría
+# (JSON, conversión de filas, hashing, espera de BD) para /debug/perfiles.
+
+CATEGORIAS = (
+    # (categoría, patrón sobre "archivo:función"), se busca desde la hoja hacia la raíz
+    ("bd", re.compile(r"mysql[/\\]connector|[/\\]db\.py:")),
+    ("hashing", re.compile(r"hashlib|werkzeug[/\\]security|[/\\]hashing\.py:")),
+    ("json", re.compile(r"[/\\]json[/\\]|flask[/\\]json")),
+    ("conversion_filas", re.compile(r":\w+_a_dict$|:from_row$")),
+)
+MAX_PILAS_POR_ENDPOINT = 5000
+
+_agregado = {}  # endpoint -> {"requests", "muestras", "pilas": Counter, "categorias": Counter}
+_lock = threading.Lock()
+
+
+class Muestreador(threading.Thread):
+    """Toma la pila del hilo indicado cada `intervalo` segundos"""
+
+    def __init__(self, hilo_id, intervalo):
+        super().__init__(daemon=True)
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.categorias = Counter()
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo_id)
+            if frame is None:
+                continue
+            marcos = []
+            while frame is not None:
+                codigo = frame.f_code
+                marcos.append(f"{codigo.co_filename}:{codigo.co_name}")
+                frame = frame.f_back
+            self.categorias[clasificar(marcos)] += 1
+            # Formato colapsado: raíz;...;hoja
+            self.pilas[";".join(_corto(m) for m in reversed(marcos))] += 1
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+
+def _corto(marco):
+    archivo, _, funcion = marco.rpartition(":")
+    return f"{os.path.basename(archivo)}:{funcion}"
+
+
+def clasificar(marcos):
+    """Categoría de una muestra según el marco más cercano a la hoja que coincida"""
+    for marco in marcos:
+        for categoria, patron in CATEGORIAS:
+            if patron.search(marco):
+                return categoria
+    return "otro"
+
+
+def _nombre_seguro(texto):
+    return re.sub(r"[^\w.-]", "_", texto)
+
+
+def _rotar(directorio, maximo):
+    archivos = sorted(
+        (os.path.join(directorio, nombre) for nombre in os.listdir(directorio)),
+        key=os.path.getmtime
+    )
+    for archivo in archivos[:max(0, len(archivos) - maximo)]:
+        os.remove(archivo)
+
+
+def _acumular(endpoint, muestreador):
+    with _lock:
+        datos = _agregado.setdefault(endpoint, {
+            "requests": 0, "muestras": 0, "pilas": Counter(), "categorias": Counter()
+        })
+        datos["requests"] += 1
+        datos["muestras"] += sum(muestreador.pilas.values())
+        datos["categorias"].update(muestreador.categorias)
+        for pila, conteo in muestreador.pilas.items():
+            if pila in datos["pilas"] or len(datos["pilas"]) < MAX_PILAS_POR_ENDPOINT:
+                datos["pilas"][pila] += conteo
+            else:
+                datos["pilas"]["[otras pilas]"] += conteo
+
+
+def _debe_perfilar():
+    if request.headers.get("X-Profile") == "1":
+        return current_user.is_authenticated and getattr(current_user, "rol", None) == "admin"
+    tasa = current_app.config.get("PERFIL_MUESTREO", 0)
+    return tasa > 0 and random.random() < tasa
+
+
+def init_app(app):
+    @app.before_request
+    def iniciar_perfil():
+        if not _debe_perfilar():
+            return
+        g.perfil = cProfile.Profile()
+        g.muestreador = Muestreador(threading.get_ident(), app.config.get("PERFIL_INTERVALO_MS", 5) / 1000)
+        g.muestreador.start()
+        g.perfil.enable()
+
+    @app.after_request
+    def marcar_perfil(response):
+        if "perfil" in g:
+            response.headers["X-Profile-Id"] = request_id()
+        return response
+
+    @app.teardown_request
+    def guardar_perfil(exc=None):
+        perfil = g.pop("perfil", None)
+        if perfil is None:
+            return
+        perfil.disable()
+        muestreador = g.pop("muestreador")
+        muestreador.detener()
+
+        endpoint = request.endpoint or "sin_ruta"
+        _acumular(endpoint, muestreador)
+
+        directorio = app.config.get("PERFIL_DIRECTORIO", "perfiles")
+        os.makedirs(directorio, exist_ok=True)
+        base = os.path.join(directorio, "_".join([
+            time.strftime("%Y%m%d-%H%M%S"), _nombre_seguro(endpoint), request_id()
+        ]))
+        perfil.dump_stats(base + ".prof")
+        with open(base + ".folded", "w", encoding="utf-8") as archivo:
+            for pila, conteo in muestreador.pilas.items():
+                archivo.write(f"{pila} {conteo}\n")
+        _rotar(directorio, app.config.get("PERFIL_MAX_ARCHIVOS", 200))
+
+    @app.route("/debug/perfiles")
+    @admin_required
+    def debug_perfiles():
+        """Requests perfilados y reparto de muestras por categoría, por endpoint"""
+        with _lock:
+            resumen = {}
+            for endpoint, datos in _agregado.items():
+                muestras = datos["muestras"] or 1
+                resumen[endpoint] = {
+                    "requests": datos["requests"],
+                    "muestras": datos["muestras"],
+                    "categorias": {
+                        categoria: round(conteo / muestras * 100, 1)
+                        for categoria, conteo in datos["categorias"].most_common()
+                    },
+                }
+        return jsonify(resumen)
+
+    @app.route("/debug/perfiles/<endpoint>")
+    @admin_required
+    def debug_perfil_endpoint(endpoint):
+        """Pilas colapsadas acumuladas del endpoint (entrada para flamegraph)"""
+        with _lock:
+            datos = _agregado.get(endpoint)
+            lineas = [f"{pila} {conteo}" for pila, conteo in datos["pilas"].items()] if datos else None
+        if lineas is None:
+            return jsonify({"error": "Sin muestras para el endpoint"}), 404
+        return Response("\n".join(lineas) + "\n", mimetype="text/plain")
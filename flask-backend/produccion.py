@@ -0,0 +1,120 @@
+from flask import Blueprint, jsonify, request
+from flask_login import login_required
+import numpy as np
+
+import schema
+from db import query_all
+
+produccion_bp = Blueprint("produccion", __name__, url_prefix="/produccion")
+
+ESTADOS_ABIERTOS = ("pendiente", "confirmado")
+
+
+# ================================
+# Cálculo de requerimientos (MRP) con matrices
+# ================================
+def calcular_requerimientos(lineas, recetas, ingrediente_ids):
+    """Requerimiento total por ingrediente para un conjunto de líneas de pedido.
+
+    lineas:          [(pedido_id, producto_id, cantidad), ...]
+    recetas:         [(producto_id, ingrediente_id, cantidad_necesaria), ...]
+    ingrediente_ids: ids en el orden del resultado
+
+    Con Q = matriz pedidos x productos y R = matriz productos x ingredientes,
+    el total es 1ᵀ·Q·R. 1ᵀ·Q (demanda por producto) se obtiene con bincount
+    sin materializar Q, que con decenas de miles de pedidos sería enorme.
+    Devuelve (total_por_ingrediente, cantidad_de_pedidos).
+    """
+    ingrediente_ids = np.asarray(ingrediente_ids, dtype=np.int64)
+    if not lineas or ingrediente_ids.size == 0:
+        return np.zeros(ingrediente_ids.size), 0
+
+    lineas = np.asarray(lineas, dtype=np.float64)
+    cantidad_pedidos = np.unique(lineas[:, 0]).size
+    productos, producto_idx = np.unique(lineas[:, 1].astype(np.int64), return_inverse=True)
+    demanda = np.bincount(producto_idx, weights=lineas[:, 2], minlength=productos.size)
+
+    r = np.zeros((productos.size, ingrediente_ids.size))
+    if recetas:
+        recetas = np.asarray(recetas, dtype=np.float64)
+        rec_productos = recetas[:, 0].astype(np.int64)
+        rec_ingredientes = recetas[:, 1].astype(np.int64)
+
+        # Ubicar cada fila de receta en la matriz; se ignoran productos sin pedidos
+        # e ingredientes que ya no existen
+        orden_ing = np.argsort(ingrediente_ids)
+        pos_prod = np.searchsorted(productos, rec_productos).clip(max=productos.size - 1)
+        pos_ing = np.searchsorted(ingrediente_ids, rec_ingredientes, sorter=orden_ing)
+        pos_ing = pos_ing.clip(max=ingrediente_ids.size - 1)
+        col_ing = orden_ing[pos_ing]
+        validas = (productos[pos_prod] == rec_productos) & (ingrediente_ids[col_ing] == rec_ingredientes)
+        np.add.at(r, (pos_prod[validas], col_ing[validas]), recetas[validas, 2])
+
+    return demanda @ r, int(cantidad_pedidos)
+
+
+def cargar_datos(estados):
+    if schema.tiene("pedidos", "estado"):
+        filtro, params = f"p.estado IN ({', '.join(['%s'] * len(estados))})", estados
+    else:
+        # Sin la columna todos los pedidos se muestran como 'pendiente' (ver pedidos.py)
+        filtro, params = ("1 = 1" if "pendiente" in estados else "1 = 0"), ()
+    lineas = query_all(f"""
+        SELECT dp.pedido_id, dp.producto_id, COALESCE(dp.cantidad, 0)
+        FROM detalle_pedidos dp
+        INNER JOIN pedidos p ON dp.pedido_id = p.id_pedido
+        WHERE {filtro} AND dp.producto_id IS NOT NULL
+    """, params)
+    recetas = query_all(
+        "SELECT id_producto, id_ingrediente, COALESCE(cantidad_necesaria, 0) FROM recetas"
+    )
+    ingredientes = query_all("""
+        SELECT id_ingrediente, nombre, unidad, cantidad
+        FROM ingredientes
+        ORDER BY id_ingrediente
+    """)
+    return lineas, recetas, ingredientes
+
+
+# ================================
+# Requerimientos de ingredientes para los pedidos abiertos
+# ================================
+@produccion_bp.route("/requerimientos", methods=["GET"])
+@login_required
+def get_requerimientos():
+    """Ingredientes necesarios para los pedidos pendientes/confirmados y faltantes
+    frente al stock. ?estados=pendiente,confirmado permite cambiar los estados;
+    ?solo_faltantes=1 devuelve solo los ingredientes con faltante."""
+    estados = tuple(e for e in request.args.get("estados", ",".join(ESTADOS_ABIERTOS)).split(",") if e)
+    if not estados:
+        return jsonify({"error": "Debe indicar al menos un estado"}), 400
+
+    lineas, recetas, ingredientes = cargar_datos(estados)
+    total, cantidad_pedidos = calcular_requerimientos(
+        lineas, recetas, [f[0] for f in ingredientes]
+    )
+
+    disponible = np.array([float(f[3]) if f[3] is not None else 0 for f in ingredientes])
+    faltante = np.maximum(total - disponible, 0)
+
+    solo_faltantes = request.args.get("solo_faltantes") in ("1", "true")
+    requerimientos = []
+    for i, f in enumerate(ingredientes):
+        if total[i] == 0 or (solo_faltantes and faltante[i] == 0):
+            continue
+        requerimientos.append({
+            "id_ingrediente": f[0],
+            "nombre": f[1],
+            "unidad": f[2],
+            "requerido": round(float(total[i]), 4),
+            "disponible": float(disponible[i]),
+            "faltante": round(float(faltante[i]), 4)
+        })
+
+    return jsonify({
+        "estados": list(estados),
+        "pedidos": cantidad_pedidos,
+        "lineas": len(lineas),
+        "ingredientes_con_faltante": int(np.count_nonzero(faltante)),
+        "requerimientos": requerimientos
+    })
@@ -1,33 +1,76 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required
-from db import get_db_connection
+from db import get_db
+from streaming import quiere_streaming, stream_query
+from versiones import condicional, versionar
+from cache_catalogo import invalidar_listado, invalidar_productos, leer, respuesta_json
+from campos import Campos
+import busqueda
+from json_rapido import formato_tabular
 
 productos_bp = Blueprint("productos_bp", __name__, url_prefix="/productos")
+versionar(productos_bp, "productos")
 
-# Obtener todos los productos
-@productos_bp.route("/", methods=["GET"])
-@login_required
-def get_productos():
-    conn = get_db_connection()
+SQL_PRODUCTOS = "SELECT id_producto, nombre, categoria, descripcion, precio, imagen FROM productos"
+
+# Campos disponibles en ?fields= (la imagen suele ser lo más pesado de la fila)
+CAMPOS_PRODUCTOS = Campos("productos", {
+    "id_producto": "id_producto",
+    "nombre": "nombre",
+    "categoria": "categoria",
+    "descripcion": "descripcion",
+    "precio": "precio",
+    "imagen": "imagen",
+})
+
+def cargar_productos():
+    conn = get_db()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT id_producto, nombre, categoria, descripcion, precio, imagen FROM productos")
+    cursor.execute(SQL_PRODUCTOS)
     rows = cursor.fetchall()
     cursor.close()
-    conn.close()
-    return jsonify(rows)
+    return rows
+
+# Obtener todos los productos (?stream=1 o ?format=ndjson para streaming).
+# Con ?fields=id_producto,nombre solo se leen esas columnas (sin pasar por la cache)
+@productos_bp.route("/", methods=["GET"])
+@login_required
+@condicional("productos")
+def get_productos():
+    campos = CAMPOS_PRODUCTOS.solicitados()
+    if quiere_streaming():
+        if campos:
+            return stream_query(CAMPOS_PRODUCTOS.sql(campos), fila_a_dict=CAMPOS_PRODUCTOS.espec(campos).objeto)
+        return stream_query(SQL_PRODUCTOS, dictionary=True)
+
+    if campos:
+        filas = CAMPOS_PRODUCTOS.filas(campos)
+        return jsonify(CAMPOS_PRODUCTOS.espec(campos).tabla(filas, formato_tabular()))
+
+    return respuesta_json(leer(("productos",), cargar_productos))
 
 # Obtener producto por id
 @productos_bp.route("/<int:id>", methods=["GET"])
 @login_required
+@condicional("productos")
 def get_producto(id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT id_producto, nombre, categoria, descripcion, precio, imagen FROM productos WHERE id_producto=%s", (id,))
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    if row:
-        return jsonify(row)
+    campos = CAMPOS_PRODUCTOS.solicitados()
+    if campos:
+        producto = CAMPOS_PRODUCTOS.fila(campos, "WHERE id_producto=%s", (id,))
+        if producto is None:
+            return jsonify({"error": "Producto no encontrado"}), 404
+        return jsonify(producto)
+
+    def cargar():
+        cursor = get_db().cursor(dictionary=True)
+        cursor.execute(SQL_PRODUCTOS + " WHERE id_producto=%s", (id,))
+        row = cursor.fetchone()
+        cursor.close()
+        return row
+
+    cuerpo = leer(("producto", id), cargar)
+    if cuerpo is not None:
+        return respuesta_json(cuerpo)
     return jsonify({"error": "Producto no encontrado"}), 404
 
 # Agregar producto
@@ -44,15 +87,17 @@ def add_producto():
     if not nombre or not categoria or not precio:
         return jsonify({"error": "Faltan campos obligatorios"}), 400
 
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("""
         INSERT INTO productos (nombre, categoria, descripcion, precio, imagen)
         VALUES (%s, %s, %s, %s, %s)
     """, (nombre, categoria, descripcion, precio, imagen))
+    producto_id = cursor.lastrowid
     conn.commit()
     cursor.close()
-    conn.close()
+    invalidar_listado()
+    busqueda.productos.actualizar([producto_id])
 
     return jsonify({"mensaje": "Producto agregado"}), 201
 
@@ -67,7 +112,7 @@ def update_producto(id):
     precio = data.get("precio")
     imagen = data.get("imagen")
 
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("""
         UPDATE productos
@@ -76,7 +121,8 @@ def update_producto(id):
     """, (nombre, categoria, descripcion, precio, imagen, id))
     conn.commit()
     cursor.close()
-    conn.close()
+    invalidar_productos([id])
+    busqueda.productos.actualizar([id])
 
     return jsonify({"mensaje": "Producto actualizado"})
 
@@ -84,10 +130,11 @@ def update_producto(id):
 @productos_bp.route("/<int:id>", methods=["DELETE"])
 @login_required
 def delete_producto(id):
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("DELETE FROM productos WHERE id_producto=%s", (id,))
     conn.commit()
     cursor.close()
-    conn.close()
+    invalidar_productos([id])
+    busqueda.productos.actualizar([id])
     return jsonify({"mensaje": "Producto eliminado"})
@@ -1,13 +1,23 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required
-from extensions import mysql
+from db import get_db, transaction
+from costos import hoja_de_costos, recostear_catalogo, recostear_productos
+from decorators import admin_required
+from streaming import quiere_streaming, stream_query
+from versiones import condicional, versionar
+from cache_catalogo import invalidar_recetas, leer, respuesta_json
+from json_rapido import EspecFilas, formato_tabular
+from campos import Campos
 import logging
+import time
 
-# Configurar logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 recetas_bp = Blueprint("recetas", __name__, url_prefix="/recetas")
+versionar(recetas_bp, "recetas")
+
+# Las lecturas de recetas incluyen nombres y costos de productos e ingredientes
+TABLAS_RECETAS = ("recetas", "productos", "ingredientes")
 
 # ================================
 # Actualizar costo de producto automáticamente
@@ -15,104 +25,112 @@ recetas_bp = Blueprint("recetas", __name__, url_prefix="/recetas")
 def actualizar_costo_producto(id_producto):
     """Actualiza el costo_produccion en la tabla productos cuando cambia una receta"""
     try:
-        cursor = mysql.connection.cursor()
-        
-        # Calcular nuevo costo total
-        cursor.execute("""
-            SELECT SUM(r.cantidad_necesaria * i.costo_unitario) as costo_total
-            FROM recetas r
-            LEFT JOIN ingredientes i ON r.id_ingrediente = i.id_ingrediente
-            WHERE r.id_producto = %s
-        """, (id_producto,))
-        resultado = cursor.fetchone()
-        nuevo_costo = float(resultado[0]) if resultado[0] else 0
-        
-        # Actualizar el producto
-        cursor.execute("""
-            UPDATE productos 
-            SET costo_produccion = %s 
-            WHERE id_producto = %s
-        """, (nuevo_costo, id_producto))
-        
-        mysql.connection.commit()
+        cursor = get_db().cursor()
+        recostear_productos(cursor, [id_producto])
+        get_db().commit()
         cursor.close()
-        logger.info(f"Costo actualizado para producto {id_producto}: ${nuevo_costo}")
+        logger.debug("Costo actualizado para producto %s", id_producto)
         
-    except Exception as e:
-        logger.error(f"Error actualizando costo producto {id_producto}: {str(e)}")
-        mysql.connection.rollback()
+    except Exception:
+        logger.exception("Error actualizando costo producto %s", id_producto)
+        get_db().rollback()
 
 # ================================
-# Obtener todas las recetas
+# Obtener todas las recetas (?stream=1 o ?format=ndjson para streaming)
 # ================================
+SQL_RECETAS = """
+    SELECT r.id_receta, r.id_producto, r.id_ingrediente, r.cantidad_necesaria,
+           p.nombre AS producto, i.nombre AS ingrediente
+    FROM recetas r
+    LEFT JOIN productos p ON r.id_producto = p.id_producto
+    LEFT JOIN ingredientes i ON r.id_ingrediente = i.id_ingrediente
+"""
+
+# producto / ingrediente son los nombres
+ESPEC_RECETAS = EspecFilas(
+    "id_receta", "id_producto", "id_ingrediente", "cantidad_necesaria", "producto", "ingrediente"
+)
+receta_a_dict = ESPEC_RECETAS.objeto
+
+# Campos de ?fields=; los JOIN a productos/ingredientes solo se hacen si se piden sus nombres
+CAMPOS_RECETAS = Campos("recetas r", {
+    "id_receta": "r.id_receta",
+    "id_producto": "r.id_producto",
+    "id_ingrediente": "r.id_ingrediente",
+    "cantidad_necesaria": "r.cantidad_necesaria",
+    "producto": ("p.nombre", "p"),
+    "ingrediente": ("i.nombre", "i"),
+}, {
+    "p": "LEFT JOIN productos p ON r.id_producto = p.id_producto",
+    "i": "LEFT JOIN ingredientes i ON r.id_ingrediente = i.id_ingrediente",
+})
+
 @recetas_bp.route("/", methods=["GET"])
 @login_required
+@condicional(*TABLAS_RECETAS)
 def get_recetas():
-    cursor = mysql.connection.cursor()
-    cursor.execute("""
-        SELECT r.id_receta, r.id_producto, r.id_ingrediente, r.cantidad_necesaria,
-               p.nombre AS producto, i.nombre AS ingrediente
-        FROM recetas r
-        LEFT JOIN productos p ON r.id_producto = p.id_producto
-        LEFT JOIN ingredientes i ON r.id_ingrediente = i.id_ingrediente
-    """)
+    campos = CAMPOS_RECETAS.solicitados()
+    if quiere_streaming():
+        if campos:
+            return stream_query(CAMPOS_RECETAS.sql(campos), fila_a_dict=CAMPOS_RECETAS.espec(campos).objeto)
+        return stream_query(SQL_RECETAS, fila_a_dict=receta_a_dict)
+
+    if campos:
+        filas = CAMPOS_RECETAS.filas(campos)
+        return jsonify(CAMPOS_RECETAS.espec(campos).tabla(filas, formato_tabular()))
+
+    cursor = get_db().cursor()
+    cursor.execute(SQL_RECETAS)
     filas = cursor.fetchall()
     cursor.close()
 
-    recetas = []
-    for f in filas:
-        recetas.append({
-            "id_receta": f[0],
-            "id_producto": f[1],
-            "id_ingrediente": f[2],
-            "cantidad_necesaria": f[3],
-            "producto": f[4],       # nombre producto
-            "ingrediente": f[5]     # nombre ingrediente
-        })
-    return jsonify(recetas)
+    return jsonify(ESPEC_RECETAS.tabla(filas, formato_tabular()))
 
 # ================================
 # Obtener una receta por ID
 # ================================
 @recetas_bp.route("/<int:id>", methods=["GET"])
 @login_required
+@condicional(*TABLAS_RECETAS)
 def get_receta(id):
-    cursor = mysql.connection.cursor()
-    cursor.execute("""
-        SELECT r.id_receta, r.id_producto, r.id_ingrediente, r.cantidad_necesaria,
-               p.nombre AS producto, i.nombre AS ingrediente
-        FROM recetas r
-        LEFT JOIN productos p ON r.id_producto = p.id_producto
-        LEFT JOIN ingredientes i ON r.id_ingrediente = i.id_ingrediente
-        WHERE r.id_receta = %s
-    """, (id,))
+    campos = CAMPOS_RECETAS.solicitados()
+    if campos:
+        receta = CAMPOS_RECETAS.fila(campos, "WHERE r.id_receta = %s", (id,))
+        if receta is None:
+            return jsonify({"error": "Receta no encontrada"}), 404
+        return jsonify(receta)
+
+    cursor = get_db().cursor()
+    cursor.execute(SQL_RECETAS + " WHERE r.id_receta = %s", (id,))
     f = cursor.fetchone()
     cursor.close()
 
     if not f:
         return jsonify({"error": "Receta no encontrada"}), 404
 
-    receta = {
-        "id_receta": f[0],
-        "id_producto": f[1],
-        "id_ingrediente": f[2],
-        "cantidad_necesaria": f[3],
-        "producto": f[4],
-        "ingrediente": f[5]
-    }
-    return jsonify(receta)
+    return jsonify(receta_a_dict(f))
 
 # ================================
 # Obtener recetas por producto
 # ================================
 @recetas_bp.route("/producto/<int:producto_id>", methods=["GET"])
 @login_required
+@condicional(*TABLAS_RECETAS)
 def get_recetas_por_producto(producto_id):
-    cursor = mysql.connection.cursor()
+    return respuesta_json(leer(("receta_producto", producto_id), lambda: receta_de_producto(producto_id)))
+
+# Los costos de ingredientes sin costo (o sin ingrediente) cuentan como 0
+ESPEC_RECETA_PRODUCTO = EspecFilas(
+    "id_receta", "id_ingrediente", "cantidad_necesaria", "ingrediente", "unidad",
+    "costo_unitario", "costo_ingrediente"
+)
+
+def receta_de_producto(producto_id):
+    cursor = get_db().cursor()
     cursor.execute("""
-        SELECT r.id_receta, r.id_ingrediente, r.cantidad_necesaria,
-               i.nombre AS ingrediente, i.unidad, i.costo_unitario,
-               (r.cantidad_necesaria * i.costo_unitario) as costo_ingrediente
+        SELECT r.id_receta, r.id_ingrediente, COALESCE(r.cantidad_necesaria, 0),
+               i.nombre AS ingrediente, i.unidad, COALESCE(i.costo_unitario, 0),
+               COALESCE(r.cantidad_necesaria * i.costo_unitario, 0) as costo_ingrediente
         FROM recetas r
         LEFT JOIN ingredientes i ON r.id_ingrediente = i.id_ingrediente
         WHERE r.id_producto = %s
@@ -120,33 +138,22 @@ def get_recetas_por_producto(producto_id):
     filas = cursor.fetchall()
     cursor.close()
 
-    recetas = []
-    costo_total = 0
-    for f in filas:
-        costo_ingrediente = float(f[6]) if f[6] else 0
-        costo_total += costo_ingrediente
-        recetas.append({
-            "id_receta": f[0],
-            "id_ingrediente": f[1],
-            "cantidad_necesaria": float(f[2]) if f[2] else 0,
-            "ingrediente": f[3],
-            "unidad": f[4],
-            "costo_unitario": float(f[5]) if f[5] else 0,
-            "costo_ingrediente": costo_ingrediente
-        })
-
-    return jsonify({
-        "recetas": recetas,
-        "costo_total_produccion": costo_total
-    })
+    return {
+        "recetas": ESPEC_RECETA_PRODUCTO.objetos(filas),
+        "costo_total_produccion": sum(f[6] for f in filas)
+    }
 
 # ================================
 # Calcular costo de producción
 # ================================
 @recetas_bp.route("/costo-produccion/<int:producto_id>", methods=["GET"])
 @login_required
+@condicional(*TABLAS_RECETAS)
 def get_costo_produccion(producto_id):
-    cursor = mysql.connection.cursor()
+    return respuesta_json(leer(("costo_produccion", producto_id), lambda: costo_de_producto(producto_id)))
+
+def costo_de_producto(producto_id):
+    cursor = get_db().cursor()
     cursor.execute("""
         SELECT SUM(r.cantidad_necesaria * i.costo_unitario) as costo_total
         FROM recetas r
@@ -157,7 +164,36 @@ def get_costo_produccion(producto_id):
     cursor.close()
 
     costo_total = float(resultado[0]) if resultado[0] else 0
-    return jsonify({"costo_produccion": costo_total})
+    return {"costo_produccion": costo_total}
+
+# ================================
+# Hoja de costos: costo, precio y margen de todos los productos
+# ================================
+@recetas_bp.route("/costos", methods=["GET"])
+@login_required
+@condicional(*TABLAS_RECETAS)
+def get_hoja_costos():
+    cursor = get_db().cursor()
+    hoja = hoja_de_costos(cursor)
+    cursor.close()
+    return jsonify(hoja)
+
+# ================================
+# Recalcular el costo de todo el catálogo (admin)
+# ================================
+@recetas_bp.route("/recostear", methods=["POST"])
+@admin_required
+def recostear_todo():
+    inicio = time.perf_counter()
+    with transaction() as cursor:
+        filas = recostear_catalogo(cursor)
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    logger.info("Recosteo del catálogo: %d productos en %.1f ms", filas, duracion_ms)
+    return jsonify({
+        "mensaje": "Costos recalculados",
+        "productos_actualizados": filas,
+        "duracion_ms": round(duracion_ms, 1)
+    })
 
 # ================================
 # Crear nueva receta
@@ -174,7 +210,7 @@ def add_receta():
     if not id_producto or not id_ingrediente or cantidad_necesaria is None:
         return jsonify({"error": "Faltan campos obligatorios"}), 400
 
-    cursor = mysql.connection.cursor()
+    cursor = get_db().cursor()
     
     # Verificar que el producto existe
     cursor.execute("SELECT id_producto FROM productos WHERE id_producto = %s", (id_producto,))
@@ -192,10 +228,11 @@ def add_receta():
         INSERT INTO recetas (id_producto, id_ingrediente, cantidad_necesaria)
         VALUES (%s, %s, %s)
     """, (id_producto, id_ingrediente, cantidad_necesaria))
-    mysql.connection.commit()
+    get_db().commit()
     
     # ACTUALIZAR COSTO DEL PRODUCTO AUTOMÁTICAMENTE
     actualizar_costo_producto(id_producto)
+    invalidar_recetas([id_producto])
     
     cursor.close()
     return jsonify({"mensaje": "Receta agregada correctamente"})
@@ -203,52 +240,92 @@ def add_receta():
 # ================================
 # Crear múltiples recetas (para un producto completo)
 # ================================
+def guardar_receta_producto(id_producto, ingredientes, reemplazar=False):
+    """Valida e inserta todos los ingredientes de la receta y recostea el producto
+    en una sola transacción. Con reemplazar=True la receta anterior se sustituye.
+    Devuelve (respuesta, status)."""
+    try:
+        filas = [
+            (id_producto, int(ing["id_ingrediente"]), ing["cantidad_necesaria"])
+            for ing in ingredientes
+        ]
+    except (KeyError, TypeError, ValueError):
+        return {"error": "Cada ingrediente requiere id_ingrediente y cantidad_necesaria"}, 400
+    if any(fila[2] is None for fila in filas):
+        return {"error": "Cada ingrediente requiere id_ingrediente y cantidad_necesaria"}, 400
+
+    ingrediente_ids = sorted({fila[1] for fila in filas})
+    placeholders = ", ".join(["%s"] * len(ingrediente_ids))
+
+    with transaction() as cursor:
+        cursor.execute("SELECT id_producto FROM productos WHERE id_producto = %s", (id_producto,))
+        if not cursor.fetchone():
+            return {"error": "El producto no existe"}, 404
+
+        # Validar todos los ingredientes con una sola consulta
+        cursor.execute(
+            f"SELECT id_ingrediente FROM ingredientes WHERE id_ingrediente IN ({placeholders})",
+            ingrediente_ids
+        )
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        faltantes = [i for i in ingrediente_ids if i not in existentes]
+        if faltantes:
+            return {"error": f"Ingredientes no existen: {faltantes}"}, 404
+
+        if reemplazar:
+            cursor.execute("DELETE FROM recetas WHERE id_producto = %s", (id_producto,))
+
+        # executemany agrupa todas las filas en un único INSERT multi-fila
+        cursor.executemany("""
+            INSERT INTO recetas (id_producto, id_ingrediente, cantidad_necesaria)
+            VALUES (%s, %s, %s)
+        """, filas)
+
+        recostear_productos(cursor, [id_producto])
+
+    invalidar_recetas([id_producto])
+    if reemplazar:
+        return {"mensaje": f"Receta reemplazada con {len(filas)} ingredientes"}, 200
+    return {"mensaje": f"{len(filas)} ingredientes agregados a la receta"}, 200
+
 @recetas_bp.route("/multiple", methods=["POST"])
 @login_required
 def add_recetas_multiple():
-    data = request.get_json()
+    """Body: {id_producto, ingredientes: [{id_ingrediente, cantidad_necesaria}], modo}
+    modo "reemplazar" sustituye la receta completa del producto; por defecto se agregan."""
+    data = request.get_json() or {}
     id_producto = data.get("id_producto")
     ingredientes = data.get("ingredientes", [])  # Array de {id_ingrediente, cantidad_necesaria}
 
     if not id_producto or not ingredientes:
         return jsonify({"error": "Faltan datos obligatorios"}), 400
 
-    cursor = mysql.connection.cursor()
-    
     try:
-        # Verificar que el producto existe
-        cursor.execute("SELECT id_producto FROM productos WHERE id_producto = %s", (id_producto,))
-        if not cursor.fetchone():
-            return jsonify({"error": "El producto no existe"}), 404
-
-        # Insertar cada ingrediente
-        for ingrediente in ingredientes:
-            id_ingrediente = ingrediente.get("id_ingrediente")
-            cantidad = ingrediente.get("cantidad_necesaria")
-            
-            # Verificar que el ingrediente existe
-            cursor.execute("SELECT id_ingrediente FROM ingredientes WHERE id_ingrediente = %s", (id_ingrediente,))
-            if not cursor.fetchone():
-                return jsonify({"error": f"Ingrediente {id_ingrediente} no existe"}), 404
-
-            cursor.execute("""
-                INSERT INTO recetas (id_producto, id_ingrediente, cantidad_necesaria)
-                VALUES (%s, %s, %s)
-            """, (id_producto, id_ingrediente, cantidad))
-
-        mysql.connection.commit()
-        
-        # ACTUALIZAR COSTO DEL PRODUCTO AUTOMÁTICAMENTE
-        actualizar_costo_producto(id_producto)
-        
-        cursor.close()
-        return jsonify({"mensaje": f"{len(ingredientes)} ingredientes agregados a la receta"})
-
+        respuesta, status = guardar_receta_producto(
+            id_producto, ingredientes, reemplazar=data.get("modo") == "reemplazar"
+        )
+        return jsonify(respuesta), status
     except Exception as e:
-        mysql.connection.rollback()
-        cursor.close()
         return jsonify({"error": f"Error al crear recetas: {str(e)}"}), 500
 
+# ================================
+# Reemplazar la receta completa de un producto
+# ================================
+@recetas_bp.route("/producto/<int:producto_id>", methods=["PUT"])
+@login_required
+def replace_recetas_producto(producto_id):
+    data = request.get_json() or {}
+    ingredientes = data.get("ingredientes", [])
+
+    if not ingredientes:
+        return jsonify({"error": "Faltan datos obligatorios"}), 400
+
+    try:
+        respuesta, status = guardar_receta_producto(producto_id, ingredientes, reemplazar=True)
+        return jsonify(respuesta), status
+    except Exception as e:
+        return jsonify({"error": f"Error al reemplazar receta: {str(e)}"}), 500
+
 # ================================
 # Actualizar receta
 # ================================
@@ -260,16 +337,20 @@ def update_receta(id):
     id_ingrediente = data.get("id_ingrediente")
     cantidad_necesaria = data.get("cantidad_necesaria")
 
-    cursor = mysql.connection.cursor()
+    cursor = get_db().cursor()
+    # La receta puede cambiar de producto: el anterior también se invalida
+    cursor.execute("SELECT id_producto FROM recetas WHERE id_receta = %s", (id,))
+    anterior = cursor.fetchone()
     cursor.execute("""
         UPDATE recetas
         SET id_producto=%s, id_ingrediente=%s, cantidad_necesaria=%s
         WHERE id_receta=%s
     """, (id_producto, id_ingrediente, cantidad_necesaria, id))
-    mysql.connection.commit()
+    get_db().commit()
     
     # ACTUALIZAR COSTO DEL PRODUCTO AUTOMÁTICAMENTE
     actualizar_costo_producto(id_producto)
+    invalidar_recetas({id_producto, anterior[0]} if anterior else [id_producto])
     
     cursor.close()
     return jsonify({"mensaje": "Receta actualizada correctamente"})
@@ -280,7 +361,7 @@ def update_receta(id):
 @recetas_bp.route("/<int:id>", methods=["DELETE"])
 @login_required
 def delete_receta(id):
-    cursor = mysql.connection.cursor()
+    cursor = get_db().cursor()
     
     # PRIMERO obtener el id_producto antes de eliminar
     cursor.execute("SELECT id_producto FROM recetas WHERE id_receta = %s", (id,))
@@ -289,11 +370,12 @@ def delete_receta(id):
 
     # Luego eliminar
     cursor.execute("DELETE FROM recetas WHERE id_receta=%s", (id,))
-    mysql.connection.commit()
+    get_db().commit()
 
     # ACTUALIZAR COSTO DEL PRODUCTO AUTOMÁTICAMENTE
     if id_producto:
         actualizar_costo_producto(id_producto)
+        invalidar_recetas([id_producto])
     
     cursor.close()
     return jsonify({"mensaje": "Receta eliminada correctamente"})
@@ -304,12 +386,13 @@ def delete_receta(id):
 @recetas_bp.route("/producto/<int:producto_id>", methods=["DELETE"])
 @login_required
 def delete_recetas_producto(producto_id):
-    cursor = mysql.connection.cursor()
+    cursor = get_db().cursor()
     cursor.execute("DELETE FROM recetas WHERE id_producto = %s", (producto_id,))
-    mysql.connection.commit()
+    get_db().commit()
     
     # ACTUALIZAR COSTO DEL PRODUCTO AUTOMÁTICAMENTE
     actualizar_costo_producto(producto_id)
+    invalidar_recetas([producto_id])
     
     cursor.close()
     return jsonify({"mensaje": "Recetas del producto eliminadas correctamente"})
\ No newline at end of file
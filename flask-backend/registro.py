@@ -0,0 +1,99 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+from trazas_sql import request_id
+
+# ================================
+# Logging de la aplicación (se configura una sola vez en app.py)
+# ================================
+# Los módulos solo hacen logger = logging.getLogger(__name__) y registran con
+# formato diferido: logger.debug("Pedidos: %d", n). Si el nivel está desactivado
+# el mensaje nunca se arma.
+#
+# Los registros pasan por un QueueHandler (el hilo del request solo encola) y un
+# QueueListener los escribe a stderr desde un hilo propio.
+#   LOG_LEVEL   DEBUG, INFO (por defecto), WARNING, ...
+#   LOG_FORMAT  json (por defecto, una línea por registro) o texto
+
+# Atributos estándar de LogRecord; el resto viene de extra={...}
+_ATRIBUTOS_RECORD = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Agrega request_id al registro (se evalúa en el hilo del request)"""
+
+    def filter(self, record):
+        record.request_id = request_id()
+        return True
+
+
+class ColaHandler(logging.handlers.QueueHandler):
+    """Como QueueHandler, pero deja la traza de la excepción aparte del mensaje"""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        datos = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+                  + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "msg": record.getMessage(),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_RECORD and clave not in datos:
+                datos[clave] = valor
+        if record.exc_text:
+            datos["exc"] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+def configurar_logging(app):
+    """Instala QueueHandler + QueueListener en el logger raíz. Idempotente."""
+    global _listener
+    if _listener is not None:
+        return
+
+    nivel = os.environ.get("LOG_LEVEL", app.config.get("LOG_LEVEL", "INFO")).upper()
+    formato = os.environ.get("LOG_FORMAT", app.config.get("LOG_FORMAT", "json")).lower()
+
+    salida = logging.StreamHandler(sys.stderr)
+    if formato == "json":
+        salida.setFormatter(JsonFormatter())
+    else:
+        salida.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+        ))
+
+    cola = queue.SimpleQueue()
+    encolador = ColaHandler(cola)
+    encolador.addFilter(RequestIdFilter())
+
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    raiz.addHandler(encolador)
+    raiz.setLevel(nivel)
+    app.logger.setLevel(nivel)
+
+    _listener = logging.handlers.QueueListener(cola, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
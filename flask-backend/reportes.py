@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+
+from flask import Blueprint, jsonify, request
+
+from db import query_all, query_one
+from decorators import admin_required
+from json_rapido import EspecFilas, formato_tabular
+from resumen_ventas import ventas_mantenidas
+
+reportes_bp = Blueprint("reportes", __name__, url_prefix="/reportes")
+
+REPORTE_DIAS_POR_DEFECTO = 30
+
+# ================================
+# Reporte de ventas desde los resúmenes (ver resumen_ventas.py)
+# ================================
+# Las consultas recorren solo los días del rango (y sus productos), nunca pedidos
+# ni detalle_pedidos, así que no crecen con el historial.
+SQL_METRICAS = """
+    SUM(v.lineas) AS lineas,
+    SUM(v.unidades) AS unidades,
+    SUM(v.ingresos) AS ingresos,
+    SUM(v.costo) AS costo,
+    SUM(v.ingresos) - SUM(v.costo) AS margen,
+    ROUND((SUM(v.ingresos) - SUM(v.costo)) / NULLIF(SUM(v.ingresos), 0) * 100, 2) AS margen_porcentaje
+"""
+METRICAS = ("lineas", "unidades", "ingresos", "costo", "margen", "margen_porcentaje")
+
+AGRUPACIONES = {
+    "dia": ("""
+        SELECT v.fecha, SUM(v.pedidos) AS pedidos, {metricas}
+        FROM ventas_diarias v
+        WHERE v.fecha BETWEEN %s AND %s
+        GROUP BY v.fecha
+        HAVING SUM(v.pedidos) <> 0 OR SUM(v.lineas) <> 0
+        ORDER BY v.fecha
+    """, EspecFilas("fecha", "pedidos", *METRICAS)),
+    "mes": ("""
+        SELECT DATE_FORMAT(v.fecha, '%Y-%m') AS mes, SUM(v.pedidos) AS pedidos, {metricas}
+        FROM ventas_diarias v
+        WHERE v.fecha BETWEEN %s AND %s
+        GROUP BY mes
+        HAVING SUM(v.pedidos) <> 0 OR SUM(v.lineas) <> 0
+        ORDER BY mes
+    """, EspecFilas("mes", "pedidos", *METRICAS)),
+    "producto": ("""
+        SELECT v.id_producto, COALESCE(pr.nombre, 'Producto eliminado') AS nombre,
+               COALESCE(NULLIF(pr.categoria, ''), 'Sin categoría') AS categoria, {metricas}
+        FROM ventas_diarias_producto v
+        LEFT JOIN productos pr ON pr.id_producto = v.id_producto
+        WHERE v.fecha BETWEEN %s AND %s
+        GROUP BY v.id_producto, pr.nombre, pr.categoria
+        HAVING SUM(v.lineas) <> 0
+        ORDER BY ingresos DESC
+    """, EspecFilas("id_producto", "nombre", "categoria", *METRICAS)),
+    "categoria": ("""
+        SELECT COALESCE(NULLIF(pr.categoria, ''), 'Sin categoría') AS categoria, {metricas}
+        FROM ventas_diarias_producto v
+        LEFT JOIN productos pr ON pr.id_producto = v.id_producto
+        WHERE v.fecha BETWEEN %s AND %s
+        GROUP BY categoria
+        HAVING SUM(v.lineas) <> 0
+        ORDER BY ingresos DESC
+    """, EspecFilas("categoria", *METRICAS)),
+}
+
+SQL_TOTALES = """
+    SELECT SUM(v.pedidos) AS pedidos, {metricas}
+    FROM ventas_diarias v
+    WHERE v.fecha BETWEEN %s AND %s
+"""
+ESPEC_TOTALES = EspecFilas("pedidos", *METRICAS)
+
+
+@reportes_bp.route("/ventas", methods=["GET"])
+@admin_required
+def get_ventas():
+    """Ventas entre ?desde= y ?hasta= (AAAA-MM-DD, por defecto los últimos 30 días)
+    agrupadas por ?agrupar=dia|mes|producto|categoria. Ingresos son los subtotales de
+    las líneas, costo el costo de producción al momento de la venta; no incluye
+    pedidos cancelados. ?format=rows|columns para las filas en formato tabular."""
+    if not ventas_mantenidas():
+        return jsonify({"error": "Reporte no disponible: falta la migración 006_resumen_ventas"}), 503
+
+    agrupar = request.args.get("agrupar", "dia")
+    if agrupar not in AGRUPACIONES:
+        return jsonify({"error": f"agrupar debe ser uno de: {', '.join(AGRUPACIONES)}"}), 400
+    try:
+        hasta = date.fromisoformat(request.args["hasta"]) if request.args.get("hasta") else date.today()
+        desde = (date.fromisoformat(request.args["desde"]) if request.args.get("desde")
+                 else hasta - timedelta(days=REPORTE_DIAS_POR_DEFECTO - 1))
+    except ValueError:
+        return jsonify({"error": "Parámetros de consulta no válidos"}), 400
+    if desde > hasta:
+        return jsonify({"error": "desde no puede ser posterior a hasta"}), 400
+
+    sql, espec = AGRUPACIONES[agrupar]
+    filas = query_all(sql.format(metricas=SQL_METRICAS), (desde, hasta))
+    totales = query_one(SQL_TOTALES.format(metricas=SQL_METRICAS), (desde, hasta))
+
+    return jsonify({
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "agrupar": agrupar,
+        "totales": ESPEC_TOTALES.objeto(tuple(v or 0 for v in totales)),
+        "filas": espec.tabla(filas, formato_tabular())
+    })
@@ -0,0 +1,82 @@
+import click
+
+import schema
+from db import get_db
+
+# ================================
+# Resumen de pedidos (total_productos y total) mantenido incrementalmente
+# ================================
+SQL_AGREGADOS_DETALLE = """
+    SELECT pedido_id, COUNT(*) AS lineas, COALESCE(SUM(subtotal), 0) AS total
+    FROM detalle_pedidos
+    GROUP BY pedido_id
+"""
+
+
+def resumen_mantenido():
+    """True si pedidos tiene la columna total_productos (migración 002)"""
+    return schema.tiene("pedidos", "total_productos")
+
+
+def ajustar_resumen(cursor, pedido_id, delta_lineas, delta_total):
+    """Aplica el cambio de una línea al resumen del pedido.
+    Debe llamarse con el mismo cursor/transacción que modifica detalle_pedidos."""
+    if not resumen_mantenido():
+        return
+    cursor.execute("""
+        UPDATE pedidos
+        SET total_productos = total_productos + %s,
+            total = COALESCE(total, 0) + %s
+        WHERE id_pedido = %s
+    """, (delta_lineas, delta_total or 0, pedido_id))
+
+
+def linea_actual(cursor, id_detalle):
+    """(pedido_id, subtotal) de una línea, bloqueándola hasta el fin de la transacción"""
+    cursor.execute(
+        "SELECT pedido_id, subtotal FROM detalle_pedidos WHERE id_detalle = %s FOR UPDATE",
+        (id_detalle,)
+    )
+    return cursor.fetchone()
+
+
+def verificar(cursor):
+    """Cantidad de pedidos cuyo resumen no coincide con sus líneas"""
+    cursor.execute(f"""
+        SELECT COUNT(*)
+        FROM pedidos p
+        LEFT JOIN ({SQL_AGREGADOS_DETALLE}) d ON d.pedido_id = p.id_pedido
+        WHERE p.total_productos <> COALESCE(d.lineas, 0)
+           OR COALESCE(p.total, 0) <> COALESCE(d.total, 0)
+    """)
+    return cursor.fetchone()[0]
+
+
+def reparar(cursor):
+    """Recalcula el resumen de todos los pedidos en una sola sentencia.
+    Devuelve las filas modificadas."""
+    cursor.execute(f"""
+        UPDATE pedidos p
+        LEFT JOIN ({SQL_AGREGADOS_DETALLE}) d ON d.pedido_id = p.id_pedido
+        SET p.total_productos = COALESCE(d.lineas, 0),
+            p.total = COALESCE(d.total, 0)
+    """)
+    return cursor.rowcount
+
+
+def init_app(app):
+    @app.cli.command("pedidos-resumen")
+    @click.option("--reparar", "corregir", is_flag=True, help="Corregir los pedidos desincronizados.")
+    def pedidos_resumen_command(corregir):
+        """Verifica (y opcionalmente repara) total_productos y total de los pedidos."""
+        if not resumen_mantenido():
+            raise click.ClickException("Falta la columna pedidos.total_productos: ejecutar 'flask migrate'")
+        conn = get_db()
+        cursor = conn.cursor()
+        desincronizados = verificar(cursor)
+        click.echo(f"Pedidos desincronizados: {desincronizados}")
+        if corregir and desincronizados:
+            filas = reparar(cursor)
+            conn.commit()
+            click.echo(f"Pedidos corregidos: {filas}")
+        cursor.close()
@@ -0,0 +1,222 @@
+import time
+from datetime import date, timedelta
+
+import click
+
+import schema
+from db import get_db
+
+# ================================
+# Resumen de ventas por día y por día/producto, mantenido incrementalmente
+# ================================
+# ventas_diarias          fecha -> pedidos, lineas, unidades, ingresos, costo
+# ventas_diarias_producto (fecha, id_producto) -> lineas, unidades, ingresos, costo
+#
+# Cuentan los pedidos no cancelados, en la fecha de fecha_pedido. El costo de cada línea
+# se congela en detalle_pedidos.costo_unitario (costo_produccion del producto al sumarla),
+# así restar una línea descuenta exactamente lo que se sumó aunque el costo cambie después.
+# Las ventas por categoría salen de ventas_diarias_producto con la categoría actual.
+#
+# Todas las funciones reciben el cursor de la transacción que modifica pedidos o
+# detalle_pedidos y no hacen commit. Para restar se llaman antes del cambio y para
+# sumar, después.
+
+SQL_ORIGEN = """
+    FROM pedidos p
+    {union} JOIN detalle_pedidos dp ON dp.pedido_id = p.id_pedido
+    LEFT JOIN productos pr ON pr.id_producto = dp.producto_id
+    WHERE p.fecha_pedido IS NOT NULL {vigente} AND {filtro}
+"""
+
+SQL_COSTO_LINEA = "dp.cantidad * COALESCE(dp.costo_unitario, pr.costo_produccion, 0)"
+
+SQL_ACUMULAR_DIA = """
+    INSERT INTO ventas_diarias (fecha, pedidos, lineas, unidades, ingresos, costo)
+    SELECT DATE(p.fecha_pedido),
+           {pedidos},
+           {signo} * COUNT(dp.id_detalle),
+           {signo} * COALESCE(SUM(dp.cantidad), 0),
+           {signo} * COALESCE(SUM(dp.subtotal), 0),
+           {signo} * COALESCE(SUM({costo}), 0)
+    {origen}
+    GROUP BY DATE(p.fecha_pedido)
+    ON DUPLICATE KEY UPDATE
+        pedidos = pedidos + VALUES(pedidos),
+        lineas = lineas + VALUES(lineas),
+        unidades = unidades + VALUES(unidades),
+        ingresos = ingresos + VALUES(ingresos),
+        costo = costo + VALUES(costo)
+"""
+
+SQL_ACUMULAR_PRODUCTO = """
+    INSERT INTO ventas_diarias_producto (fecha, id_producto, lineas, unidades, ingresos, costo)
+    SELECT DATE(p.fecha_pedido),
+           dp.producto_id,
+           {signo} * COUNT(*),
+           {signo} * COALESCE(SUM(dp.cantidad), 0),
+           {signo} * COALESCE(SUM(dp.subtotal), 0),
+           {signo} * COALESCE(SUM({costo}), 0)
+    {origen} AND dp.producto_id IS NOT NULL
+    GROUP BY DATE(p.fecha_pedido), dp.producto_id
+    ON DUPLICATE KEY UPDATE
+        lineas = lineas + VALUES(lineas),
+        unidades = unidades + VALUES(unidades),
+        ingresos = ingresos + VALUES(ingresos),
+        costo = costo + VALUES(costo)
+"""
+
+SQL_CONGELAR_COSTO = """
+    UPDATE detalle_pedidos dp
+    INNER JOIN pedidos p ON p.id_pedido = dp.pedido_id
+    INNER JOIN productos pr ON pr.id_producto = dp.producto_id
+    SET dp.costo_unitario = COALESCE(pr.costo_produccion, 0)
+    WHERE dp.costo_unitario IS NULL AND {filtro}
+"""
+
+
+def _placeholders(valores):
+    return ", ".join(["%s"] * len(valores))
+
+
+def ventas_mantenidas():
+    """True si existen las tablas de resumen (migración 006)"""
+    return schema.tiene("ventas_diarias", "fecha")
+
+
+def _vigente():
+    if schema.tiene("pedidos", "estado"):
+        return "AND COALESCE(p.estado, '') <> 'cancelado'"
+    return ""
+
+
+def _acumular(cursor, signo, filtro, params, por_pedido):
+    """Suma (signo=1) o resta (signo=-1) las líneas que cumplen el filtro.
+    por_pedido: el filtro es sobre pedidos y cuenta también los pedidos sin líneas."""
+    signo = 1 if signo > 0 else -1
+    if signo > 0:
+        cursor.execute(SQL_CONGELAR_COSTO.format(filtro=filtro), params)
+    origen = SQL_ORIGEN.format(
+        union="LEFT" if por_pedido else "INNER", vigente=_vigente(), filtro=filtro
+    )
+    cursor.execute(SQL_ACUMULAR_DIA.format(
+        pedidos=f"{signo} * COUNT(DISTINCT p.id_pedido)" if por_pedido else "0",
+        signo=signo, costo=SQL_COSTO_LINEA, origen=origen
+    ), params)
+    cursor.execute(SQL_ACUMULAR_PRODUCTO.format(
+        signo=signo, costo=SQL_COSTO_LINEA, origen=origen
+    ), params)
+
+
+def ajustar_ventas_pedidos(cursor, pedido_ids, signo):
+    """Suma o resta pedidos completos (encabezado y todas sus líneas)"""
+    pedido_ids = [int(i) for i in pedido_ids if i is not None]
+    if not pedido_ids or not ventas_mantenidas():
+        return
+    _acumular(cursor, signo, f"p.id_pedido IN ({_placeholders(pedido_ids)})", pedido_ids, True)
+
+
+def ajustar_ventas_lineas(cursor, detalle_ids, signo):
+    """Suma o resta líneas sueltas de detalle_pedidos"""
+    detalle_ids = [int(i) for i in detalle_ids if i is not None]
+    if not detalle_ids or not ventas_mantenidas():
+        return
+    _acumular(cursor, signo, f"dp.id_detalle IN ({_placeholders(detalle_ids)})", detalle_ids, False)
+
+
+def preparar_cambio_estado(cursor, pedido_ids, nuevo_estado):
+    """Llamar antes de cambiar el estado. Resta los pedidos que pasan a cancelado y
+    devuelve los que dejan de estarlo, que hay que sumar después del UPDATE."""
+    if not ventas_mantenidas() or not schema.tiene("pedidos", "estado") or not pedido_ids:
+        return []
+    if nuevo_estado == "cancelado":
+        # Los que ya estaban cancelados no cuentan y no se restan
+        ajustar_ventas_pedidos(cursor, pedido_ids, -1)
+        return []
+    cursor.execute(f"""
+        SELECT id_pedido FROM pedidos
+        WHERE estado = 'cancelado' AND id_pedido IN ({_placeholders(pedido_ids)})
+    """, list(pedido_ids))
+    return [fila[0] for fila in cursor.fetchall()]
+
+
+# ================================
+# Reconstrucción y verificación
+# ================================
+def _rango(desde, hasta):
+    """Condición sobre fecha_pedido y sobre la fecha de los resúmenes"""
+    condicion, params = ["1 = 1"], []
+    if desde:
+        condicion.append("p.fecha_pedido >= %s")
+        params.append(desde)
+    if hasta:
+        condicion.append("p.fecha_pedido < %s")
+        params.append(hasta + timedelta(days=1))
+    return " AND ".join(condicion), params
+
+
+def reconstruir(cursor, desde=None, hasta=None):
+    """Vuelve a calcular los resúmenes (todo o el rango de fechas) desde pedidos y
+    detalle_pedidos. Devuelve los días reconstruidos."""
+    filtro, params = _rango(desde, hasta)
+    rango_resumen = filtro.replace("p.fecha_pedido", "fecha")
+    cursor.execute(f"DELETE FROM ventas_diarias WHERE {rango_resumen}", params)
+    cursor.execute(f"DELETE FROM ventas_diarias_producto WHERE {rango_resumen}", params)
+    _acumular(cursor, 1, filtro, params, True)
+    cursor.execute(f"SELECT COUNT(*) FROM ventas_diarias WHERE {rango_resumen}", params)
+    return cursor.fetchone()[0]
+
+
+def verificar(cursor):
+    """Cantidad de días cuyo resumen no coincide con los pedidos"""
+    origen = SQL_ORIGEN.format(union="LEFT", vigente=_vigente(), filtro="1 = 1")
+    cursor.execute(f"""
+        SELECT COUNT(*)
+        FROM (
+            SELECT DATE(p.fecha_pedido) AS fecha,
+                   COUNT(DISTINCT p.id_pedido) AS pedidos,
+                   COUNT(dp.id_detalle) AS lineas,
+                   COALESCE(SUM(dp.subtotal), 0) AS ingresos
+            {origen}
+            GROUP BY DATE(p.fecha_pedido)
+        ) a
+        LEFT JOIN ventas_diarias v ON v.fecha = a.fecha
+        WHERE v.fecha IS NULL OR v.pedidos <> a.pedidos OR v.lineas <> a.lineas
+           OR v.ingresos <> a.ingresos
+    """)
+    faltantes = cursor.fetchone()[0]
+    cursor.execute(f"""
+        SELECT COUNT(*)
+        FROM ventas_diarias v
+        WHERE (v.pedidos <> 0 OR v.lineas <> 0)
+          AND NOT EXISTS (
+              SELECT 1 FROM pedidos p
+              WHERE p.fecha_pedido >= v.fecha AND p.fecha_pedido < v.fecha + INTERVAL 1 DAY
+              {_vigente()}
+          )
+    """)
+    return faltantes + cursor.fetchone()[0]
+
+
+def _fecha(valor):
+    return date.fromisoformat(valor) if valor else None
+
+
+def init_app(app):
+    @app.cli.command("ventas-resumen")
+    @click.option("--reconstruir", "rehacer", is_flag=True, help="Reconstruir los resúmenes.")
+    @click.option("--desde", help="Primer día a reconstruir (AAAA-MM-DD).")
+    @click.option("--hasta", help="Último día a reconstruir (AAAA-MM-DD).")
+    def ventas_resumen_command(rehacer, desde, hasta):
+        """Verifica (y opcionalmente reconstruye) los resúmenes de ventas."""
+        if not ventas_mantenidas():
+            raise click.ClickException("Faltan las tablas de ventas: ejecutar 'flask migrate'")
+        conn = get_db()
+        cursor = conn.cursor()
+        if rehacer:
+            inicio = time.perf_counter()
+            dias = reconstruir(cursor, _fecha(desde), _fecha(hasta))
+            conn.commit()
+            click.echo(f"Días reconstruidos: {dias} en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+        else:
+            click.echo(f"Días desincronizados: {verificar(cursor)}")
+        cursor.close()
@@ -0,0 +1,71 @@
+import click
+
+from db import query_all
+
+# Tablas cuyas columnas se inspeccionan
+TABLAS = ("usuarios", "productos", "pedidos", "detalle_pedidos", "ingredientes", "recetas",
+          "ventas_diarias", "consumo_pedidos")
+
+_columnas = None  # tabla -> set(columnas)
+_indices = None   # tabla -> set(nombres de índices)
+
+
+# ================================
+# Inspección del esquema
+# ================================
+def refresh():
+    """Vuelve a leer columnas e índices de information_schema (llamar después de una migración)"""
+    global _columnas, _indices
+    placeholders = ", ".join(["%s"] * len(TABLAS))
+    filas = query_all(f"""
+        SELECT TABLE_NAME, COLUMN_NAME
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})
+    """, TABLAS)
+
+    columnas = {tabla: set() for tabla in TABLAS}
+    for tabla, columna in filas:
+        columnas[tabla].add(columna)
+
+    indices = {tabla: set() for tabla in TABLAS}
+    for tabla, indice in query_all(f"""
+        SELECT DISTINCT TABLE_NAME, INDEX_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})
+    """, TABLAS):
+        indices[tabla].add(indice)
+
+    _columnas = columnas
+    _indices = indices
+    return columnas
+
+
+def _get_columnas():
+    columnas = _columnas
+    if columnas is None:
+        columnas = refresh()
+    return columnas
+
+
+def tiene(tabla, columna):
+    """True si la columna existe; se consulta la BD solo la primera vez"""
+    return columna in _get_columnas().get(tabla, ())
+
+
+def tiene_indice(tabla, indice):
+    """True si el índice existe (p. ej. los FULLTEXT de la migración 005)"""
+    if _indices is None:
+        refresh()
+    return indice in _indices.get(tabla, ())
+
+
+def capacidades():
+    return {tabla: sorted(cols) for tabla, cols in _get_columnas().items()}
+
+
+def init_app(app):
+    @app.cli.command("schema-refresh")
+    def schema_refresh_command():
+        """Inspecciona de nuevo el esquema de la base de datos."""
+        for tabla, cols in sorted(refresh().items()):
+            click.echo(f"{tabla}: {', '.join(sorted(cols))}")
@@ -0,0 +1,68 @@
+from flask import Response, current_app, request, stream_with_context
+
+from db import get_db
+
+CHUNK_SIZE = 500
+
+
+def quiere_streaming():
+    """El cliente pide respuesta en streaming con ?stream=1, ?format=ndjson
+    o Accept: application/x-ndjson"""
+    return request.args.get("stream") in ("1", "true") or formato_ndjson()
+
+
+def formato_ndjson():
+    return (
+        request.args.get("format") == "ndjson"
+        or request.accept_mimetypes.best == "application/x-ndjson"
+    )
+
+
+# ================================
+# Respuesta JSON incremental desde un cursor sin buffer
+# ================================
+def stream_query(sql, params=(), fila_a_dict=None, dictionary=False, chunk_size=CHUNK_SIZE):
+    """Ejecuta la consulta con un cursor del lado del servidor y emite el resultado
+    por bloques de `chunk_size` filas, como array JSON o como NDJSON.
+
+    La memoria por request queda acotada al bloque actual, sin importar el
+    tamaño de la tabla.
+    """
+    ndjson = formato_ndjson()
+    dumps = current_app.json.dumps
+
+    def generar():
+        conn = get_db()
+        cursor = conn.cursor(buffered=False, dictionary=dictionary)
+        terminado = False
+        try:
+            cursor.execute(sql, params)
+            primero = True
+            if not ndjson:
+                yield "["
+            while True:
+                filas = cursor.fetchmany(chunk_size)
+                if not filas:
+                    break
+                objetos = (fila_a_dict(f) if fila_a_dict else f for f in filas)
+                if ndjson:
+                    yield "".join(dumps(o) + "\n" for o in objetos)
+                else:
+                    bloque = ",".join(dumps(o) for o in objetos)
+                    yield bloque if primero else "," + bloque
+                    primero = False
+            if not ndjson:
+                yield "]"
+            terminado = True
+        finally:
+            if not terminado:
+                # Cliente desconectado o error: descartar las filas pendientes
+                # para que la conexión vuelva limpia al pool
+                try:
+                    conn.consume_results()
+                except Exception:
+                    pass
+            cursor.close()
+
+    mimetype = "application/x-ndjson" if ndjson else "application/json"
+    return Response(stream_with_context(generar()), mimetype=mimetype)
@@ -0,0 +1,79 @@
+import re
+import sys
+from datetime import date
+from decimal import Decimal
+from itertools import groupby
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import decorators  # noqa: E402
+import json_rapido  # noqa: E402
+import reportes  # noqa: E402
+
+# Filas de ventas_diarias: fecha, pedidos, lineas, unidades, ingresos, costo.
+# Marzo solo tiene un pedido que se canceló (quedó en cero) y no debe aparecer.
+VENTAS_DIARIAS = [
+    (date(2024, 1, 30), 2, 3, 5, Decimal("100.00"), Decimal("40.00")),
+    (date(2024, 1, 31), 1, 1, 2, Decimal("50.00"), Decimal("20.00")),
+    (date(2024, 2, 1), 3, 4, 6, Decimal("120.00"), Decimal("45.00")),
+    (date(2024, 3, 5), 0, 0, 0, Decimal("0.00"), Decimal("0.00")),
+]
+
+
+def _sql_enviado(sql, params):
+    """El SQL como lo recibe MySQL: el conector reemplaza cada %s por un parámetro
+    y deja intacto cualquier otro '%' (también '%%')"""
+    valores = iter(f"'{p.isoformat()}'" for p in params)
+    return re.sub(r"%s", lambda m: next(valores), sql)
+
+
+def _date_format(valor, formato):
+    """DATE_FORMAT de MySQL para %Y y %m ('%%' es un '%' literal)"""
+    partes = {"Y": f"{valor.year:04d}", "m": f"{valor.month:02d}", "%": "%"}
+    return re.sub(r"%(.)", lambda m: partes.get(m.group(1), m.group(1)), formato)
+
+
+def _query_all(sql, params):
+    """Agrupa VENTAS_DIARIAS por mes como lo haría MySQL con el SQL recibido"""
+    enviado = _sql_enviado(sql, params)
+    formato = re.search(r"DATE_FORMAT\(v\.fecha, '([^']*)'\)", enviado).group(1)
+    desde, hasta = params
+    filas = sorted(
+        (_date_format(f[0], formato), *f[1:]) for f in VENTAS_DIARIAS if desde <= f[0] <= hasta
+    )
+    resultado = []
+    for mes, grupo in groupby(filas, key=lambda f: f[0]):
+        grupo = list(grupo)
+        pedidos, lineas, unidades, ingresos, costo = (sum(c) for c in list(zip(*grupo))[1:])
+        if "HAVING SUM(v.pedidos) <> 0 OR SUM(v.lineas) <> 0" in enviado and not (pedidos or lineas):
+            continue
+        resultado.append((mes, pedidos, lineas, unidades, ingresos, costo, ingresos - costo, None))
+    return resultado
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(reportes, "ventas_mantenidas", lambda: True)
+    monkeypatch.setattr(reportes, "query_all", _query_all)
+    monkeypatch.setattr(reportes, "query_one", lambda sql, params: (0,) * 7)
+    monkeypatch.setattr(decorators, "current_user", SimpleNamespace(rol="admin"))
+
+    app = Flask(__name__)
+    app.config["LOGIN_DISABLED"] = True
+    json_rapido.init_app(app)
+    app.register_blueprint(reportes.reportes_bp)
+    return app.test_client()
+
+
+def test_ventas_por_mes_agrupa_cada_mes_en_su_fila(cliente):
+    respuesta = cliente.get("/reportes/ventas?agrupar=mes&desde=2024-01-01&hasta=2024-03-31")
+
+    assert respuesta.status_code == 200
+    filas = respuesta.get_json()["filas"]
+    assert [f["mes"] for f in filas] == ["2024-01", "2024-02"]
+    assert [f["pedidos"] for f in filas] == [3, 3]
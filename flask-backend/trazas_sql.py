@@ -0,0 +1,170 @@
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from flask import current_app, g, has_request_context, jsonify, request
+
+import db
+from decorators import admin_required
+
+logger = logging.getLogger(__name__)
+
+# ================================
+# Traza de SQL por request: N+1 y consultas lentas (desarrollo / staging)
+# ================================
+# Con SQL_TRACE activado se guarda cada sentencia del request con su duración y su
+# forma normalizada (literales y listas IN reemplazadas por ?). Al terminar:
+#   - las formas repetidas SQL_TRACE_N1_UMBRAL veces o más se marcan como N+1
+#   - las sentencias de más de SQL_TRACE_LENTA_MS se registran junto con su EXPLAIN
+# Las últimas SQL_TRACE_HISTORIAL trazas se consultan en /debug/sql/<request_id>.
+
+_LITERALES = re.compile(r"'(?:[^'\\]|\\.)*'|\b\d+(?:\.\d+)?\b|%s")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+# X-Request-ID del cliente: se usa como clave del historial y en nombres de archivo
+_REQUEST_ID_VALIDO = re.compile(r"[A-Za-z0-9-]{1,64}")
+
+EXPLICABLES = ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE")
+
+_historial = OrderedDict()  # request_id -> resumen
+_lock = threading.Lock()
+
+
+def normalizar(sql):
+    sql = _LITERALES.sub("?", sql)
+    sql = _LISTAS.sub("(?+)", sql)
+    return _ESPACIOS.sub(" ", sql).strip()
+
+
+def request_id():
+    """Id del request actual: la cabecera X-Request-ID si es válida y no pisa una traza
+    guardada, si no uno nuevo"""
+    if not has_request_context():
+        return None
+    if "request_id" not in g:
+        propuesto = request.headers.get("X-Request-ID", "")
+        if _REQUEST_ID_VALIDO.fullmatch(propuesto):
+            with _lock:
+                if propuesto in _historial:
+                    propuesto = ""
+        else:
+            propuesto = ""
+        g.request_id = propuesto or uuid.uuid4().hex[:16]
+    return g.request_id
+
+
+def _activa():
+    return has_request_context() and current_app.config.get("SQL_TRACE", False)
+
+
+def registrar(sql, params, duracion, filas):
+    if not _activa():
+        return
+    if "traza_sql" not in g:
+        g.traza_sql = []
+    g.traza_sql.append((sql, params, duracion, filas))
+
+
+def _explain(sql, params):
+    """Filas de EXPLAIN de la sentencia, con un cursor sin observar"""
+    if sql.split(None, 1)[0].upper() not in EXPLICABLES:
+        return None
+    if params and isinstance(params, list) and isinstance(params[0], (list, tuple)):
+        params = params[0]  # executemany: basta con la primera fila
+    conn = db.get_db()
+    cursor = getattr(conn, "conexion", conn).cursor(dictionary=True)
+    try:
+        cursor.execute("EXPLAIN " + sql, params or ())
+        return cursor.fetchall()
+    except Exception as e:
+        return [{"error": str(e)}]
+    finally:
+        cursor.close()
+
+
+def resumir(traza, umbral_n1):
+    """Conteo, tiempo total, formas repetidas y detalle de la traza (sin parámetros)"""
+    formas = Counter(normalizar(sql) for sql, _, _, _ in traza)
+    return {
+        "consultas": len(traza),
+        "tiempo_sql_ms": round(sum(t[2] for t in traza) * 1000, 3),
+        "n_mas_1": [{"sql": forma, "veces": veces}
+                    for forma, veces in formas.most_common() if veces >= umbral_n1],
+        "sentencias": [{"sql": normalizar(sql), "ms": round(duracion * 1000, 3), "filas": filas}
+                       for sql, _, duracion, filas in traza],
+    }
+
+
+def init_app(app):
+    db.agregar_observador(registrar)
+
+    @app.before_request
+    def asignar_request_id():
+        request_id()
+        if _activa():
+            g.traza_inicio = time.perf_counter()
+
+    @app.after_request
+    def cabeceras_traza(response):
+        response.headers["X-Request-ID"] = request_id()
+        if _activa():
+            traza = g.get("traza_sql", [])
+            response.headers["X-SQL-Queries"] = str(len(traza))
+            response.headers["X-SQL-Time-ms"] = f"{sum(t[2] for t in traza) * 1000:.1f}"
+        return response
+
+    @app.teardown_request
+    def cerrar_traza(exc=None):
+        if not _activa() or "traza_inicio" not in g:
+            return
+        traza = g.pop("traza_sql", [])
+        umbral_n1 = app.config.get("SQL_TRACE_N1_UMBRAL", 5)
+        lenta_ms = app.config.get("SQL_TRACE_LENTA_MS", 100)
+        resumen = resumir(traza, umbral_n1)
+        resumen.update({
+            "request_id": request_id(),
+            "endpoint": f"{request.method} {request.path}",
+            "duracion_ms": round((time.perf_counter() - g.pop("traza_inicio")) * 1000, 3),
+        })
+
+        for n1 in resumen["n_mas_1"]:
+            logger.warning("[%s] Posible N+1 en %s: %d veces %s",
+                           resumen["request_id"], resumen["endpoint"], n1["veces"], n1["sql"])
+        # Los parámetros solo se usan para el EXPLAIN; no se guardan en el historial
+        resumen["lentas"] = []
+        for sql, params, duracion, _ in traza:
+            if duracion * 1000 < lenta_ms:
+                continue
+            lenta = {"sql": normalizar(sql), "ms": round(duracion * 1000, 3), "explain": _explain(sql, params)}
+            resumen["lentas"].append(lenta)
+            logger.warning("[%s] Consulta lenta (%.1f ms) en %s: %s\nEXPLAIN: %s",
+                           resumen["request_id"], lenta["ms"], resumen["endpoint"],
+                           lenta["sql"], lenta["explain"])
+
+        with _lock:
+            _historial[resumen["request_id"]] = resumen
+            while len(_historial) > app.config.get("SQL_TRACE_HISTORIAL", 200):
+                _historial.popitem(last=False)
+
+    @app.route("/debug/sql")
+    @admin_required
+    def debug_sql():
+        """Resumen de las últimas trazas (sin el detalle de sentencias)"""
+        with _lock:
+            resumenes = list(_historial.values())
+        return jsonify([
+            {clave: valor for clave, valor in r.items() if clave != "sentencias"}
+            for r in reversed(resumenes)
+        ])
+
+    @app.route("/debug/sql/<request_id_buscado>")
+    @admin_required
+    def debug_sql_request(request_id_buscado):
+        with _lock:
+            resumen = _historial.get(request_id_buscado)
+        if resumen is None:
+            return jsonify({"error": "Traza no encontrada (¿SQL_TRACE activado?)"}), 404
+        return jsonify(resumen)
@@ -1,10 +1,27 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required
-from db import get_db_connection
-from werkzeug.security import generate_password_hash
+from db import get_db
+from models import invalidate_user
+from hashing import hasher
+from streaming import quiere_streaming, stream_query
+from campos import Campos
+import busqueda
+from json_rapido import formato_tabular
 
 usuarios_bp = Blueprint("usuarios_bp", __name__, url_prefix="/usuarios")
 
+SQL_USUARIOS = "SELECT id_usuario, nombre, email, telefono, direccion, rol FROM usuarios"
+
+# Campos disponibles en ?fields= (nunca el password)
+CAMPOS_USUARIOS = Campos("usuarios", {
+    "id_usuario": "id_usuario",
+    "nombre": "nombre",
+    "email": "email",
+    "telefono": "telefono",
+    "direccion": "direccion",
+    "rol": "rol",
+})
+
 # Rutas OPTIONS SIN autenticación
 @usuarios_bp.route("/", methods=["OPTIONS"])
 @usuarios_bp.route("/<int:id>", methods=["OPTIONS"])
@@ -12,17 +29,27 @@ def handle_options(id=None):
     return jsonify({"status": "ok"}), 200
 
 # =========================
-# Obtener todos los usuarios
+# Obtener todos los usuarios (?stream=1 o ?format=ndjson para streaming,
+# ?fields=id_usuario,nombre para leer solo esas columnas)
 # =========================
 @usuarios_bp.route("/", methods=["GET"])
 @login_required
 def get_usuarios():
-    conn = get_db_connection()
+    campos = CAMPOS_USUARIOS.solicitados()
+    if quiere_streaming():
+        if campos:
+            return stream_query(CAMPOS_USUARIOS.sql(campos), fila_a_dict=CAMPOS_USUARIOS.espec(campos).objeto)
+        return stream_query(SQL_USUARIOS, dictionary=True)
+
+    if campos:
+        filas = CAMPOS_USUARIOS.filas(campos)
+        return jsonify(CAMPOS_USUARIOS.espec(campos).tabla(filas, formato_tabular()))
+
+    conn = get_db()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT id_usuario, nombre, email, telefono, direccion, rol FROM usuarios")
+    cursor.execute(SQL_USUARIOS)
     rows = cursor.fetchall()
     cursor.close()
-    conn.close()
     return jsonify(rows)
 
 # =========================
@@ -31,12 +58,18 @@ def get_usuarios():
 @usuarios_bp.route("/<int:id>", methods=["GET"])
 @login_required
 def get_usuario(id):
-    conn = get_db_connection()
+    campos = CAMPOS_USUARIOS.solicitados()
+    if campos:
+        usuario = CAMPOS_USUARIOS.fila(campos, "WHERE id_usuario = %s", (id,))
+        if usuario is None:
+            return jsonify({"error": "Usuario no encontrado"}), 404
+        return jsonify(usuario)
+
+    conn = get_db()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT id_usuario, nombre, email, telefono, direccion, rol FROM usuarios WHERE id_usuario = %s", (id,))
+    cursor.execute(SQL_USUARIOS + " WHERE id_usuario = %s", (id,))
     row = cursor.fetchone()
     cursor.close()
-    conn.close()
     if row:
         return jsonify(row)
     return jsonify({"error": "Usuario no encontrado"}), 404
@@ -58,17 +91,18 @@ def add_usuario():
     if not nombre or not email or not password:
         return jsonify({"error": "Faltan campos obligatorios"}), 400
 
-    hashed_pw = generate_password_hash(password)
+    hashed_pw = hasher.hash(password)
 
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("""
         INSERT INTO usuarios (nombre, email, password, telefono, direccion, rol)
         VALUES (%s, %s, %s, %s, %s, %s)
     """, (nombre, email, hashed_pw, telefono, direccion, rol))
+    usuario_id = cursor.lastrowid
     conn.commit()
     cursor.close()
-    conn.close()
+    busqueda.clientes.actualizar([usuario_id])
 
     return jsonify({"mensaje": "Usuario agregado"}), 201
 
@@ -86,11 +120,11 @@ def update_usuario(id):
     rol = data.get("rol")
     password = data.get("password")
 
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
 
     if password:
-        hashed_pw = generate_password_hash(password)
+        hashed_pw = hasher.hash(password)
         cursor.execute("""
             UPDATE usuarios
             SET nombre=%s, email=%s, telefono=%s, direccion=%s, rol=%s, password=%s
@@ -105,7 +139,8 @@ def update_usuario(id):
 
     conn.commit()
     cursor.close()
-    conn.close()
+    invalidate_user(id)
+    busqueda.clientes.actualizar([id])
 
     return jsonify({"mensaje": "Usuario actualizado"})
 
@@ -115,11 +150,12 @@ def update_usuario(id):
 @usuarios_bp.route("/<int:id>", methods=["DELETE"])
 @login_required
 def delete_usuario(id):
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("DELETE FROM usuarios WHERE id_usuario=%s", (id,))
     conn.commit()
     cursor.close()
-    conn.close()
+    invalidate_user(id)
+    busqueda.clientes.actualizar([id])
 
     return jsonify({"mensaje": "Usuario eliminado"})
\ No newline at end of file
@@ -0,0 +1,90 @@
+import secrets
+import threading
+import zlib
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+
+# ================================
+# Versiones por tabla para ETag / GET condicional del catálogo
+# ================================
+# Cada handler que modifica una tabla la marca; al terminar la petición sin error
+# (es decir, después del commit) se incrementa su contador. Las lecturas arman el
+# ETag con las versiones de las tablas de las que dependen y responden 304 a un
+# If-None-Match vigente sin consultar MySQL.
+#
+# Los contadores viven en memoria del proceso: solo son válidos con un único proceso
+# de la app y no ven cambios hechos fuera de ella (CLI, SQL manual). El token de
+# arranque evita reutilizar ETags de un proceso anterior.
+
+_arranque = secrets.token_hex(4)
+_versiones = {}
+_lock = threading.Lock()
+
+METODOS_DE_LECTURA = ("GET", "HEAD", "OPTIONS")
+
+
+def version(tabla):
+    return _versiones.get(tabla, 0)
+
+
+def incrementar(*tablas):
+    with _lock:
+        for tabla in tablas:
+            _versiones[tabla] = _versiones.get(tabla, 0) + 1
+
+
+def marcar(*tablas):
+    """Registra tablas modificadas por la petición en curso"""
+    if not hasattr(g, "tablas_modificadas"):
+        g.tablas_modificadas = set()
+    g.tablas_modificadas.update(tablas)
+
+
+def versionar(blueprint, *tablas):
+    """Marca las tablas en toda petición de escritura al blueprint"""
+    @blueprint.before_request
+    def _marcar_escritura():
+        if request.method not in METODOS_DE_LECTURA:
+            marcar(*tablas)
+
+
+def etag(tablas):
+    # La representación también depende del query string y del Accept (?stream, ndjson)
+    variante = zlib.crc32(request.query_string + request.headers.get("Accept", "").encode())
+    versiones = ".".join(str(version(tabla)) for tabla in tablas)
+    return f"{_arranque}-{versiones}-{variante:08x}"
+
+
+def condicional(*tablas):
+    """ETag fuerte con las versiones de las tablas; 304 si If-None-Match coincide"""
+    def decorador(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get("CATALOGO_ETAG", True):
+                return view(*args, **kwargs)
+
+            # Se toma antes de consultar: si una escritura termina durante la lectura,
+            # la respuesta queda con la versión anterior y se vuelve a pedir
+            valor = etag(tablas)
+            if request.if_none_match.contains_weak(valor):
+                respuesta = make_response("", 304)
+            else:
+                respuesta = make_response(view(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+            respuesta.set_etag(valor)
+            respuesta.headers["Cache-Control"] = "private, no-cache"
+            respuesta.vary.add("Accept")
+            return respuesta
+        return wrapper
+    return decorador
+
+
+def init_app(app):
+    @app.after_request
+    def incrementar_modificadas(response):
+        tablas = g.pop("tablas_modificadas", None)
+        if tablas and response.status_code < 400:
+            incrementar(*tablas)
+        return response
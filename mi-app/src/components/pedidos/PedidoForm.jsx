@@ -16,82 +16,39 @@ const PedidoForm = ({ productos, onSubmit, onClose, titulo = "➕ Nuevo Pedido"
   const [loading, setLoading] = useState(false);
   const [verificandoUsuario, setVerificandoUsuario] = useState(false);
   const [usuarioEncontrado, setUsuarioEncontrado] = useState(null);
-  const [usuarios, setUsuarios] = useState([]);
-  const [cargandoUsuarios, setCargandoUsuarios] = useState(true);
   const [credencialesUsuario, setCredencialesUsuario] = useState(null);
 
-  // Cargar usuarios REALES de la base de datos
+  // Verificar usuario cuando cambia email o teléfono (búsqueda en el backend, sin cargar todos los clientes)
   useEffect(() => {
-    const cargarUsuariosReales = async () => {
-      try {
-        console.log('🔄 Cargando usuarios reales...');
-        setCargandoUsuarios(true);
-        const usuariosReales = await pedidosService.getUsuarios();
-        console.log('✅ Usuarios cargados de la BD:', usuariosReales);
-        setUsuarios(usuariosReales);
-      } catch (error) {
-        console.error('❌ Error cargando usuarios:', error);
-        setError('Error al cargar la lista de clientes');
-        setUsuarios([]);
-      } finally {
-        setCargandoUsuarios(false);
-      }
-    };
+    const email = formData.cliente_email.trim().toLowerCase();
+    const telefono = formData.cliente_telefono.trim().replace(/\D/g, '');
 
-    cargarUsuariosReales();
-  }, []);
-
-  // Verificar usuario cuando cambia email o teléfono
-  useEffect(() => {
-    const verificarUsuario = () => {
-      const email = formData.cliente_email.trim();
-      const telefono = formData.cliente_telefono.trim();
-      
-      if (!email && !telefono) {
-        setUsuarioEncontrado(null);
-        return;
-      }
-
-      if (cargandoUsuarios) {
-        console.log('⏳ Esperando a que carguen los usuarios...');
-        return;
-      }
+    if (!email && telefono.length <= 5) {
+      setUsuarioEncontrado(null);
+      return;
+    }
 
-      if (usuarios.length === 0) {
-        console.log('📭 No hay usuarios cargados para buscar');
-        setUsuarioEncontrado(null);
-        return;
-      }
+    let cancelado = false;
 
+    const verificarUsuario = async () => {
       setVerificandoUsuario(true);
-      
       console.log('🔍 Buscando usuario con:', { email, telefono });
-      console.log('📋 Buscando en', usuarios.length, 'usuarios:', usuarios);
 
-      // Búsqueda en usuarios REALES de la BD
-      const usuarioExistente = usuarios.find(usuario => {
-        const usuarioEmail = usuario.email ? usuario.email.toLowerCase().trim() : '';
-        const inputEmail = email ? email.toLowerCase().trim() : '';
-        
-        const usuarioTel = usuario.telefono ? usuario.telefono.replace(/\D/g, '') : '';
-        const inputTel = telefono ? telefono.replace(/\D/g, '') : '';
-        
-        const emailMatch = inputEmail && usuarioEmail === inputEmail;
-        const telefonoMatch = inputTel && usuarioTel === inputTel && inputTel.length > 5;
-        
-        console.log(`Comparando: ${usuario.nombre}`, {
-          emailMatch, 
-          telefonoMatch,
-          usuarioEmail, 
-          inputEmail, 
-          usuarioTel, 
-          inputTel
+      try {
+        const candidatos = [
+          ...(email ? await pedidosService.buscarClientes(email, 5) : []),
+          ...(telefono.length > 5 ? await pedidosService.buscarClientes(telefono, 5) : [])
+        ];
+
+        // La búsqueda es por prefijo: confirmar coincidencia exacta de email o teléfono
+        const usuarioExistente = candidatos.find(usuario => {
+          const usuarioEmail = usuario.email ? usuario.email.toLowerCase().trim() : '';
+          const usuarioTel = usuario.telefono ? usuario.telefono.replace(/\D/g, '') : '';
+          return (email && usuarioEmail === email) || (telefono.length > 5 && usuarioTel === telefono);
         });
-        
-        return emailMatch || telefonoMatch;
-      });
-      
-      setTimeout(() => {
+
+        if (cancelado) return;
+
         if (usuarioExistente) {
           console.log('✅ USUARIO ENCONTRADO:', usuarioExistente);
           setUsuarioEncontrado(usuarioExistente);
@@ -104,13 +61,20 @@ const PedidoForm = ({ productos, onSubmit, onClose, titulo = "➕ Nuevo Pedido"
           console.log('❌ Usuario no encontrado - será nuevo cliente');
           setUsuarioEncontrado(null);
         }
-        setVerificandoUsuario(false);
-      }, 500);
+      } catch (error) {
+        console.error('❌ Error buscando cliente:', error);
+        if (!cancelado) setUsuarioEncontrado(null);
+      } finally {
+        if (!cancelado) setVerificandoUsuario(false);
+      }
     };
 
-    const timeoutId = setTimeout(verificarUsuario, 600);
-    return () => clearTimeout(timeoutId);
-  }, [formData.cliente_email, formData.cliente_telefono, usuarios, cargandoUsuarios]);
+    const timeoutId = setTimeout(verificarUsuario, 400);
+    return () => {
+      cancelado = true;
+      clearTimeout(timeoutId);
+    };
+  }, [formData.cliente_email, formData.cliente_telefono]);
 
   const agregarProducto = () => {
     if (!productoSeleccionado || cantidad < 1) {
@@ -205,47 +169,22 @@ const PedidoForm = ({ productos, onSubmit, onClose, titulo = "➕ Nuevo Pedido"
           password: nuevoUsuario.password_temporal,
           nombre: nuevoUsuario.nombre
         });
-        
-        // ACTUALIZAR LA LISTA DE USUARIOS después de crear uno nuevo
-        const usuariosActualizados = await pedidosService.getUsuarios();
-        setUsuarios(usuariosActualizados);
-        console.log('🔄 Lista de usuarios actualizada');
       }
 
-      // Crear el pedido
+      // Crear el pedido con todos sus productos en una sola petición
       const pedidoData = {
         usuario_id: usuarioId,
         telefono: formData.cliente_telefono,
         direccion: formData.direccion,
-        total: calcularTotal()
+        detalles: formData.detalles.map(detalle => ({
+          producto_id: detalle.producto_id,
+          cantidad: detalle.cantidad
+        }))
       };
 
       console.log('📤 Creando pedido con datos:', pedidoData);
-      const pedidoCreado = await pedidosService.createPedido(pedidoData);
-
-      // ✅ AGREGAR ESTOS LOGS DE DEBUG (CORREGIDO)
-      console.log('🔍 Respuesta completa de createPedido:', pedidoCreado);
-      console.log('🔍 Todas las claves del objeto:', Object.keys(pedidoCreado));
-      const pedidoId = pedidoCreado.id_pedido;
-      console.log('✅ Pedido creado con ID:', pedidoId);
-      console.log('🔍 Tipo de ID:', typeof pedidoId);
-
-      // ✅ CREAR LOS DETALLES DEL PEDIDO (PRODUCTOS)
-      console.log(`📝 Creando ${formData.detalles.length} detalles del pedido...`);
-      
-      for (const detalle of formData.detalles) {
-        try {
-          await pedidosService.createDetallePedidoAlternativo(pedidoId, {
-            producto_id: detalle.producto_id,
-            cantidad: detalle.cantidad,
-            subtotal: detalle.subtotal
-          });
-          console.log(`✅ Detalle creado: ${detalle.producto_nombre} x${detalle.cantidad}`);
-        } catch (detalleError) {
-          console.error(`❌ Error creando detalle para ${detalle.producto_nombre}:`, detalleError);
-          throw new Error(`Error al agregar producto ${detalle.producto_nombre}`);
-        }
-      }
+      const pedidoCreado = await pedidosService.createPedidoCompleto(pedidoData);
+      console.log('✅ Pedido creado con ID:', pedidoCreado.id_pedido);
 
       console.log('🎉 Pedido completado exitosamente!');
       onClose();
@@ -258,9 +197,7 @@ const PedidoForm = ({ productos, onSubmit, onClose, titulo = "➕ Nuevo Pedido"
     }
   };
 
-  // Agregar indicador de carga de usuarios
-  if (cargandoUsuarios) {
-    return (
+  return (
       <div className="modal fade show d-block" style={{backgroundColor: 'rgba(0,0,0,0.5)'}}>
         <div className="modal-dialog">
           <div className="modal-content">
@@ -292,7 +229,6 @@ const PedidoForm = ({ productos, onSubmit, onClose, titulo = "➕ Nuevo Pedido"
               <div className="card mb-3">
                 <div className="card-header bg-light">
                   <h6 className="mb-0">👤 Información del Cliente</h6>
-                  <small className="text-muted">Base de datos: {usuarios.length} clientes</small>
                 </div>
                 <div className="card-body">
                   <div className="row mb-3">
@@ -320,7 +256,7 @@ const PedidoForm = ({ productos, onSubmit, onClose, titulo = "➕ Nuevo Pedido"
 
                   {verificandoUsuario && (
                     <div className="alert alert-info py-2">
-                      <small>🔍 Buscando en {usuarios.length} clientes...</small>
+                      <small>🔍 Buscando cliente...</small>
                     </div>
                   )}
 
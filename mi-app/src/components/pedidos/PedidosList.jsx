@@ -5,8 +5,12 @@ import { productosService } from '../../services/productosService';
 import PedidoForm from './PedidoForm';
 import EditarPedidoModal from './EditarPedidoModal';
 
+const PEDIDOS_POR_PAGINA = 50;
+
 const PedidosList = () => {
   const [pedidos, setPedidos] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [cargandoMas, setCargandoMas] = useState(false);
   const [productos, setProductos] = useState([]);
   const [loading, setLoading] = useState(true);
   const [pedidoSeleccionado, setPedidoSeleccionado] = useState(null);
@@ -28,10 +32,11 @@ const PedidosList = () => {
       setLoading(true);
       setError('');
       const [pedidosData, productosData] = await Promise.all([
-        pedidosService.getPedidos(),
+        pedidosService.getPedidosPagina({ limit: PEDIDOS_POR_PAGINA }),
         productosService.getProductos()
       ]);
-      setPedidos(pedidosData);
+      setPedidos(pedidosData.pedidos);
+      setNextCursor(pedidosData.next_cursor);
       setProductos(productosData);
     } catch (error) {
       console.error('Error cargando datos:', error);
@@ -41,6 +46,26 @@ const PedidosList = () => {
     }
   };
 
+  const cargarMasPedidos = async () => {
+    if (!nextCursor) return;
+
+    try {
+      setCargandoMas(true);
+      setError('');
+      const data = await pedidosService.getPedidosPagina({
+        limit: PEDIDOS_POR_PAGINA,
+        cursor: nextCursor
+      });
+      setPedidos(anteriores => [...anteriores, ...data.pedidos]);
+      setNextCursor(data.next_cursor);
+    } catch (error) {
+      console.error('Error cargando más pedidos:', error);
+      setError('No se pudieron cargar más pedidos');
+    } finally {
+      setCargandoMas(false);
+    }
+  };
+
   const cargarDetallesPedido = async (pedidoId) => {
     try {
       setError('');
@@ -482,6 +507,17 @@ useEffect(() => {
                   </tbody>
                 </table>
               </div>
+              {nextCursor && (
+                <div className="text-center p-3">
+                  <button 
+                    className="btn btn-outline-secondary btn-sm"
+                    onClick={cargarMasPedidos}
+                    disabled={cargandoMas}
+                  >
+                    {cargandoMas ? 'Cargando...' : 'Cargar más pedidos'}
+                  </button>
+                </div>
+              )}
             </div>
           </div>
         </div>
@@ -1,3 +1,5 @@
+import { decodificarTabla } from './tabular';
+
 const API_URL = 'http://localhost:5000';
 
 export const pedidosService = {
@@ -19,6 +21,31 @@ export const pedidosService = {
     }
   },
 
+  // Obtener una página de pedidos: { pedidos, next_cursor }
+  // params admite limit, cursor y filtros (estado, desde, hasta, usuario_id, cliente, telefono)
+  async getPedidosPagina(params = {}) {
+    try {
+      const query = new URLSearchParams(
+        Object.entries(params).filter(([, valor]) => valor !== undefined && valor !== null && valor !== '')
+      );
+      // Formato tabular: los nombres de columna viajan una sola vez por página
+      query.set('format', 'rows');
+      const response = await fetch(`${API_URL}/pedidos/?${query}`, {
+        credentials: 'include'
+      });
+      
+      if (!response.ok) {
+        throw new Error('Error al cargar pedidos');
+      }
+      
+      const pagina = await response.json();
+      return { ...pagina, pedidos: decodificarTabla(pagina.pedidos) };
+    } catch (error) {
+      console.error('Error en pedidosService.getPedidosPagina:', error);
+      throw error;
+    }
+  },
+
   // Obtener detalles de un pedido específico
   async getDetallesPedido(pedidoId) {
     try {
@@ -55,6 +82,25 @@ export const pedidosService = {
     }
   },
 
+  // Buscar clientes por prefijo de nombre, email o teléfono (top-k desde el índice del backend)
+  async buscarClientes(q, limit = 10) {
+    try {
+      const query = new URLSearchParams({ q, limit });
+      const response = await fetch(`${API_URL}/buscar/clientes?${query}`, {
+        credentials: 'include'
+      });
+      
+      if (!response.ok) {
+        throw new Error('Error al buscar clientes');
+      }
+      
+      return await response.json();
+    } catch (error) {
+      console.error('Error en pedidosService.buscarClientes:', error);
+      throw error;
+    }
+  },
+
   // Crear nuevo usuario
   async createUsuario(usuarioData) {
     try {
@@ -141,6 +187,36 @@ export const pedidosService = {
     }
   },
 
+  // Crear pedido con todas sus líneas en una sola petición (una transacción en el backend)
+  async createPedidoCompleto(pedidoData) {
+    try {
+      const response = await fetch(`${API_URL}/pedidos/completo`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        credentials: 'include',
+        body: JSON.stringify(pedidoData)
+      });
+      
+      if (!response.ok) {
+        let errorDetail = '';
+        try {
+          const errorData = await response.json();
+          errorDetail = errorData.error || 'Sin detalles';
+        } catch (e) {
+          errorDetail = await response.text();
+        }
+        throw new Error(`Error al crear pedido: ${response.status} - ${errorDetail}`);
+      }
+      
+      return await response.json();
+    } catch (error) {
+      console.error('Error en pedidosService.createPedidoCompleto:', error);
+      throw error;
+    }
+  },
+
   // Actualizar pedido
   async updatePedido(pedidoId, pedidoData) {
     try {
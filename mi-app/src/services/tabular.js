@@ -0,0 +1,35 @@
+// Formato tabular de los listados (?format=columns o ?format=rows).
+// El backend envía los nombres de columna una sola vez:
+//   rows:    { columns: [...], rows: [[...], ...] }
+//   columns: { columns: [...], data: [[valores de la columna 1], ...] }
+// decodificarTabla devuelve siempre un arreglo de objetos; si recibe un arreglo
+// (formato normal) lo devuelve tal cual.
+export const decodificarTabla = (tabla) => {
+  if (!tabla || Array.isArray(tabla) || !Array.isArray(tabla.columns)) {
+    return tabla;
+  }
+
+  const { columns } = tabla;
+
+  if (Array.isArray(tabla.rows)) {
+    return tabla.rows.map((fila) => {
+      const objeto = {};
+      for (let i = 0; i < columns.length; i++) {
+        objeto[columns[i]] = fila[i];
+      }
+      return objeto;
+    });
+  }
+
+  const datos = tabla.data || [];
+  const total = datos.length ? datos[0].length : 0;
+  const objetos = new Array(total);
+  for (let fila = 0; fila < total; fila++) {
+    const objeto = {};
+    for (let i = 0; i < columns.length; i++) {
+      objeto[columns[i]] = datos[i][fila];
+    }
+    objetos[fila] = objeto;
+  }
+  return objetos;
+};